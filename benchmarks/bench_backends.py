@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""比较各配置格式后端在大型合成配置文件上的解析耗时。
+
+用法: python benchmarks/bench_backends.py --profiles 100 1000 5000 --repeat 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claude_switch.backends import YamlBackend, JsonBackend, TomlBackend  # noqa: E402
+from synthetic import make_config_data  # noqa: E402
+
+CANDIDATES = [
+    ("yaml (pure python)", YamlBackend(prefer_c=False)),
+    ("yaml (libyaml)", YamlBackend(prefer_c=True)),
+    ("json", JsonBackend()),
+    ("toml", TomlBackend()),
+]
+
+
+def best_of(func, repeat):
+    """运行多次，返回最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="配置格式后端解析基准测试")
+    parser.add_argument("--profiles", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import yaml
+    if not yaml.__with_libyaml__:
+        print("注意: 当前PyYAML未编译libyaml，'yaml (libyaml)' 实际使用纯Python实现")
+
+    header = f"{'配置数量':>8}  {'后端':<20}{'文件大小':>10}{'解析(ms)':>12}{'相对纯YAML':>12}"
+    print(header)
+    print("-" * len(header))
+    for count in args.profiles:
+        data = make_config_data(count)
+        baseline = None
+        for label, backend in CANDIDATES:
+            if not backend.is_available():
+                print(f"{count:>8}  {label:<20}{'不可用':>10}")
+                continue
+            raw = backend.dump(data)
+            assert backend.load(raw) == data, f"{label} 往返结果不一致"
+            elapsed = best_of(lambda: backend.load(raw), args.repeat)
+            baseline = baseline or elapsed
+            print(f"{count:>8}  {label:<20}{len(raw) // 1024:>8}KB{elapsed:>12.1f}{baseline / elapsed:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""ccs 命令行端到端启动基准测试。
+
+在临时目录中创建合成配置（默认10、1000、10000个配置）和一个立即退出的 `claude` 桩程序，
+多次运行 `ccs run`、`ccs list`、`ccs current` 和补全入口，统计墙钟时间、导入耗时和峰值RSS的分位数，
+并与 benchmarks/baselines.json 中的基线比较，出现回归时以非零状态退出。完全离线运行，仅依赖Linux。
+
+用法:
+    python benchmarks/bench_cli.py                       # 运行并与基线比较
+    python benchmarks/bench_cli.py --sizes 10 1000 --runs 5
+    python benchmarks/bench_cli.py --update-baselines    # 用本次结果覆盖基线
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from claude_switch.backends import YamlBackend  # noqa: E402
+from synthetic import make_config_data  # noqa: E402
+
+BASELINES_FILE = BENCH_DIR / "baselines.json"
+DEFAULT_SIZES = [10, 1000, 10000]
+ENTRIES = ["run", "current", "complete", "list"]
+# Rich渲染的 `ccs list` 在大型配置上需要数秒，默认只在较小的配置上测量
+LIST_SIZE_LIMIT = 1000
+
+CCS_WRAPPER = """#!{python}
+import sys
+sys.path.insert(0, {root!r})
+from claude_switch.cli import main
+main()
+"""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算分位数"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class Sandbox:
+    """包含合成配置、ccs包装脚本和claude桩程序的临时环境"""
+
+    def __init__(self, size: int):
+        self.root = Path(tempfile.mkdtemp(prefix=f"ccs-bench-{size}-"))
+        self.home = self.root / "home"
+        self.bin_dir = self.root / "bin"
+        self.bin_dir.mkdir(parents=True)
+        config_dir = self.home / ".config" / "claude-code-switch"
+        config_dir.mkdir(parents=True)
+
+        data = make_config_data(size)
+        (config_dir / "config.yaml").write_bytes(YamlBackend().dump(data))
+        self.profile = data["default_config"]
+        self.model = data["configs"][self.profile]["default_model"]
+
+        self.ccs = self.bin_dir / "ccs"
+        self.ccs.write_text(CCS_WRAPPER.format(python=sys.executable, root=str(PROJECT_ROOT)))
+        claude = self.bin_dir / "claude"
+        claude.write_text("#!/bin/sh\nexit 0\n")
+        for path in (self.ccs, claude):
+            path.chmod(0o755)
+
+        self.env = {
+            "HOME": str(self.home),
+            "PATH": f"{self.bin_dir}{os.pathsep}{os.environ.get('PATH', '/usr/bin:/bin')}",
+            "LANG": os.environ.get("LANG", "C.UTF-8"),
+            "NO_COLOR": "1",
+            "COLUMNS": "120",
+            # 与 tests/conftest.py 一致：不使用正在运行的守护进程，也不读取系统配置层
+            "CCS_NO_DAEMON": "1",
+            "CCS_SYSTEM_CONFIG_DIR": "",
+        }
+
+    def command(self, entry: str):
+        """返回入口对应的 (argv, 额外环境变量)"""
+        if entry == "run":
+            return [str(self.ccs), "run", f"{self.profile}:{self.model}"], {}
+        if entry == "complete":
+            prefix = self.profile[:4]
+            return [str(self.ccs)], {
+                "_CCS_COMPLETE": "complete_bash",
+                "COMP_WORDS": f"ccs run {prefix}",
+                "COMP_CWORD": "2",
+            }
+        return [str(self.ccs), entry], {}
+
+    def run_once(self, entry: str, import_time: bool = False) -> Dict[str, float]:
+        """运行一次入口，返回墙钟时间、导入耗时（可选）和峰值RSS"""
+        argv, extra_env = self.command(entry)
+        env = dict(self.env, **extra_env)
+        if import_time:
+            env["PYTHONPROFILEIMPORTTIME"] = "1"
+
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE if import_time else subprocess.DEVNULL)
+        stderr = proc.stderr.read().decode("utf-8", "replace") if import_time else ""
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv[1:]) or entry} 退出码 {proc.returncode}")
+
+        result = {"wall_ms": wall * 1000, "rss_kb": float(rusage.ru_maxrss)}
+        if import_time:
+            result["import_ms"] = parse_import_time(stderr)
+        return result
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def parse_import_time(stderr: str) -> float:
+    """累加 -X importtime 输出中顶层模块的累计耗时（毫秒）"""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):
+            try:
+                total += int(cumulative)
+            except ValueError:
+                continue
+    return total / 1000
+
+
+def benchmark(sizes: List[int], entries: List[str], runs: int, import_runs: int,
+              list_size_limit: int = LIST_SIZE_LIMIT) -> Dict[str, Dict[str, float]]:
+    """运行基准测试，返回 {入口/配置数量: {指标_分位数: 值}}"""
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        sandbox = Sandbox(size)
+        try:
+            # 预热：首次运行解析配置并生成快照
+            sandbox.run_once("current")
+            for entry in entries:
+                if entry == "list" and size > list_size_limit:
+                    print(f"  {entry + '/' + str(size):<16} 跳过（超过 --list-size-limit {list_size_limit}）")
+                    continue
+                samples = [sandbox.run_once(entry) for _ in range(runs)]
+                imports = [sandbox.run_once(entry, import_time=True)["import_ms"] for _ in range(import_runs)]
+                stats = {}
+                for metric in ("wall_ms", "rss_kb"):
+                    values = [sample[metric] for sample in samples]
+                    for pct in (50, 90, 99):
+                        stats[f"{metric}_p{pct}"] = round(percentile(values, pct), 2)
+                stats["import_ms_p50"] = round(percentile(imports, 50), 2)
+                results[f"{entry}/{size}"] = stats
+                print(f"  {entry + '/' + str(size):<16} wall p50 {stats['wall_ms_p50']:8.1f} ms  "
+                      f"p90 {stats['wall_ms_p90']:8.1f} ms  import {stats['import_ms_p50']:7.1f} ms  "
+                      f"rss {stats['rss_kb_p50'] / 1024:6.1f} MB", flush=True)
+        finally:
+            sandbox.cleanup()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]],
+            tolerance: float, slack_ms: float) -> List[str]:
+    """与基线比较p50指标，返回回归描述列表"""
+    regressions = []
+    for key, stats in results.items():
+        baseline = baselines.get(key)
+        if not baseline:
+            continue
+        for metric in ("wall_ms_p50", "import_ms_p50", "rss_kb_p50"):
+            if metric not in baseline:
+                continue
+            slack = slack_ms if metric.endswith("ms_p50") else 0
+            limit = baseline[metric] * (1 + tolerance) + slack
+            if stats[metric] > limit:
+                regressions.append(f"{key} {metric}: {stats[metric]:.1f} > {limit:.1f} (基线 {baseline[metric]:.1f})")
+    return regressions
+
+
+def load_baselines(path: Path) -> Dict[str, Dict[str, float]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ccs 命令行端到端启动基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="合成配置数量")
+    parser.add_argument("--entries", nargs="+", default=ENTRIES, choices=ENTRIES, help="要测量的入口")
+    parser.add_argument("--runs", type=int, default=10, help="每个入口的计时运行次数")
+    parser.add_argument("--import-runs", type=int, default=3, help="每个入口测量导入耗时的运行次数")
+    parser.add_argument("--list-size-limit", type=int, default=LIST_SIZE_LIMIT,
+                        help="只在配置数量不超过该值时测量 list")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_FILE, help="基线文件路径")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="允许超出基线的比例")
+    parser.add_argument("--slack-ms", type=float, default=15.0, help="时间类指标额外允许的绝对误差（毫秒）")
+    parser.add_argument("--update-baselines", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    print(f"Python {sys.version.split()[0]}，每个入口运行 {args.runs} 次")
+    results = benchmark(args.sizes, args.entries, args.runs, args.import_runs, args.list_size_limit)
+
+    if args.update_baselines:
+        payload = {"python": sys.version.split()[0], "results": results}
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"基线已更新: {args.baselines}")
+        return 0
+
+    baselines = load_baselines(args.baselines)
+    if not baselines:
+        print(f"未找到基线 {args.baselines}，跳过比较（可使用 --update-baselines 生成）")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance, args.slack_ms)
+    if regressions:
+        print("\n性能回归:")
+        for line in regressions:
+            print(f"  ✗ {line}")
+        return 1
+    print("\n✓ 未发现性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""生成用于基准测试的合成配置数据。"""
+import random
+from typing import Optional
+
+PROVIDERS = ["deepseek", "anthropic", "moonshot", "zhipu", "qwen", "gateway", "proxy", "azure"]
+MODELS = [
+    ("chat", "chat-model"),
+    ("reasoner", "reasoner-model"),
+    ("coder", "coder-model"),
+    ("sonnet", "claude-sonnet"),
+    ("opus", "claude-opus"),
+    ("haiku", "claude-haiku"),
+]
+
+
+def make_config_data(profiles: int, models_per_profile: int = 3, seed: Optional[int] = 0) -> dict:
+    """生成包含指定数量配置的数据字典，结构与config.yaml一致"""
+    rng = random.Random(seed)
+    configs = {}
+    for i in range(profiles):
+        provider = PROVIDERS[i % len(PROVIDERS)]
+        name = f"{provider}-{i:05d}"
+        models = {}
+        for model_name, model_id in rng.sample(MODELS, min(models_per_profile, len(MODELS))):
+            models[model_name] = {
+                "model_id": f"{model_id}-{rng.randint(1, 9)}",
+                "small_fast_model": "",
+                "description": f"{provider} {model_name} 模型",
+            }
+        configs[name] = {
+            "api_key": f"sk-{rng.getrandbits(64):016x}",
+            "base_url": f"https://{provider}-{i % 17}.example.com/anthropic",
+            "timeout_ms": 600000,
+            "disable_nonessential_traffic": True,
+            "description": f"{provider} 第{i}号配置",
+            "models": models,
+            "default_model": next(iter(models)),
+        }
+    return {"configs": configs, "default_config": next(iter(configs), "")}
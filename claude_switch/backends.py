@@ -0,0 +1,184 @@
+"""
+配置文件格式后端模块
+
+根据文件扩展名或设置选择解析器：YAML 优先使用 libyaml 的 C 实现，
+JSON 和 TOML 使用标准库解析。所有后端在内容格式错误时抛出 ValueError。
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_FORMAT = "yaml"
+CONFIG_BASENAME = "config"
+
+
+class ConfigBackend:
+    """配置文件格式后端基类"""
+    name = ""
+    extensions: tuple = ()
+
+    def load(self, raw: bytes) -> dict:
+        """解析文件内容"""
+        raise NotImplementedError
+
+    def dump(self, data: dict) -> bytes:
+        """序列化为文件内容"""
+        raise NotImplementedError
+
+    def is_available(self) -> bool:
+        """当前环境是否可以使用该后端"""
+        return True
+
+
+class YamlBackend(ConfigBackend):
+    """YAML后端，libyaml可用时使用CSafeLoader/CSafeDumper"""
+    name = "yaml"
+    extensions = (".yaml", ".yml")
+
+    def __init__(self, prefer_c: bool = True):
+        self.prefer_c = prefer_c
+
+    def _loader_dumper(self):
+        import yaml
+        if self.prefer_c and getattr(yaml, "__with_libyaml__", False):
+            return yaml, yaml.CSafeLoader, yaml.CSafeDumper
+        return yaml, yaml.SafeLoader, yaml.SafeDumper
+
+    def load(self, raw: bytes) -> dict:
+        yaml, loader, _ = self._loader_dumper()
+        try:
+            return yaml.load(raw, Loader=loader) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(str(e)) from e
+
+    def dump(self, data: dict) -> bytes:
+        yaml, _, dumper = self._loader_dumper()
+        return yaml.dump(data, Dumper=dumper, default_flow_style=False,
+                         allow_unicode=True, sort_keys=False).encode('utf-8')
+
+    def is_available(self) -> bool:
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+
+class JsonBackend(ConfigBackend):
+    """JSON后端（标准库json）"""
+    name = "json"
+    extensions = (".json",)
+
+    def load(self, raw: bytes) -> dict:
+        if not raw.strip():
+            return {}
+        return json.loads(raw) or {}
+
+    def dump(self, data: dict) -> bytes:
+        return (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode('utf-8')
+
+
+def _import_tomllib():
+    """导入TOML解析器：Python 3.11+ 使用tomllib，更早版本尝试tomli"""
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            return None
+    return tomllib
+
+
+_BARE_KEY_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _toml_key(key: str) -> str:
+    return key if _BARE_KEY_RE.match(key) else json.dumps(key, ensure_ascii=False)
+
+
+def _toml_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_toml_value(item) for item in value) + "]"
+    raise ValueError(f"TOML不支持的值类型: {type(value).__name__}")
+
+
+def _dump_toml_table(data: dict, path: List[str], lines: List[str]) -> None:
+    tables = []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        elif value is not None:
+            lines.append(f"{_toml_key(str(key))} = {_toml_value(value)}")
+    for key, value in tables:
+        sub_path = path + [_toml_key(str(key))]
+        if lines:
+            lines.append("")
+        lines.append(f"[{'.'.join(sub_path)}]")
+        _dump_toml_table(value, sub_path, lines)
+
+
+class TomlBackend(ConfigBackend):
+    """TOML后端，读取使用标准库tomllib，写入使用内置的简单序列化"""
+    name = "toml"
+    extensions = (".toml",)
+
+    def load(self, raw: bytes) -> dict:
+        tomllib = _import_tomllib()
+        if tomllib is None:
+            raise ValueError("读取TOML配置需要Python 3.11+或安装tomli")
+        return tomllib.loads(raw.decode('utf-8'))
+
+    def dump(self, data: dict) -> bytes:
+        lines: List[str] = []
+        _dump_toml_table(data, [], lines)
+        return ("\n".join(lines) + "\n").encode('utf-8')
+
+    def is_available(self) -> bool:
+        return _import_tomllib() is not None
+
+
+BACKENDS: Dict[str, ConfigBackend] = {
+    backend.name: backend for backend in (YamlBackend(), JsonBackend(), TomlBackend())
+}
+
+
+def get_backend(name: str) -> ConfigBackend:
+    """按名称获取后端"""
+    backend = BACKENDS.get(name.lower().lstrip("."))
+    if backend is None:
+        for candidate in BACKENDS.values():
+            if f".{name.lower().lstrip('.')}" in candidate.extensions:
+                return candidate
+        raise ValueError(f"不支持的配置格式: {name}（可选: {', '.join(BACKENDS)}）")
+    return backend
+
+
+def backend_for_path(path: Path) -> ConfigBackend:
+    """根据文件扩展名选择后端"""
+    suffix = path.suffix.lower()
+    for backend in BACKENDS.values():
+        if suffix in backend.extensions:
+            return backend
+    raise ValueError(f"无法识别配置文件格式: {path.name}")
+
+
+def resolve_config_file(config_dir: Path, config_format: Optional[str] = None) -> Path:
+    """确定配置文件路径：指定格式时直接使用，否则选择已存在的配置文件，默认YAML"""
+    if config_format:
+        backend = get_backend(config_format)
+        return config_dir / f"{CONFIG_BASENAME}{backend.extensions[0]}"
+
+    for backend in BACKENDS.values():
+        for extension in backend.extensions:
+            candidate = config_dir / f"{CONFIG_BASENAME}{extension}"
+            if candidate.exists():
+                return candidate
+    return config_dir / f"{CONFIG_BASENAME}{BACKENDS[DEFAULT_FORMAT].extensions[0]}"
@@ -0,0 +1,112 @@
+"""
+命令行入口
+
+`ccs run`、`ccs env` 和 `ccs shell-init` 是最常用（或在每个Shell启动时运行）的命令，
+`ccs list/current --format` 供脚本调用，这里在导入 typer 之前先尝试直接解析其参数，使启动开销接近解释器本身；
+其余命令和补全请求交给 typer 应用处理。
+"""
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def parse_args(argv: List[str], options: Sequence[str], positional: bool = True,
+               flags: Sequence[str] = ()) -> Optional[Tuple[Optional[str], Dict[str, str]]]:
+    """解析最多一个位置参数、若干 `--name value`/`--name=value` 选项和 `--flag` 开关
+
+    开关出现时以空字符串记录在结果中；遇到无法识别的形式时返回None交给typer处理。
+    """
+    value: Optional[str] = None
+    parsed: Dict[str, str] = {}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        name = arg[2:].split("=", 1)[0] if arg.startswith("--") else None
+        if name in flags and "=" not in arg:
+            parsed[name] = ""
+            i += 1
+            continue
+        if name in options:
+            if "=" in arg:
+                parsed[name] = arg.split("=", 1)[1]
+                i += 1
+                continue
+            if i + 1 >= len(argv):
+                return None
+            parsed[name] = argv[i + 1]
+            i += 2
+            continue
+        if arg.startswith("-") or not positional or value is not None:
+            return None
+        value = arg
+        i += 1
+    return value, parsed
+
+
+RunArgs = Tuple[Optional[str], Optional[str], Optional[bool], bool, bool, Optional[str]]
+
+
+def parse_run_args(argv: List[str]) -> Optional[RunArgs]:
+    """解析 `run` 子命令参数，返回 (配置:模型, 参数, 是否exec, 是否经过代理, 是否跳过响应缓存, 耗时报告格式)
+
+    无法识别时返回None交给typer处理。
+    """
+    parsed = parse_args(argv, ("args",), flags=("exec", "subprocess", "via-proxy", "no-cache",
+                                                "timings", "timings-json"))
+    if parsed is None:
+        return None
+    config_model, options = parsed
+    if "exec" in options and "subprocess" in options:
+        return None
+    exec_mode = True if "exec" in options else False if "subprocess" in options else None
+    timings = "json" if "timings-json" in options else "text" if "timings" in options else None
+    return (config_model, options.get("args"), exec_mode, "via-proxy" in options, "no-cache" in options,
+            timings)
+
+
+def main() -> None:
+    """主函数入口"""
+    argv = sys.argv[1:]
+    command, rest = (argv[0], argv[1:]) if argv else ("", [])
+    if command == "run":
+        parsed_run = parse_run_args(rest)
+        if parsed_run is not None:
+            from claude_switch.timings import recorder
+            config_model, args, exec_mode, via_proxy, no_cache, timings = parsed_run
+            if timings:
+                recorder.enable(timings)
+            with recorder.span("import"):
+                from claude_switch.commands import use_config_impl
+            use_config_impl(config_model, args, exec_mode, via_proxy=via_proxy, no_cache=no_cache, timings=timings)
+            return
+    elif command == "env":
+        parsed = parse_args(rest, ("shell",))
+        if parsed is not None:
+            from claude_switch.commands import env_config_impl
+            env_config_impl(parsed[0], parsed[1].get("shell", "bash"))
+            return
+    elif command in ("list", "ls", "current"):
+        # 机器可读输出不需要typer和rich
+        names = ("format", "fields") if command == "current" else ("format", "name", "fields")
+        parsed = parse_args(rest, names, positional=False)
+        if parsed is not None and "format" in parsed[1]:
+            options = parsed[1]
+            if command == "current":
+                from claude_switch.commands import current_config_impl
+                current_config_impl(options["format"], options.get("fields"))
+            else:
+                from claude_switch.commands import list_configs_impl
+                list_configs_impl(options["format"], options.get("name"), options.get("fields"))
+            return
+    elif command == "shell-init":
+        parsed = parse_args(rest, ("shell",), positional=False)
+        if parsed is not None:
+            from claude_switch.commands import shell_init_impl
+            shell_init_impl(parsed[1].get("shell", "bash"))
+            return
+
+    from claude_switch.main import app
+    app()
+
+
+if __name__ == "__main__":
+    main()
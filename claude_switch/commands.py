@@ -3,21 +3,119 @@ Claude Code切换器命令实现模块
 """
 import subprocess
 import os
-from typing import Optional
-from rich import print
-from rich.table import Table
-from claude_switch.config import config_manager
+import re
+import sys
+import time
+from typing import Dict, List, NoReturn, Optional, Tuple
+from claude_switch import daemon
+from claude_switch.config import ClaudeConfig, config_manager, default_config_dir, resolve_run_target, target_exists
+from claude_switch.launcher import exec_claude, launch_mode, resolve_binary
+from claude_switch.timings import recorder
+
+_ANSI_STYLES = {"bold": "1", "dim": "2", "red": "31", "green": "32", "yellow": "33", "blue": "34", "cyan": "36"}
+_MARKUP_RE = re.compile(r"\[(/?)([a-z ]+)\]")
+# 模糊匹配时列出的候选项数量，以及得分在最高分的该倍数以内时视为难以区分
+FUZZY_CHOICES = 9
+FUZZY_AMBIGUITY_RATIO = 1.25
+
+
+def _render_markup(text: str, color: bool) -> str:
+    """将简单的rich风格标记转换为ANSI颜色（或直接去除）"""
+    def replace(match):
+        closing, names = match.group(1), match.group(2).split()
+        if not names or any(name not in _ANSI_STYLES for name in names):
+            return match.group(0)
+        if not color:
+            return ""
+        if closing:
+            return "\033[0m"
+        return "".join(f"\033[{_ANSI_STYLES[name]}m" for name in names)
+
+    return _MARKUP_RE.sub(replace, text)
+
+
+def print(*args, **kwargs) -> None:
+    """输出信息：纯文本消息使用轻量渲染，表格等对象才导入rich"""
+    if kwargs or not all(isinstance(arg, str) for arg in args):
+        from rich import print as rich_print
+        rich_print(*args, **kwargs)
+        return
+
+    color = sys.stdout.isatty() and "NO_COLOR" not in os.environ
+    sys.stdout.write(" ".join(_render_markup(arg, color) for arg in args) + "\n")
+    sys.stdout.flush()
+
 
+def _load_listing() -> Tuple[Optional[str], Dict[str, ClaudeConfig], List[str]]:
+    """获取 (加载错误, 所有配置, 被跳过的配置层)，守护进程运行时从守护进程获取"""
+    try:
+        listing = daemon.query("list")
+    except daemon.DaemonError:
+        listing = None
+    if listing is None:
+        load_error = config_manager.get_load_error()
+        configs = {} if load_error else config_manager.list_configs()
+        return load_error, configs, list(config_manager.get_layer_errors())
+    configs = {name: ClaudeConfig.from_dict(data) for name, data in listing["configs"].items()}
+    return listing["load_error"], configs, listing.get("layer_errors", [])
+
+
+def _write_machine_output(records, output_format: str, fields: Optional[str], available) -> None:
+    """以 json/jsonl/tsv 逐条输出记录，不经过rich"""
+    from claude_switch.output import parse_fields, write_records
+    try:
+        selected = parse_fields(fields, available)
+        write_records(records, output_format, selected, sys.stdout)
+    except ValueError as e:
+        _fail(str(e))
 
-def list_configs_impl() -> None:
-    """列出所有配置及详情"""
+
+def _list_records(output_format: str, name: Optional[str], fields: Optional[str]) -> None:
+    """逐个解码配置并输出机器可读记录，指定 name 时只解码该配置"""
+    from claude_switch.output import PROFILE_FIELDS, profile_record
     load_error = config_manager.get_load_error()
+    if load_error:
+        _fail(f"配置文件加载失败: {load_error}")
+
+    default_name = config_manager.get_default_config_name()
+    if name:
+        config = config_manager.get_config(name)
+        if config is None:
+            _fail(f"配置 '{name}' 不存在")
+        items = iter([(name, config)])
+    else:
+        items = config_manager.iter_configs()
+    records = (profile_record(config_name, config, config_name == default_name) for config_name, config in items)
+    _write_machine_output(records, output_format, fields, PROFILE_FIELDS)
+
+
+def list_configs_impl(output_format: Optional[str] = None, name: Optional[str] = None,
+                      fields: Optional[str] = None) -> None:
+    """列出所有配置及详情
+
+    output_format 为 json/jsonl/tsv 时输出机器可读记录，否则用rich表格展示。
+    """
+    if output_format:
+        _list_records(output_format, name, fields)
+        return
+    if fields:
+        _fail("--fields 需要与 --format 一起使用")
+
+    from rich.table import Table
+
+    load_error, configs, layer_errors = _load_listing()
     if load_error:
         print(f"[red]✗[/red] 配置文件加载失败: {load_error}")
         print("[yellow]![/yellow] 请使用 'ccs edit' 修复配置文件后重试")
         return
+    for layer_error in layer_errors:
+        print(f"[yellow]![/yellow] 已跳过无法加载的配置片段: {layer_error}")
 
-    configs = config_manager.list_configs()
+    if name:
+        if name not in configs:
+            print(f"[red]✗[/red] 配置 '{name}' 不存在")
+            return
+        configs = {name: configs[name]}
 
     if not configs:
         print("[yellow]暂无配置，请使用 'ccs edit' 编辑配置文件[/yellow]")
@@ -35,6 +133,10 @@ def list_configs_impl() -> None:
         table.add_row("超时时间", f"{config.timeout_ms}ms")
         table.add_row("禁用非必要流量", "是" if config.disable_nonessential_traffic else "否")
         table.add_row("描述", config.description or "[dim]无[/dim]")
+        if not config.api_key and (config.api_key_env or config.api_key_cmd):
+            sources = ([f"环境变量 {config.api_key_env}"] if config.api_key_env else []) + \
+                      ([f"命令 {config.api_key_cmd}"] if config.api_key_cmd else [])
+            table.add_row("API密钥来源", "，其次".join(sources))
 
         print(table)
 
@@ -94,75 +196,779 @@ def edit_config_impl() -> None:
     try:
         subprocess.run(["vim", config_file])
         print(f"[green]✓[/green] 配置文件编辑完成")
+        config_manager.reload()
+        config_manager.refresh_completion_scripts()
     except FileNotFoundError:
         print(f"[red]✗[/red] 未找到vim编辑器，请确保vim已安装")
     except KeyboardInterrupt:
         print("\n[yellow]![/yellow] 已退出vim编辑")
 
 
+def _fail(message: str) -> NoReturn:
+    """向stderr输出错误并以非零状态退出（stdout保留给eval使用）"""
+    color = sys.stderr.isatty() and "NO_COLOR" not in os.environ
+    sys.stderr.write(_render_markup(f"[red]✗[/red] {message}", color) + "\n")
+    sys.exit(1)
+
+
+def _resolve_run_target(config_model: Optional[str]) -> Tuple[str, str, Dict[str, str], List[str]]:
+    """解析 配置[:模型]：守护进程运行时由其解析，否则在进程内加载配置
+
+    守护进程只返回密钥来源，api_key_env/api_key_cmd 在当前进程中解析。
+    """
+    with recorder.span("daemon.query"):
+        resolved = daemon.query("env", config_model=config_model)
+    if resolved is None:
+        return resolve_run_target(config_manager, config_model)
+    config_name, model, env_vars, fallbacks = resolved[:4]
+    source = resolved[4] if len(resolved) > 4 else None
+    if source:
+        from claude_switch.credentials import resolve_key_source
+        env_vars["ANTHROPIC_API_KEY"] = resolve_key_source(source)
+    return config_name, model, env_vars, fallbacks
+
+
+def _search(query: str, limit: Optional[int]) -> List[dict]:
+    """模糊搜索 config:model：守护进程运行时由其在内存中的索引查询，否则在进程内加载索引"""
+    results = daemon.query("search", query=query, limit=limit)
+    if results is None:
+        results = [result.to_dict() for result in config_manager.search(query, limit)]
+    return results
+
+
+def _is_exact_target(config_model: str) -> bool:
+    """配置[:模型] 是否存在：守护进程运行时由其回答，否则在进程内加载配置"""
+    try:
+        exists = daemon.query("exists", config_model=config_model)
+    except daemon.DaemonError:
+        exists = None
+    if exists is None:
+        exists = target_exists(config_manager, config_model)
+    return bool(exists)
+
+
+def _fuzzy_target(query: Optional[str]) -> Optional[str]:
+    """为不存在的 配置[:模型] 选择模糊匹配的目标
+
+    唯一或明显领先的结果直接使用；得分相近的结果都属于同一配置且查询中没有指定模型时使用该配置的默认模型；
+    否则在终端中列出候选项供选择，非交互环境下抛出列出候选项的ValueError。
+    没有匹配结果或名称本身存在（错误来自其他原因）时返回None。
+    """
+    if not query or _is_exact_target(query):
+        return None
+    results = _search(query, FUZZY_CHOICES)
+    if not results:
+        return None
+
+    top = results[0]["score"]
+    close = [result for result in results if result["score"] * FUZZY_AMBIGUITY_RATIO >= top]
+    if len(close) == 1:
+        target = close[0]["name"]
+    elif ":" not in query and len({result["config"] for result in close}) == 1:
+        target = close[0]["config"]
+    else:
+        target = _choose_target(query, results)
+    print(f"[dim]'{query}' 匹配到 {target}[/dim]")
+    return target
+
+
+def _choose_target(query: str, results: List[dict]) -> str:
+    """列出候选项并读取用户的选择，非交互环境下抛出ValueError"""
+    lines = [f"  {i}. {result['name']}  ({result['model_id']})" for i, result in enumerate(results, 1)]
+    if not sys.stdin.isatty():
+        raise ValueError(f"'{query}' 匹配到多个配置，请指定更精确的名称:\n" + "\n".join(lines))
+    print(f"[yellow]?[/yellow] '{query}' 匹配到多个配置:")
+    for line in lines:
+        print(line)
+    try:
+        answer = input(f"选择 [1-{len(results)}]: ").strip()
+    except EOFError:
+        answer = ""
+    if not answer.isdigit() or not 1 <= int(answer) <= len(results):
+        raise ValueError("未选择配置")
+    return results[int(answer) - 1]["name"]
+
+
+def search_impl(query: str, limit: int = 20, as_json: bool = False) -> None:
+    """模糊搜索配置和模型实现"""
+    load_error = config_manager.get_load_error()
+    if load_error:
+        _fail(f"配置文件加载失败: {load_error}")
+    results = _search(query, limit)
+    if as_json:
+        import json
+        sys.stdout.write(json.dumps(results, ensure_ascii=False, indent=2) + "\n")
+        return
+    if not results:
+        print(f"[yellow]没有与 '{query}' 匹配的配置[/yellow]")
+        return
+
+    from rich.table import Table
+    table = Table(title=f"搜索: {query}")
+    table.add_column("配置:模型", style="cyan")
+    table.add_column("模型ID", style="green")
+    table.add_column("描述", style="white")
+    table.add_column("得分", style="dim", justify="right")
+    for result in results:
+        table.add_row(result["name"], result["model_id"], result["description"], f"{result['score']:.2f}")
+    print(table)
+
+
+def _pick_fastest(model: str) -> Optional[str]:
+    """根据探测结果选择提供该模型且延迟最低的配置，返回 配置:模型"""
+    from claude_switch.probe import (cache_ttl, load_results, model_candidates, probe_urls,
+                                     select_fastest, store_results)
+
+    candidates = model_candidates(config_manager, model)
+    if not candidates:
+        print(f"[red]✗[/red] 没有配置提供模型 '{model}'")
+        return None
+
+    results = load_results(config_manager.cache_dir, cache_ttl())
+    missing = [base_url for _, _, base_url in candidates if base_url not in results]
+    if missing:
+        print(f"[green]→[/green] 探测 {len(set(missing))} 个端点的延迟...")
+        fresh = probe_urls(missing)
+        store_results(config_manager.cache_dir, fresh)
+        results.update(fresh)
+
+    best = select_fastest(candidates, results)
+    if best is None:
+        print(f"[red]✗[/red] 提供模型 '{model}' 的端点均不可达，请使用 'ccs probe' 查看详情")
+        return None
+    config_name, model_name, result = best
+    print(f"[green]→[/green] 最快的配置: '{config_name}' ({result.total_ms:.0f}ms)")
+    return f"{config_name}:{model_name}"
+
+
+def _apply_failover(config_name: str, model: str) -> Optional[Tuple[str, str]]:
+    """在配置了fallbacks的目标及其备用目标中选择第一个可达的，全部不可达时返回None"""
+    from claude_switch.failover import CircuitBreaker, check_timeout, failover_chain, select_target
+    chain = failover_chain(config_manager, config_name, model)
+    target, skipped = select_target(config_manager, chain, CircuitBreaker(config_manager.cache_dir),
+                                    check_timeout())
+    for (name, skipped_model), reason in skipped:
+        print(f"[yellow]![/yellow] 跳过 '{name}:{skipped_model}'：{reason}")
+    if target is None:
+        print(f"[red]✗[/red] '{config_name}:{model}' 及其备用配置均不可达")
+    return target
+
+
 def use_config_impl(
     config_model: Optional[str] = None,
-    args: Optional[str] = None
+    args: Optional[str] = None,
+    exec_mode: Optional[bool] = None,
+    fastest: Optional[str] = None,
+    via_proxy: bool = False,
+    no_cache: bool = False,
+    timings: Optional[str] = None
 ) -> None:
-    """使用指定配置启动Claude Code实现"""
+    """使用指定配置启动Claude Code实现
+
+    timings 为 "text" 或 "json" 时（或设置了 CCS_TIMINGS），在标准错误输出启动各阶段耗时和claude子进程的资源使用。
+    """
+    if timings:
+        recorder.enable(timings)
+
+    if no_cache and not via_proxy:
+        print("[red]✗[/red] --no-cache 需要与 --via-proxy 一起使用")
+        return
 
-    model: Optional[str] = None
-    if not config_model:
-        default_config = config_manager.get_default_config()
-        if not default_config:
-            print(f"[red]✗[/red] 未设置默认配置，请使用 'ccs run <配置名称>' 或先在配置文件中设置 default_config")
+    proxy_state = None
+    if via_proxy:
+        from claude_switch.proxy import read_state
+        if fastest:
+            print("[red]✗[/red] --fastest 不能与 --via-proxy 同时使用")
             return
-        config_name = config_manager.get_default_config_name()
-        config = default_config
+        proxy_state = read_state(config_manager.cache_dir)
+        if proxy_state is None:
+            print("[red]✗[/red] 本地代理未运行，请先运行 'ccs proxy <配置:模型>...'")
+            return
+        config_model = config_model or proxy_state["targets"][0]
+
+    if fastest:
+        if config_model:
+            print("[red]✗[/red] --fastest 不能与 配置:模型 同时使用")
+            return
+        config_model = _pick_fastest(fastest)
+        if not config_model:
+            return
+
+    try:
+        try:
+            with recorder.span("resolve"):
+                config_name, model, env_vars, fallbacks = _resolve_run_target(config_model)
+        except (ValueError, daemon.DaemonError):
+            # 没有完全匹配的 配置[:模型] 时模糊匹配
+            matched = _fuzzy_target(config_model)
+            if matched is None:
+                raise
+            with recorder.span("resolve"):
+                config_name, model, env_vars, fallbacks = _resolve_run_target(matched)
+        if fallbacks and proxy_state is None:
+            with recorder.span("failover"):
+                target = _apply_failover(config_name, model)
+            if target is None:
+                return
+            if target != (config_name, model):
+                with recorder.span("resolve"):
+                    config_name, model, env_vars, _ = _resolve_run_target(f"{target[0]}:{target[1]}")
+    except (ValueError, daemon.DaemonError) as e:
+        print(f"[red]✗[/red] {e}")
+        return
+
+    if proxy_state is not None:
+        # 由代理选择上游并注入其API密钥
+        env_vars = dict(env_vars, ANTHROPIC_BASE_URL=proxy_state["url"], ANTHROPIC_API_KEY=proxy_state["token"])
+        if no_cache:
+            # Claude Code 会在每个请求中附加 ANTHROPIC_CUSTOM_HEADERS（每行一个头部）
+            from claude_switch.response_cache import BYPASS_HEADER
+            custom_headers = os.environ.get("ANTHROPIC_CUSTOM_HEADERS", "")
+            env_vars["ANTHROPIC_CUSTOM_HEADERS"] = "\n".join(
+                filter(None, [custom_headers, f"{BYPASS_HEADER}: bypass"]))
+        print(f"[green]→[/green] 通过本地代理 {proxy_state['url']} 启动Claude Code...")
     else:
-        if ":" in config_model:
-            config_name, model = config_model.split(":", 1)
+        print(f"[green]→[/green] 使用配置 '{config_name}' 模型 '{model}' 启动Claude Code...")
+
+    with recorder.span("env"):
+        from claude_switch.shell_env import apply_env_vars
+        current_env = apply_env_vars(env_vars, os.environ)
+
+        claude_args = []
+        if args:
+            import shlex
+            claude_args = shlex.split(args)
+
+    if launch_mode(exec_mode) == "exec":
+        # 用claude替换当前进程，会话期间不保留Python父进程
+        with recorder.span("binary lookup"):
+            claude_path = resolve_binary(default_config_dir() / "cache")
+        if claude_path is None:
+            print(f"[red]✗[/red] 未找到Claude Code命令，请确保已安装Claude Code")
+            return
+        with recorder.span("history"):
+            from claude_switch.history import record_session
+            record_session(default_config_dir(), config_name, model, time.time(), mode="exec")
+        # exec之后无法再统计子进程，先输出启动阶段的耗时
+        recorder.emit()
+        try:
+            exec_claude(claude_path, claude_args, current_env)
+        except OSError as e:
+            print(f"[red]✗[/red] 启动Claude Code失败: {e}")
+        return
+
+    claude_command = ["claude"] + claude_args
+    started = time.time()
+    exit_code: Optional[int] = None
+    if proxy_state is None:
+        _warm_default_api_key()
+    try:
+        if recorder.enabled:
+            from claude_switch.launcher import run_with_usage
+            exit_code, wall, usage = run_with_usage(claude_command, current_env)
+            recorder.record_child(wall, exit_code, usage)
         else:
-            config_name = config_model
-            model = None
+            exit_code = subprocess.run(claude_command, env=current_env).returncode
+    except FileNotFoundError:
+        print(f"[red]✗[/red] 未找到Claude Code命令，请确保已安装Claude Code")
+        recorder.emit()
+        return
+    except KeyboardInterrupt:
+        print("\n[yellow]![/yellow] 已退出Claude Code")
+    # claude 退出后才写入历史，不占用启动时间
+    from claude_switch.history import record_session
+    record_session(default_config_dir(), config_name, model, started, time.time(), exit_code)
+    recorder.emit()
+
+
+def _warm_default_api_key() -> None:
+    """claude 运行期间在后台刷新默认配置即将过期的 api_key_cmd 密钥缓存"""
+    if config_manager.get_load_error() is not None:
+        return
+    from claude_switch.credentials import warm
+    warm(config_manager.get_default_config())
 
-        config = config_manager.get_config(config_name)
-        if not config:
-            print(f"[red]✗[/red] 配置 '{config_name}' 不存在")
+
+def env_config_impl(config_model: Optional[str] = None, shell: str = "bash") -> None:
+    """输出切换到指定配置的环境变量语句实现"""
+    from claude_switch.shell_env import SHELLS, env_changes, render_env
+    if shell not in SHELLS:
+        _fail(f"不支持的Shell: {shell}（可选: {', '.join(SHELLS)}）")
+
+    try:
+        _, _, env_vars, _ = _resolve_run_target(config_model)
+    except (ValueError, daemon.DaemonError) as e:
+        _fail(str(e))
+
+    exports, unsets = env_changes(env_vars, os.environ)
+    sys.stdout.write(render_env(shell, exports, unsets))
+
+
+def shell_init_impl(shell: str = "bash") -> None:
+    """输出定义 ccs-use 函数的Shell初始化脚本实现"""
+    from claude_switch.shell_env import INIT_SHELLS, shell_init_script
+    if shell not in INIT_SHELLS:
+        _fail(f"不支持的Shell: {shell}（可选: {', '.join(INIT_SHELLS)}）")
+    sys.stdout.write(shell_init_script(shell))
+
+
+def probe_impl(timeout: Optional[float] = None) -> None:
+    """并发探测所有端点延迟并缓存结果实现"""
+    from rich.table import Table
+    from claude_switch.probe import DEFAULT_TIMEOUT, probe_urls, store_results
+
+    configs = config_manager.list_configs()
+    url_configs: Dict[str, List[str]] = {}
+    for config_name, config in configs.items():
+        url_configs.setdefault(config.base_url, []).append(config_name)
+    if not url_configs:
+        print("[yellow]暂无配置，请使用 'ccs edit' 编辑配置文件[/yellow]")
+        return
+
+    timeout = timeout or DEFAULT_TIMEOUT
+    print(f"[green]→[/green] 并发探测 {len(url_configs)} 个端点（超时 {timeout:g}s）...")
+    results = probe_urls(url_configs, timeout)
+    store_results(config_manager.cache_dir, results)
+
+    def ms(value: Optional[float]) -> str:
+        return f"{value:.0f}" if value is not None else "-"
+
+    table = Table(title="端点延迟 (ms)")
+    table.add_column("端点", style="cyan")
+    table.add_column("配置", style="white")
+    for column in ("DNS", "连接", "TLS", "首字节", "总计"):
+        table.add_column(column, justify="right")
+    table.add_column("状态")
+
+    ordered = sorted(results.values(), key=lambda r: (not r.ok, r.total_ms or 0))
+    for result in ordered:
+        status = f"[green]{result.status or 'ok'}[/green]" if result.ok else f"[red]{result.error}[/red]"
+        table.add_row(result.base_url, ", ".join(url_configs[result.base_url]), ms(result.dns_ms),
+                      ms(result.connect_ms), ms(result.tls_ms), ms(result.first_byte_ms),
+                      ms(result.total_ms), status)
+    print(table)
+
+
+def fanout_impl(
+    targets: List[str],
+    prompt_file: Optional[str] = None,
+    jobs: Optional[int] = None,
+    output_dir: Optional[str] = None,
+    args: Optional[str] = None
+) -> None:
+    """将同一提示词并发发送给多个 config:model 目标实现"""
+    from pathlib import Path
+    from rich.table import Table
+    from claude_switch.fanout import DEFAULT_JOBS, FanoutTarget, default_output_dir, run_fanout
+    from claude_switch.shell_env import apply_env_vars
+
+    if not targets:
+        _fail("请至少指定一个 config:model 目标")
+
+    if prompt_file and prompt_file != "-":
+        try:
+            with open(prompt_file, 'rb') as f:
+                prompt = f.read()
+        except OSError as e:
+            _fail(f"无法读取提示词文件: {e}")
+    elif prompt_file == "-" or not sys.stdin.isatty():
+        prompt = sys.stdin.buffer.read()
+    else:
+        _fail("请通过 --prompt-file 或标准输入提供提示词")
+
+    fanout_targets = []
+    for target in targets:
+        try:
+            _, _, env_vars, _ = _resolve_run_target(target)
+        except (ValueError, daemon.DaemonError) as e:
+            fanout_targets.append(FanoutTarget(target, error=str(e)))
+            continue
+        fanout_targets.append(FanoutTarget(target, apply_env_vars(env_vars, os.environ)))
+
+    command = [resolve_binary(default_config_dir() / "cache") or "claude", "--print"]
+    if args:
+        import shlex
+        command.extend(shlex.split(args))
+
+    out_dir = Path(output_dir) if output_dir else default_output_dir()
+    jobs = jobs or min(len(targets), DEFAULT_JOBS)
+    print(f"[green]→[/green] 并发运行 {len(targets)} 个目标（并发数 {jobs}），输出目录: {out_dir}")
+
+    def on_result(result) -> None:
+        mark = "[green]✓[/green]" if result.ok else "[red]✗[/red]"
+        print(f"  {mark} {result.target} ({result.wall_ms / 1000:.1f}s)")
+
+    start = time.perf_counter()
+    results = run_fanout(fanout_targets, prompt, out_dir, command, jobs, on_result)
+    total = time.perf_counter() - start
+
+    table = Table(title="运行汇总")
+    table.add_column("目标", style="cyan")
+    table.add_column("退出码", justify="right")
+    table.add_column("耗时", justify="right")
+    table.add_column("输出", style="white")
+    for result in results:
+        exit_code = str(result.exit_code) if result.exit_code is not None else "-"
+        style = "green" if result.ok else "red"
+        output = str(result.output_path) if result.output_path else result.error
+        table.add_row(result.target, f"[{style}]{exit_code}[/{style}]",
+                      f"{result.wall_ms / 1000:.2f}s" if result.output_path else "-", output)
+    print(table)
+
+    failed = sum(1 for result in results if not result.ok)
+    print(f"总耗时 {total:.2f}s，成功 {len(results) - failed} 个，失败 {failed} 个")
+    if failed:
+        sys.exit(1)
+
+
+def proxy_impl(
+    targets: List[str],
+    model: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    strategy: str = "round-robin",
+    cache: Optional[str] = None,
+    cache_size: Optional[int] = None,
+    cache_ttl: Optional[float] = None,
+    watch: bool = True
+) -> None:
+    """运行本地负载均衡代理实现"""
+    from claude_switch.proxy import DEFAULT_HOST, ProxyServer, UpstreamPool, build_upstreams, default_port, serve
+
+    targets = list(targets or [])
+    if model:
+        from claude_switch.probe import model_candidates
+        targets += [f"{config_name}:{model_name}"
+                    for config_name, model_name, _ in model_candidates(config_manager, model)]
+        if not targets:
+            _fail(f"没有配置提供模型 '{model}'")
+    if not targets:
+        _fail("请指定至少一个 config:model 目标或使用 --model")
+
+    try:
+        pool = UpstreamPool(build_upstreams(config_manager, targets), strategy)
+    except ValueError as e:
+        _fail(str(e))
+
+    response_cache = None
+    if cache:
+        from claude_switch.response_cache import (CACHE_MODES, DEFAULT_MAX_BYTES, RESPONSES_DIR_NAME,
+                                                  ResponseCache, cache_ttl as default_cache_ttl)
+        if cache not in CACHE_MODES:
+            _fail(f"不支持的缓存模式: {cache}（可选: {', '.join(CACHE_MODES)}）")
+        max_bytes = cache_size * 1024 * 1024 if cache_size else DEFAULT_MAX_BYTES
+        response_cache = ResponseCache(config_manager.cache_dir / RESPONSES_DIR_NAME, max_bytes,
+                                       default_cache_ttl() if cache_ttl is None else cache_ttl)
+
+    server = ProxyServer(pool, host=host or DEFAULT_HOST, port=default_port() if port is None else port,
+                         cache=response_cache, cache_mode=cache or "deterministic")
+    watchers = []
+
+    def on_ready(server) -> None:
+        print(f"[green]✓[/green] 代理已启动: {server.url}（{strategy}，Ctrl+C 停止）")
+        for upstream in pool.upstreams:
+            print(f"  [cyan]{upstream.name}[/cyan] → {upstream.base_url} ({upstream.model_id})")
+        if response_cache is not None:
+            print(f"响应缓存: {response_cache.directory}（{cache}，"
+                  f"上限 {response_cache.max_bytes // (1024 * 1024)}MB，有效期 {response_cache.ttl:g}s）")
+        if watch:
+            watchers.append(_watch_proxy_upstreams(server, targets, strategy))
+        print("使用 'ccs run --via-proxy' 通过代理启动Claude Code")
+
+    try:
+        serve(server, config_manager.cache_dir, targets, on_ready)
+    except OSError as e:
+        _fail(f"代理启动失败: {e}")
+    finally:
+        for watcher in watchers:
+            watcher.stop()
+
+
+def _watch_proxy_upstreams(server, targets: List[str], strategy: str):
+    """配置变化时重新构建代理的上游池（在代理的事件循环中调用）"""
+    import asyncio
+    from claude_switch.proxy import UpstreamPool, build_upstreams
+    from claude_switch.watcher import ConfigWatcher
+
+    loop = asyncio.get_running_loop()
+
+    def on_change(diff) -> None:
+        try:
+            pool = UpstreamPool(build_upstreams(config_manager, targets, server.pool), strategy)
+        except ValueError as e:
+            print(f"[yellow]![/yellow] 配置已变化，但无法重新构建上游，继续使用原来的上游: {e}")
             return
+        loop.call_soon_threadsafe(server.replace_pool, pool)
+        print(f"[green]✓[/green] 配置已重新加载（{_describe_diff(diff)}）")
+
+    def on_error(message: str) -> None:
+        print(f"[yellow]![/yellow] {message}")
+
+    return ConfigWatcher(config_manager, on_change, on_error).start()
+
+
+def _describe_diff(diff) -> str:
+    parts = [f"{label}: {', '.join(names)}" for label, names in
+             (("新增", diff.added), ("删除", diff.removed), ("修改", diff.changed)) if names]
+    if diff.default_changed:
+        parts.append("默认配置已变化")
+    return "；".join(parts)
+
+
+def proxy_stats_impl(as_json: bool = False) -> None:
+    """显示正在运行的代理的统计信息实现"""
+    from claude_switch.proxy import fetch_stats, read_state
+
+    state = read_state(config_manager.cache_dir)
+    if state is None:
+        _fail("本地代理未运行")
+    try:
+        stats = fetch_stats(state)
+    except (OSError, ValueError) as e:
+        _fail(f"无法获取代理统计信息: {e}")
+
+    if as_json:
+        import json
+        sys.stdout.write(json.dumps(stats, ensure_ascii=False, indent=2) + "\n")
+        return
+
+    from rich.table import Table
+    print(f"[green]→[/green] 代理 {state['url']}（{stats['strategy']}）")
+    table = Table(title="上游")
+    table.add_column("上游", style="cyan")
+    for column in ("请求", "失败", "未完成", "连接", "空闲连接"):
+        table.add_column(column, justify="right")
+    for upstream in stats["upstreams"]:
+        table.add_row(upstream["name"], *(str(upstream[key]) for key in
+                                          ("requests", "failures", "outstanding", "connections", "idle")))
+    print(table)
+
+    if stats["rate_limits"]:
+        table = Table(title="速率限制")
+        table.add_column("配置", style="cyan")
+        table.add_column("限制 (rpm/tpm/并发)", justify="right")
+        for column in ("进行中", "排队", "最大排队", "已放行", "平均等待", "最大等待"):
+            table.add_column(column, justify="right")
+        for config_name, limit in stats["rate_limits"].items():
+            limits = "/".join(str(limit[key]) if limit[key] else "-" for key in
+                              ("requests_per_minute", "tokens_per_minute", "max_concurrent"))
+            table.add_row(config_name, limits, str(limit["active"]), str(limit["queue_depth"]),
+                          str(limit["max_queue_depth"]), str(limit["admitted"]),
+                          f"{limit['avg_wait_s']:.2f}s", f"{limit['max_wait_s']:.2f}s")
+        print(table)
+
+    cache = stats.get("cache")
+    if cache:
+        print(f"响应缓存（{cache['mode']}）: 命中 {cache['hits']}，未命中 {cache['misses']}，"
+              f"淘汰 {cache['evictions']}，占用 {cache['bytes'] / (1024 * 1024):.1f}MB")
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    """将秒数格式化为 1h02m、3m05s 或 12.3s，未知时显示 -"""
+    if seconds is None:
+        return "-"
+    if seconds >= 3600:
+        return f"{int(seconds // 3600)}h{int(seconds % 3600 // 60):02d}m"
+    if seconds >= 60:
+        return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+    return f"{seconds:.1f}s"
+
+
+def _open_history():
+    """打开会话历史数据库，失败时退出"""
+    import sqlite3
+    from claude_switch.history import HistoryStore
+    store = HistoryStore(default_config_dir())
+    try:
+        store.connection
+    except (OSError, sqlite3.Error) as e:
+        _fail(f"无法打开会话历史 {store.path}: {e}")
+    return store
+
+
+def _parse_window(window: Optional[str]) -> Optional[float]:
+    """将 7d 形式的时间窗口转换为起始时间戳，all 或未指定时返回None"""
+    from claude_switch.history import parse_duration
+    if not window or window == "all":
+        return None
+    try:
+        return time.time() - parse_duration(window)
+    except ValueError as e:
+        _fail(str(e))
+
+
+def history_impl(limit: int = 20, profile: Optional[str] = None, since: Optional[str] = None,
+                 as_json: bool = False) -> None:
+    """显示最近的 ccs run 会话实现"""
+    with _open_history() as store:
+        sessions = store.sessions(limit, profile, _parse_window(since))
+
+    if as_json:
+        import json
+        sys.stdout.write(json.dumps([session.to_dict() for session in sessions], ensure_ascii=False, indent=2) + "\n")
+        return
+    if not sessions:
+        print("[yellow]![/yellow] 没有会话记录")
+        return
+
+    from rich.table import Table
+    table = Table(title="会话历史")
+    table.add_column("开始时间", style="dim")
+    table.add_column("配置:模型", style="cyan")
+    table.add_column("方式")
+    table.add_column("时长", justify="right")
+    table.add_column("退出码", justify="right")
+    for session in sessions:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(session.started))
+        exit_code = "-" if session.exit_code is None else str(session.exit_code)
+        table.add_row(started, f"{session.profile}:{session.model}", session.mode,
+                      _format_seconds(session.duration), exit_code)
+    print(table)
+
+
+def stats_impl(window: str = "30d", by_model: bool = False, bucket: Optional[str] = None,
+               profile: Optional[str] = None, as_json: bool = False) -> None:
+    """按配置统计会话次数和时长分布实现"""
+    from claude_switch.history import parse_duration
+    since = _parse_window(window)
+    try:
+        bucket_seconds = parse_duration(bucket) if bucket else None
+    except ValueError as e:
+        _fail(str(e))
+    if bucket_seconds and since is None:
+        _fail("--bucket 需要与有限的 --window 一起使用")
+
+    with _open_history() as store:
+        rows = store.stats(since, profile, by_model, bucket_seconds)
 
-    if not config.models:
-        print(f"[red]✗[/red] 配置 '{config_name}' 没有配置任何模型")
+    if as_json:
+        import json
+        sys.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2) + "\n")
         return
+    if not rows:
+        print("[yellow]![/yellow] 时间窗口内没有会话记录")
+        return
+
+    from rich.table import Table
+    table = Table(title=f"会话统计（{window}）")
+    if bucket_seconds:
+        table.add_column("时间段", style="dim")
+    table.add_column("配置:模型" if by_model else "配置", style="cyan")
+    for column in ("次数", "失败", "总时长", "p50", "p95"):
+        table.add_column(column, justify="right")
+    for row in rows:
+        name = f"{row['profile']}:{row['model']}" if by_model else row["profile"]
+        cells = [name, str(row["count"]), str(row["failures"]), _format_seconds(row["total_s"]),
+                 _format_seconds(row["p50_s"]), _format_seconds(row["p95_s"])]
+        if bucket_seconds:
+            cells.insert(0, time.strftime("%Y-%m-%d %H:%M", time.localtime(row["window_start"])))
+        table.add_row(*cells)
+    print(table)
+
+
+def history_prune_impl(older_than: Optional[str] = None) -> None:
+    """删除过期的会话记录并压缩数据库实现"""
+    from claude_switch.history import parse_duration, retention_days
+    try:
+        age = parse_duration(older_than) if older_than else retention_days() * 86400
+    except ValueError as e:
+        _fail(str(e))
+
+    with _open_history() as store:
+        removed = store.prune(time.time() - age)
+        store.compact()
+        size = store.path.stat().st_size
+    print(f"[green]✓[/green] 已删除 {removed} 条会话记录，数据库大小 {size / 1024:.1f}KB")
+
+
+def cache_rebuild_impl() -> None:
+    """重新生成配置快照缓存实现"""
+    if config_manager.rebuild_cache():
+        print(f"[green]✓[/green] 快照缓存已重建: {config_manager.get_snapshot_path()}")
+        return
+
+    load_error = config_manager.get_load_error()
+    if load_error:
+        print(f"[red]✗[/red] 配置文件加载失败: {load_error}")
+        print("[yellow]![/yellow] 请使用 'ccs edit' 修复配置文件后重试")
+    else:
+        print("[yellow]![/yellow] 未生成快照缓存（配置文件不存在或缓存目录不可写）")
+
 
-    if not model:
-        model = config.default_model
+def cache_clear_impl() -> None:
+    """清除配置快照缓存实现"""
+    removed = config_manager.clear_cache()
+    print(f"[green]✓[/green] 已删除 {removed} 个快照缓存文件")
 
-    print(f"[green]→[/green] 使用配置 '{config_name}' 模型 '{model}' 启动Claude Code...")
 
+def cache_clear_keys_impl() -> None:
+    """清除 api_key_cmd 密钥缓存实现"""
+    from claude_switch.credentials import clear_cache
+    removed = clear_cache()
+    print(f"[green]✓[/green] 已删除 {removed} 个缓存的API密钥")
+
+
+def completion_generate_impl(shell: str) -> None:
+    """输出静态补全脚本实现"""
+    from claude_switch.shell_completion import generate_script
     try:
-        env_vars = config.to_env_vars(model)
+        script = generate_script(shell, config_manager)
     except ValueError as e:
         print(f"[red]✗[/red] {e}")
         return
+    sys.stdout.write(script)
 
-    current_env = dict(os.environ)
-    current_env.update(env_vars)
 
-    if "ANTHROPIC_API_KEY" in current_env and current_env["ANTHROPIC_API_KEY"]:
-        current_env.pop("ANTHROPIC_AUTH_TOKEN", None)
-    elif "ANTHROPIC_AUTH_TOKEN" in current_env and current_env["ANTHROPIC_AUTH_TOKEN"]:
-        current_env.pop("ANTHROPIC_API_KEY", None)
+def completion_install_impl(shell: str) -> None:
+    """安装静态补全脚本实现"""
+    from claude_switch.shell_completion import SHELLS, install_script
+    if shell not in SHELLS:
+        print(f"[red]✗[/red] 不支持的Shell: {shell}（可选: {', '.join(SHELLS)}）")
+        return
 
-    claude_command = ["claude"]
-    if args:
-        import shlex
-        claude_command.extend(shlex.split(args))
+    path = install_script(shell, config_manager)
+    print(f"[green]✓[/green] 补全脚本已写入: {path}")
+    if shell == "fish":
+        print(f"[yellow]![/yellow] 请执行: ln -sf {path} ~/.config/fish/completions/ccs.fish")
+    else:
+        print(f"[yellow]![/yellow] 请在 ~/.{shell}rc 中添加: source {path}")
+    print("[dim]配置保存或通过 'ccs edit' 编辑后脚本会自动重新生成[/dim]")
 
+
+def daemon_start_impl() -> None:
+    """启动守护进程实现"""
     try:
-        subprocess.run(claude_command, env=current_env)
-    except FileNotFoundError:
-        print(f"[red]✗[/red] 未找到Claude Code命令，请确保已安装Claude Code")
-    except KeyboardInterrupt:
-        print("\n[yellow]![/yellow] 已退出Claude Code")
+        info = daemon.start()
+    except daemon.DaemonError as e:
+        print(f"[red]✗[/red] {e}")
+        return
+    print(f"[green]✓[/green] 守护进程已运行 (pid {info['pid']})，已加载 {info['configs']} 个配置")
+
+
+def daemon_stop_impl() -> None:
+    """停止守护进程实现"""
+    pid = daemon.stop()
+    if pid is None:
+        print("[yellow]![/yellow] 守护进程未运行")
+    else:
+        print(f"[green]✓[/green] 守护进程已停止 (pid {pid})")
 
 
-def current_config_impl() -> None:
+def daemon_status_impl() -> None:
+    """显示守护进程状态实现"""
+    info = daemon.status()
+    if info is None:
+        print("[yellow]![/yellow] 守护进程未运行，命令将在进程内加载配置")
+        return
+    print(f"[green]✓[/green] 守护进程运行中 (pid {info['pid']})")
+    print(f"  配置文件: {info['config_file']}")
+    print(f"  配置数量: {info['configs']}")
+    print(f"  运行时间: {info['uptime']:.0f}s  已处理请求: {info['requests']}  重新加载: {info['reloads']}")
+    if os.environ.get("CCS_NO_DAEMON"):
+        print("[yellow]![/yellow] 已设置 CCS_NO_DAEMON，命令不会使用守护进程")
+
+
+def current_config_impl(output_format: Optional[str] = None, fields: Optional[str] = None) -> None:
     """显示当前环境变量和默认配置实现"""
     env_vars = {
         "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY"),
@@ -173,6 +979,17 @@ def current_config_impl() -> None:
         "CLAUDE_CODE_DISABLE_NONESSENTIAL_TRAFFIC": os.environ.get("CLAUDE_CODE_DISABLE_NONESSENTIAL_TRAFFIC")
     }
 
+    if output_format:
+        record = {"default_config": config_manager.get_default_config_name() or None}
+        record.update(env_vars)
+        if record["ANTHROPIC_API_KEY"]:
+            record["ANTHROPIC_API_KEY"] = "*" * 8
+        _write_machine_output([record], output_format, fields, list(record))
+        return
+    if fields:
+        _fail("--fields 需要与 --format 一起使用")
+
+    from rich.table import Table
     table = Table(title="当前环境变量")
     table.add_column("变量名", style="yellow")
     table.add_column("值", style="white")
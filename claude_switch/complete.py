@@ -1,27 +1,19 @@
 """命令行补全功能"""
 
+from claude_switch import daemon
 from claude_switch.config import config_manager
 
 
 def complete_config_model_names(incomplete: str):
-    """为 config:model 格式提供自动补全"""
-    configs = config_manager.list_configs()
+    """为 config:model 格式提供自动补全（支持不区分大小写和仅模型名前缀）
 
-    all_models = []
-    for config_name, config in configs.items():
-        if config.models:
-            for model_name, model_config in config.models.items():
-                unique_name = f"{config_name}:{model_name}"
-                is_default = " (默认)" if model_name == config.default_model else ""
-                help_text = f"{model_config.model_id}{is_default}"
-                if model_config.description:
-                    help_text = f"{help_text} - {model_config.description}"
-                all_models.append((unique_name, help_text))
-
-    if not incomplete:
-        for model_name, help_text in all_models:
-            yield (model_name, help_text)
-    else:
-        for model_name, help_text in all_models:
-            if model_name.startswith(incomplete):
-                yield (model_name, help_text)
+    守护进程运行时直接使用其内存中的补全索引，否则在进程内加载配置。
+    """
+    try:
+        candidates = daemon.query("complete", incomplete=incomplete)
+    except daemon.DaemonError:
+        candidates = None
+    if candidates is not None:
+        yield from (tuple(candidate) for candidate in candidates)
+        return
+    yield from config_manager.get_completion_index().complete(incomplete)
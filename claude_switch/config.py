@@ -1,10 +1,37 @@
 """
 Claude Code配置管理模块
 """
-import yaml
+import copy
+import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from dataclasses import dataclass, field, fields
+from claude_switch import snapshot
+from claude_switch.fileutil import atomic_write, file_lock, stat_key
+from claude_switch.backends import BACKENDS, backend_for_path, resolve_config_file
+from claude_switch.index import CompletionIndex, SearchIndex, SearchResult
+from claude_switch.timings import recorder
+
+LOCK_NAME = ".config.lock"
+# 等待其他写入进程释放锁的最长时间（秒）
+LOCK_TIMEOUT = 30.0
+# 配置文件在读取期间被就地改写导致解析失败时的最大读取次数
+LOAD_ATTEMPTS = 3
+SYSTEM_CONFIG_DIR = "/etc/claude-code-switch"
+FRAGMENT_DIR_NAME = "conf.d"
+# 重新加载时整体替换的已加载状态
+_STATE_ATTRIBUTES = ('_configs', '_snapshot', '_completion_index', '_main_index', '_main_search',
+                     '_default_config', '_load_error', '_loaded_key', '_layers', '_layer_configs', '_layer_default')
+
+
+def _omit_unset(data: dict) -> dict:
+    """未配置故障转移、速率限制和密钥来源时不写入对应字段，保持配置文件简洁"""
+    for name in ('fallbacks', 'rate_limit', 'api_key_cmd', 'api_key_env'):
+        if name in data and not data[name]:
+            del data[name]
+    return data
 
 
 @dataclass
@@ -13,6 +40,24 @@ class ModelConfig:
     model_id: str
     small_fast_model: str = ""
     description: str = ""
+    # 该模型不可达时依次尝试的 "配置[:模型]"
+    fallbacks: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """转换为可序列化的字典（省略空的fallbacks）"""
+        return _omit_unset({f.name: getattr(self, f.name) for f in fields(self)})
+
+
+@dataclass
+class RateLimit:
+    """速率限制配置，由 `ccs proxy` 在所有经过代理的会话之间共同执行（0表示不限制）"""
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_concurrent: int = 0
+
+    def to_dict(self) -> dict:
+        """转换为可序列化的字典"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
 
 @dataclass
@@ -25,11 +70,45 @@ class ClaudeConfig:
     description: str = ""
     models: Dict[str, ModelConfig] = field(default_factory=dict)
     default_model: str = ""
+    # 该配置不可达时依次尝试的 "配置[:模型]"
+    fallbacks: List[str] = field(default_factory=list)
+    rate_limit: Optional[RateLimit] = None
+    # api_key 为空时，从该命令的输出或该环境变量获取API密钥（见 credentials 模块）
+    api_key_cmd: str = ""
+    api_key_env: str = ""
 
     def __post_init__(self):
         if not self.default_model and self.models:
             self.default_model = next(iter(self.models.keys()))
 
+    def to_dict(self) -> dict:
+        """转换为可序列化的字典（与asdict结果相同但省略未设置的fallbacks和rate_limit，且不深拷贝字段值）"""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data['models'] = {name: model.to_dict() for name, model in self.models.items()}
+        if self.rate_limit is not None:
+            data['rate_limit'] = self.rate_limit.to_dict()
+        if not self.api_key and (self.api_key_cmd or self.api_key_env):
+            del data['api_key']
+        return _omit_unset(data)
+
+    @classmethod
+    def from_dict(cls, config_data: dict) -> "ClaudeConfig":
+        """从字典构建配置（不修改原字典）"""
+        config_data = dict(config_data)
+        # 使用 api_key_cmd/api_key_env 的配置可以省略 api_key
+        config_data.setdefault('api_key', '')
+        # 处理模型配置
+        models_data = config_data.pop('models', {})
+        rate_limit = config_data.pop('rate_limit', None)
+        config = cls(**config_data)
+        if rate_limit:
+            config.rate_limit = RateLimit(**rate_limit)
+
+        # 添加模型配置
+        for model_name, model_data in models_data.items():
+            config.add_model(model_name, ModelConfig(**model_data))
+        return config
+
     def add_model(self, model_name: str, model_config: ModelConfig) -> bool:
         """添加模型配置"""
         if model_name in self.models:
@@ -59,8 +138,11 @@ class ClaudeConfig:
         self.default_model = model_name
         return True
 
-    def to_env_vars(self, model_name: Optional[str] = None) -> Dict[str, str]:
-        """将配置转换为环境变量字典"""
+    def to_env_vars(self, model_name: Optional[str] = None, resolve_key: bool = True) -> Dict[str, str]:
+        """将配置转换为环境变量字典（按需解析 api_key_env/api_key_cmd，无法获取密钥时抛出ValueError）
+
+        resolve_key 为False时不解析 api_key_env/api_key_cmd，ANTHROPIC_API_KEY 为空。
+        """
         if not model_name:
             model_name = self.default_model
 
@@ -68,8 +150,14 @@ class ClaudeConfig:
         if not model_config:
             raise ValueError(f"模型 '{model_name}' 不存在")
 
+        api_key = self.api_key
+        if not api_key and resolve_key and (self.api_key_cmd or self.api_key_env):
+            # 只为选中的配置解析密钥，可能需要执行命令
+            from claude_switch.credentials import resolve_api_key
+            api_key = resolve_api_key(self)
+
         return {
-            "ANTHROPIC_API_KEY": self.api_key,
+            "ANTHROPIC_API_KEY": api_key,
             "ANTHROPIC_BASE_URL": self.base_url,
             "ANTHROPIC_MODEL": model_config.model_id,
             "ANTHROPIC_SMALL_FAST_MODEL": model_config.small_fast_model or model_config.model_id,
@@ -78,114 +166,485 @@ class ClaudeConfig:
         }
 
 
-class ConfigManager:
-    """配置管理器"""
+def default_config_dir() -> Path:
+    """默认配置目录"""
+    return Path.home() / ".config" / "claude-code-switch"
 
-    def __init__(self, config_dir: Optional[str] = None):
-        if config_dir:
-            self.config_dir = Path(config_dir)
-        else:
-            self.config_dir = Path.home() / ".config" / "claude-code-switch"
 
-        self.config_file = self.config_dir / "config.yaml"
-        self.config_dir.mkdir(parents=True, exist_ok=True)
+def system_config_dir() -> Optional[Path]:
+    """系统级配置目录，可通过 CCS_SYSTEM_CONFIG_DIR 设置，设为空字符串时不读取系统配置"""
+    value = os.environ.get("CCS_SYSTEM_CONFIG_DIR", SYSTEM_CONFIG_DIR)
+    return Path(value) if value else None
+
+
+def fragment_files(directory: Path) -> List[Path]:
+    """conf.d 目录中的配置片段，按文件名排序（忽略隐藏文件和无法识别格式的文件）"""
+    extensions = {extension for backend in BACKENDS.values() for extension in backend.extensions}
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(
+                Path(entry.path) for entry in entries
+                if not entry.name.startswith(".") and os.path.splitext(entry.name)[1].lower() in extensions
+                and entry.is_file()
+            )
+    except OSError:
+        return []
 
-        self._configs: Dict[str, ClaudeConfig] = {}
+
+def layer_files(config_dir: Path, system_dir: Optional[Path]) -> List[Path]:
+    """只读配置层文件，优先级从低到高：系统配置文件、系统 conf.d、用户 conf.d"""
+    files: List[Path] = []
+    if system_dir is not None:
+        system_file = resolve_config_file(system_dir)
+        if system_file.is_file():
+            files.append(system_file)
+        files.extend(fragment_files(system_dir / FRAGMENT_DIR_NAME))
+    files.extend(fragment_files(config_dir / FRAGMENT_DIR_NAME))
+    return files
+
+
+@dataclass
+class ConfigDiff:
+    """两次加载之间的配置变化"""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    default_changed: bool = False
+    # 解析失败而沿用上次内容的配置层
+    errors: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.default_changed)
+
+
+class ConfigLayer:
+    """只读配置层（系统配置或一个 conf.d 片段），每个文件有独立的快照，只有变化的文件才重新解析"""
+
+    def __init__(self, path: Path, cache_dir: Path):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.key: Optional[Tuple[int, int, int]] = None
+        self.default_config = ""
+        self.error: Optional[str] = None
+        self._snapshot: Optional[snapshot.Snapshot] = None
+        # 值为int时表示尚未解码的快照数据块序号
+        self._configs: Dict[str, Union[ClaudeConfig, int]] = {}
+        self._completion_index: Optional[CompletionIndex] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._load()
+
+    def _read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def _load(self) -> None:
+        try:
+            stat = os.stat(self.path)
+            self.key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            cached = snapshot.load_snapshot(self.cache_dir, self.path, stat, self._read)
+            if cached is not None:
+                self._snapshot = cached
+                self.default_config = cached.meta['default_config']
+                self._configs = cached.profile_index()  # type: ignore[assignment]
+                return
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+                stat = os.fstat(f.fileno())
+            self.key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            with recorder.span("config.parse"):
+                data = backend_for_path(self.path).load(raw)
+                configs_data = data.get('configs') or {}
+                configs = {name: ClaudeConfig.from_dict(config_data) for name, config_data in configs_data.items()}
+        except OSError as e:
+            self.error = f"{self.path}: {e}"
+            return
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.error = f"{self.path}: {e}"
+            return
+
+        self.default_config = data.get('default_config') or ''
+        self._configs = configs  # type: ignore[assignment]
+        self._completion_index = CompletionIndex.from_configs(configs)
+        try:
+            profiles = snapshot.pack_profiles(configs_data)
+        except ValueError:
+            return
+        self._search_index = SearchIndex.from_configs(configs)
+        snapshot.store_snapshot(self.cache_dir, self.path, stat, raw, {'default_config': self.default_config},
+                                profiles, {'completion': self._completion_index.to_data(),
+                                           'search': self._search_index.to_data()})
+
+    def names(self) -> List[str]:
+        return list(self._configs)
+
+    def get(self, name: str) -> Optional[ClaudeConfig]:
+        """获取配置对象，按需解码快照数据块"""
+        config = self._configs.get(name)
+        if isinstance(config, int):
+            config = ClaudeConfig.from_dict(self._snapshot.decode_profile(config))
+            self._configs[name] = config
+        return config
+
+    def completion_index(self) -> CompletionIndex:
+        if self._completion_index is None:
+            data = self._snapshot.section('completion') if self._snapshot else None
+            if data is not None:
+                self._completion_index = CompletionIndex.from_data(data)
+            else:
+                self._completion_index = CompletionIndex.from_configs(
+                    {name: self.get(name) for name in self.names()})  # type: ignore[misc]
+        return self._completion_index
+
+    def search_index(self) -> SearchIndex:
+        if self._search_index is None:
+            data = self._snapshot.section('search') if self._snapshot else None
+            if data is not None:
+                self._search_index = SearchIndex.from_data(data)
+            else:
+                self._search_index = SearchIndex.from_configs(
+                    {name: self.get(name) for name in self.names()})  # type: ignore[misc]
+        return self._search_index
+
+
+class ConfigManager:
+    """配置管理器
+
+    除用户的配置文件外，还读取系统配置目录和 conf.d 目录中的只读配置层（见 layer_files），
+    同名配置整体覆盖：用户配置文件优先级最高，其次是 conf.d 中文件名靠后的片段。
+    所有修改只写入用户配置文件，配置层中的配置被修改后在用户配置文件中覆盖原配置。
+    """
+
+    def __init__(self, config_dir: Optional[str] = None, config_format: Optional[str] = None):
+        self.config_dir = Path(config_dir) if config_dir else default_config_dir()
+
+        config_format = config_format or os.environ.get("CCS_CONFIG_FORMAT")
+        self.config_file = resolve_config_file(self.config_dir, config_format)
+        self.backend = backend_for_path(self.config_file)
+        self.cache_dir = self.config_dir / "cache"
+        self.lock_file = self.config_dir / LOCK_NAME
+        self.system_dir = system_config_dir()
+
+        # 值为int时表示尚未解码的快照数据块序号，访问时再构建配置对象
+        self._configs: Dict[str, Union[ClaudeConfig, int]] = {}
+        self._snapshot: Optional[snapshot.Snapshot] = None
+        self._completion_index: Optional[CompletionIndex] = None
+        # 用户配置文件自身的补全索引（合并配置层前）和搜索索引
+        self._main_index: Optional[CompletionIndex] = None
+        self._main_search: Optional[SearchIndex] = None
         self._default_config: str = ""
         self._load_error: Optional[str] = None
+        # 只读配置层（优先级从低到高），以及不在用户配置文件中的配置所在的层
+        self._layers: List[ConfigLayer] = []
+        self._layer_configs: Dict[str, ConfigLayer] = {}
+        self._layer_default = ""
+        # 事务嵌套深度及事务中是否有未保存的修改
+        self._transaction_depth = 0
+        self._dirty = False
+        # 已加载的配置文件的 (mtime_ns, size, inode)，用于写入前判断文件是否被其他进程修改
+        self._loaded_key: Optional[Tuple[int, int, int]] = None
         self._load_configs()
 
     def _load_configs(self):
         """从文件加载配置"""
-        if self.config_file.exists():
+        with recorder.span("config.load"):
+            self._read_configs()
+            self._load_layers()
+
+    def _load_layers(self, previous: Optional[Dict[Path, ConfigLayer]] = None,
+                     keep_last_good: bool = False) -> List[str]:
+        """加载只读配置层，previous 中文件未变化的层直接复用
+
+        keep_last_good 时，解析失败的层沿用 previous 中上次成功加载的内容，返回这些层的错误。
+        """
+        previous = previous or {}
+        self._layers = []
+        self._layer_configs = {}
+        self._layer_default = ""
+        kept_errors = []
+        for path in layer_files(self.config_dir, self.system_dir):
+            layer = previous.get(path)
+            if layer is None or layer.error is not None or stat_key(path) != layer.key:
+                fresh = ConfigLayer(path, self.cache_dir)
+                if fresh.error is not None and keep_last_good and layer is not None and layer.error is None:
+                    kept_errors.append(fresh.error)
+                else:
+                    layer = fresh
+            self._layers.append(layer)
+            for name in layer.names():
+                self._layer_configs[name] = layer
+            self._layer_default = layer.default_config or self._layer_default
+        return kept_errors
+
+    def _read_configs(self):
+        """从文件读取配置（优先使用仍然有效的快照）
+
+        配置文件总是通过rename整体替换，读取时无需加锁；为兼容就地改写文件的编辑器或旧版本，
+        解析失败且文件在读取期间发生了变化时重新读取。
+        """
+        for attempt in range(LOAD_ATTEMPTS):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f) or {}
-
-                    # 提取默认配置
-                    self._default_config = data.get('default_config', '')
-
-                    # 加载配置数据
-                    configs_data = data.get('configs', {})
-                    for name, config_data in configs_data.items():
-                        # 处理模型配置
-                        models_data = config_data.pop('models', {})
-                        config = ClaudeConfig(**config_data)
-
-                        # 添加模型配置
-                        for model_name, model_data in models_data.items():
-                            model_config = ModelConfig(**model_data)
-                            config.add_model(model_name, model_config)
-
-                        self._configs[name] = config
-            except (yaml.YAMLError, KeyError, TypeError) as e:
-                # 如果配置文件损坏，重新初始化
-                self._load_error = str(e)
+                stat = os.stat(self.config_file)
+            except FileNotFoundError:
+                return
+
+            def read_source() -> bytes:
+                with open(self.config_file, 'rb') as f:
+                    return f.read()
+
+            with recorder.span("config.snapshot"):
+                cached = snapshot.load_snapshot(self.cache_dir, self.config_file, stat, read_source)
+            if cached is not None:
+                # 快照中的数据块在写入前均已通过校验，这里只建立索引
+                self._snapshot = cached
+                self._default_config = cached.meta['default_config']
+                self._configs = cached.profile_index()
+                self._loaded_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                return
+
+            with open(self.config_file, 'rb') as f:
+                raw = f.read()
+                stat = os.fstat(f.fileno())
+            loaded_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            try:
+                with recorder.span("config.parse"):
+                    data = self.backend.load(raw)
+                    self._apply_data(data)
+            except (ValueError, KeyError, TypeError) as e:
                 self._configs = {}
                 self._default_config = ""
+                if attempt + 1 < LOAD_ATTEMPTS and stat_key(self.config_file) != loaded_key:
+                    time.sleep(0.01 * (attempt + 1))
+                    continue
+                # 如果配置文件损坏，重新初始化
+                self._load_error = str(e)
+                self._loaded_key = loaded_key
+                return
+
+            self._loaded_key = loaded_key
+            with recorder.span("config.store_snapshot"):
+                self._store_snapshot(stat, raw, data.get('configs', {}))
+            return
+
+    def _store_snapshot(self, stat: os.stat_result, raw: bytes, configs_data: Dict[str, dict]):
+        """为配置文件写入按配置拆分的快照"""
+        try:
+            profiles = snapshot.pack_profiles(configs_data)
+        except ValueError:
+            # 配置中含有marshal不支持的类型（如YAML时间戳），不缓存
+            return
+        configs = self._materialize_all()
+        self._main_index = CompletionIndex.from_configs(configs)
+        self._main_search = SearchIndex.from_configs(configs)
+        snapshot.store_snapshot(self.cache_dir, self.config_file, stat, raw,
+                                {'default_config': self._default_config}, profiles,
+                                {'completion': self._main_index.to_data(), 'search': self._main_search.to_data()})
+
+    def _apply_data(self, data: dict):
+        """根据解析后的数据构建配置对象"""
+        # 提取默认配置
+        self._default_config = data.get('default_config', '')
+
+        # 加载配置数据
+        configs_data = data.get('configs', {})
+        for name, config_data in configs_data.items():
+            self._configs[name] = self._build_config(config_data)
+
+    def _get(self, name: str) -> Optional[ClaudeConfig]:
+        """获取配置对象（用户配置文件优先，其次是配置层），按需解码快照数据块"""
+        config = self._configs.get(name)
+        if config is None:
+            layer = self._layer_configs.get(name)
+            return layer.get(name) if layer is not None else None
+        if isinstance(config, int):
+            config = self._build_config(self._snapshot.decode_profile(config))
+            self._configs[name] = config
+        return config
+
+    def _names(self) -> List[str]:
+        """所有配置名称：用户配置文件中的配置在前，其后是只在配置层中的配置"""
+        return list(self._configs) + [name for name in self._layer_configs if name not in self._configs]
+
+    def _materialize_all(self) -> Dict[str, ClaudeConfig]:
+        """解码用户配置文件中所有尚未解码的配置（不含配置层）"""
+        for name in list(self._configs):
+            self._get(name)
+        return self._configs  # type: ignore[return-value]
+
+    @staticmethod
+    def _build_config(config_data: dict) -> ClaudeConfig:
+        """从字典构建单个配置（不修改原字典，以便写入快照）"""
+        return ClaudeConfig.from_dict(config_data)
 
     def _save_configs(self):
-        """保存配置到文件"""
+        """保存配置到文件，并同步刷新快照和补全索引；处于事务中时推迟到事务结束"""
+        if self._transaction_depth:
+            self._dirty = True
+            return
+        self._write_configs()
+
+    def _write_configs(self):
+        """序列化用户配置文件中的配置并原子地替换配置文件（调用方需持有写入锁）"""
+        self._completion_index = None
+        self._main_index = None
+        self._main_search = None
         data = {
-            'configs': {name: asdict(config) for name, config in self._configs.items()},
+            'configs': {name: config.to_dict() for name, config in self._materialize_all().items()},
             'default_config': self._default_config
         }
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        raw = self.backend.dump(data)
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        stat = atomic_write(self.config_file, raw)
+        self._loaded_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        self._store_snapshot(stat, raw, data['configs'])
+        self.refresh_completion_scripts()
+
+    @contextmanager
+    def transaction(self) -> Iterator["ConfigManager"]:
+        """将多次修改合并为一次保存
+
+        最外层事务持有配置目录中的fcntl写入锁，与其他进程的写入互斥（读取方不加锁）；
+        进入事务时如果配置文件已被其他进程修改，先重新加载，修改总是基于最新内容。
+        事务内的 add_config/update_config/remove_config/set_default_config 只修改内存，
+        最外层事务正常结束时统一写入一次；发生异常时丢弃所有修改并从文件重新加载。
+        嵌套的事务合并到最外层事务中。
+        """
+        if self._transaction_depth:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        with file_lock(self.lock_file, LOCK_TIMEOUT):
+            if stat_key(self.config_file) != self._loaded_key:
+                self.reload()
+            self._transaction_depth = 1
+            try:
+                yield self
+            except BaseException:
+                self._dirty = False
+                self.reload()
+                raise
+            finally:
+                self._transaction_depth = 0
+            if self._dirty:
+                self._dirty = False
+                self._write_configs()
 
     def add_config(self, name: str, config: ClaudeConfig) -> bool:
         """添加配置"""
-        if name in self._configs:
-            return False
-        self._configs[name] = config
-        self._save_configs()
+        with self.transaction():
+            if self.config_exists(name):
+                return False
+            self._configs[name] = config
+            self._save_configs()
         return True
 
     def update_config(self, name: str, config: ClaudeConfig) -> bool:
-        """更新配置"""
-        if name not in self._configs:
-            return False
-        self._configs[name] = config
-        self._save_configs()
+        """更新配置（配置层中的配置更新后写入用户配置文件）"""
+        with self.transaction():
+            if not self.config_exists(name):
+                return False
+            self._configs[name] = config
+            self._save_configs()
         return True
 
     def remove_config(self, name: str) -> bool:
-        """删除配置"""
-        if name not in self._configs:
-            return False
-        del self._configs[name]
-        self._save_configs()
+        """删除用户配置文件中的配置（配置层只读；删除覆盖配置后恢复显示配置层中的同名配置）"""
+        with self.transaction():
+            if name not in self._configs:
+                return False
+            del self._configs[name]
+            self._save_configs()
         return True
 
     def get_config(self, name: str) -> Optional[ClaudeConfig]:
-        """获取配置"""
-        return self._configs.get(name)
+        """获取配置（只解码该配置）"""
+        return self._get(name)
 
     def list_configs(self) -> Dict[str, ClaudeConfig]:
-        """列出所有配置"""
-        return dict(self._configs)
+        """列出所有配置（包括配置层）"""
+        return {name: self._get(name) for name in self._names()}  # type: ignore[misc]
+
+    def iter_configs(self) -> Iterator[Tuple[str, ClaudeConfig]]:
+        """逐个返回 (名称, 配置)，访问到时才解码对应的快照数据块"""
+        for name in self._names():
+            yield name, self._get(name)  # type: ignore[misc]
 
     def config_exists(self, name: str) -> bool:
         """检查配置是否存在"""
-        return name in self._configs
+        return name in self._configs or name in self._layer_configs
 
     def set_default_config(self, name: str) -> bool:
         """设置默认配置"""
-        if name not in self._configs:
-            return False
-        self._default_config = name
-        self._save_configs()
+        with self.transaction():
+            if not self.config_exists(name):
+                return False
+            self._default_config = name
+            self._save_configs()
         return True
 
+    def get_completion_index(self) -> CompletionIndex:
+        """获取补全索引（优先使用快照中预先生成的索引，有配置层时合并各层的索引）"""
+        if self._completion_index is None:
+            if self._main_index is None:
+                data = self._snapshot.section('completion') if self._snapshot else None
+                if data is not None:
+                    self._main_index = CompletionIndex.from_data(data)
+                else:
+                    self._main_index = CompletionIndex.from_configs(self._materialize_all())
+            if self._layers:
+                self._completion_index = CompletionIndex.merged(
+                    [layer.completion_index() for layer in self._layers] + [self._main_index],
+                    [layer.names() for layer in self._layers] + [list(self._configs)])
+            else:
+                self._completion_index = self._main_index
+        return self._completion_index
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[SearchResult]:
+        """在所有配置（包括配置层）的 config:model 中模糊搜索，按得分从高到低返回
+
+        使用随快照持久化的三元组索引；被覆盖的配置层中的同名配置不会出现在结果中。
+        """
+        if self._main_search is None:
+            data = self._snapshot.section('search') if self._snapshot else None
+            if data is not None:
+                self._main_search = SearchIndex.from_data(data)
+            else:
+                self._main_search = SearchIndex.from_configs(self._materialize_all())
+        results = self._main_search.search(query, limit)
+        for layer in self._layers:
+            shadowed = [name for name in layer.names()
+                        if name in self._configs or self._layer_configs.get(name) is not layer]
+            results += layer.search_index().search(query, limit, exclude=shadowed)
+        if self._layers:
+            results.sort(key=lambda result: (-result.score, result.name))
+        return results[:limit] if limit is not None else results
+
     def get_default_config(self) -> Optional[ClaudeConfig]:
         """获取默认配置"""
-        if not self._default_config or self._default_config not in self._configs:
+        name = self.get_default_config_name()
+        if not name or not self.config_exists(name):
             return None
-        return self._configs[self._default_config]
+        return self._get(name)
 
     def get_default_config_name(self) -> str:
-        """获取默认配置名称"""
-        return self._default_config
+        """获取默认配置名称（用户配置文件未设置时使用优先级最高的配置层中的设置）"""
+        return self._default_config or self._layer_default
+
+    def get_layer_files(self) -> List[Path]:
+        """已加载的只读配置层文件（优先级从低到高）"""
+        return [layer.path for layer in self._layers]
+
+    def get_layer_errors(self) -> List[str]:
+        """无法读取或解析而被跳过的配置层"""
+        return [layer.error for layer in self._layers if layer.error]
+
+    def source_key(self) -> tuple:
+        """用户配置文件及所有配置层文件的状态，任一文件被修改、增加或删除时改变"""
+        paths = [self.config_file] + layer_files(self.config_dir, self.system_dir)
+        return tuple((str(path), stat_key(path)) for path in paths)
 
     def get_config_file_path(self) -> str:
         """获取配置文件路径"""
@@ -197,7 +656,75 @@ class ConfigManager:
 
     def save_configs(self):
         """保存配置到文件（公开方法）"""
-        self._save_configs()
+        with self.transaction():
+            self._save_configs()
+
+    def _reset(self):
+        """清空已加载的状态"""
+        self._configs = {}
+        self._snapshot = None
+        self._completion_index = None
+        self._main_index = None
+        self._main_search = None
+        self._default_config = ""
+        self._load_error = None
+        self._loaded_key = None
+
+    def reload(self):
+        """丢弃内存中的配置并重新从文件加载（未变化的配置层直接复用）"""
+        previous = {layer.path: layer for layer in self._layers}
+        self._reset()
+        with recorder.span("config.load"):
+            self._read_configs()
+            self._load_layers(previous)
+
+    def hot_reload(self) -> Optional[ConfigDiff]:
+        """在副本中重新加载配置，成功后一次性替换当前配置并返回变化，供长时间运行的进程使用
+
+        用户配置文件无法解析时抛出ValueError并继续使用上次成功加载的配置；解析失败的配置层
+        同样沿用上次的内容，错误记录在返回值的 errors 中。事务进行中时不重新加载，返回None。
+        """
+        if self._transaction_depth:
+            return None
+        staged = copy.copy(self)
+        staged._reset()
+        staged._read_configs()
+        if staged._load_error is not None:
+            raise ValueError(staged._load_error)
+        errors = staged._load_layers({layer.path: layer for layer in self._layers}, keep_last_good=True)
+
+        diff = ConfigDiff(errors=errors)
+        old_names, new_names = self._names(), staged._names()
+        old_set, new_set = set(old_names), set(new_names)
+        diff.added = [name for name in new_names if name not in old_set]
+        diff.removed = [name for name in old_names if name not in new_set]
+        diff.changed = [name for name in new_names if name in old_set and self._get(name) != staged._get(name)]
+        diff.default_changed = self.get_default_config_name() != staged.get_default_config_name()
+        # 单次 dict.update 完成替换，其他线程不会看到新旧混合的状态
+        self.__dict__.update({name: staged.__dict__[name] for name in _STATE_ATTRIBUTES})
+        return diff
+
+    def rebuild_cache(self) -> bool:
+        """忽略现有快照，重新解析配置文件并生成快照"""
+        self.clear_cache()
+        self.reload()
+        return self._load_error is None and self.get_snapshot_path().exists()
+
+    def refresh_completion_scripts(self) -> List[Path]:
+        """重新生成已安装的静态补全脚本"""
+        from claude_switch.shell_completion import refresh_installed_scripts
+        try:
+            return refresh_installed_scripts(self)
+        except OSError:
+            return []
+
+    def clear_cache(self) -> int:
+        """删除所有快照缓存，返回删除的文件数量"""
+        return snapshot.clear_snapshots(self.cache_dir)
+
+    def get_snapshot_path(self) -> Path:
+        """获取当前配置文件对应的快照路径"""
+        return snapshot.snapshot_path(self.cache_dir, self.config_file)
 
     def create_example_config(self) -> None:
         """创建包含示例配置的文件"""
@@ -252,8 +779,67 @@ class ConfigManager:
             }
         }
 
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            yaml.dump(example_config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_file, LOCK_TIMEOUT):
+            atomic_write(self.config_file, self.backend.dump(example_config))
+
+
+def resolve_run_target(manager: ConfigManager, config_model: Optional[str] = None,
+                       resolve_key: bool = True) -> Tuple[str, str, Dict[str, str], List[str]]:
+    """解析 `配置[:模型]`（为空时使用默认配置），返回 (配置名称, 模型名称, 环境变量, 备用目标)
+
+    备用目标为模型级和配置级 fallbacks 的合并列表。resolve_key 为False时不解析 api_key_env/api_key_cmd。
+
+    无法解析时抛出ValueError，错误信息可直接展示给用户。
+    """
+    model: Optional[str] = None
+    if not config_model:
+        config = manager.get_default_config()
+        if not config:
+            raise ValueError("未设置默认配置，请使用 'ccs run <配置名称>' 或先在配置文件中设置 default_config")
+        config_name = manager.get_default_config_name()
+    else:
+        if ":" in config_model:
+            config_name, model = config_model.split(":", 1)
+        else:
+            config_name = config_model
+
+        config = manager.get_config(config_name)
+        if not config:
+            raise ValueError(f"配置 '{config_name}' 不存在")
+
+    if not config.models:
+        raise ValueError(f"配置 '{config_name}' 没有配置任何模型")
+
+    if not model:
+        model = config.default_model
+    env_vars = config.to_env_vars(model, resolve_key)
+    return config_name, model, env_vars, config.models[model].fallbacks + config.fallbacks
+
+
+def target_exists(manager: ConfigManager, config_model: str) -> bool:
+    """`配置[:模型]` 中的配置（和指定的模型）是否存在"""
+    config_name, _, model = config_model.partition(":")
+    config = manager.get_config(config_name)
+    return config is not None and (not model or model in config.models)
+
+
+_config_manager: Optional[ConfigManager] = None
+
+
+def get_config_manager() -> ConfigManager:
+    """获取全局配置管理器（首次使用时才创建并加载配置）"""
+    global _config_manager
+    if _config_manager is None:
+        _config_manager = ConfigManager()
+    return _config_manager
+
+
+class _LazyConfigManager:
+    """全局配置管理器的延迟代理，导入模块时不会触发配置加载"""
+
+    def __getattr__(self, name):
+        return getattr(get_config_manager(), name)
 
 
-config_manager = ConfigManager()
+config_manager: ConfigManager = _LazyConfigManager()  # type: ignore[assignment]
@@ -0,0 +1,220 @@
+"""
+API密钥解析模块
+
+配置可以不在配置文件中保存明文 `api_key`，而是通过 `api_key_env` 从环境变量读取，或通过 `api_key_cmd`
+执行命令（如密码管理器）获取。密钥只在为选中的配置生成环境变量时才解析；命令的输出按命令缓存在
+仅当前用户可访问的目录中（优先使用 $XDG_RUNTIME_DIR，有效期由 CCS_API_KEY_TTL 设置，默认3600秒，
+设为0时不缓存），避免每次启动都等待密码管理器。命令的输出不会被打印或写入日志，失败时只报告退出码。
+"""
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from claude_switch.timings import recorder
+
+if TYPE_CHECKING:
+    from claude_switch.config import ClaudeConfig
+
+CACHE_DIR_NAME = "credentials"
+DEFAULT_TTL = 3600.0
+COMMAND_TIMEOUT = 60.0
+# 缓存剩余有效期少于该比例时在后台提前刷新
+REFRESH_FRACTION = 0.2
+
+_warming: Set[str] = set()
+_warming_lock = threading.Lock()
+
+
+def cache_ttl() -> float:
+    """命令获取的密钥的缓存有效期（秒），可通过 CCS_API_KEY_TTL 设置"""
+    try:
+        return max(0.0, float(os.environ.get("CCS_API_KEY_TTL", DEFAULT_TTL)))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def cache_dir() -> Path:
+    """密钥缓存目录：$XDG_RUNTIME_DIR（内存文件系统，注销后清除）或配置目录中的 cache/credentials"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return Path(runtime_dir) / "claude-code-switch" / CACHE_DIR_NAME
+    from claude_switch.config import default_config_dir
+    return default_config_dir() / "cache" / CACHE_DIR_NAME
+
+
+def _cache_path(command: str) -> Path:
+    # 以命令的哈希命名，修改命令后旧的缓存自然失效
+    return cache_dir() / hashlib.sha256(command.encode('utf-8')).hexdigest()
+
+
+def _is_private(stat: os.stat_result) -> bool:
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o077
+
+
+def _read_cache(command: str) -> Optional[dict]:
+    """读取命令的缓存，文件不属于当前用户或权限过宽时忽略"""
+    try:
+        fd = os.open(_cache_path(command), os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return None
+    try:
+        if not _is_private(os.fstat(fd)):
+            return None
+        with os.fdopen(fd, 'r', encoding='utf-8') as f:
+            fd = -1
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    finally:
+        if fd >= 0:
+            os.close(fd)
+    if not isinstance(entry, dict) or not isinstance(entry.get("value"), str):
+        return None
+    return entry
+
+
+def _write_cache(command: str, value: str, ttl: float) -> None:
+    """以0600权限原子地写入缓存，失败时静默忽略"""
+    path = _cache_path(command)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _is_private(os.stat(path.parent)):
+            return
+        now = time.time()
+        data = json.dumps({"created": now, "expires": now + ttl, "value": value}).encode('utf-8')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def clear_cache() -> int:
+    """删除所有缓存的密钥，返回删除的文件数量"""
+    removed = 0
+    try:
+        entries = list(os.scandir(cache_dir()))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            os.unlink(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def run_command(command: str, detach: bool = False) -> str:
+    """执行 api_key_cmd 并返回去掉首尾空白的标准输出，失败时抛出ValueError（不包含命令的输出）
+
+    命令不继承标准输入；detach 时在新会话中运行，没有控制终端，不会与前台的 claude 争用终端。
+    """
+    try:
+        with recorder.span("api_key_cmd"):
+            result = subprocess.run(command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, timeout=COMMAND_TIMEOUT, start_new_session=detach)
+    except subprocess.TimeoutExpired:
+        raise ValueError(f"api_key_cmd 超过 {COMMAND_TIMEOUT:g} 秒未返回") from None
+    except OSError as e:
+        raise ValueError(f"api_key_cmd 无法执行: {e.strerror}") from None
+    if result.returncode != 0:
+        raise ValueError(f"api_key_cmd 执行失败（退出码 {result.returncode}）")
+    value = result.stdout.decode('utf-8', errors='replace').strip()
+    if not value:
+        raise ValueError("api_key_cmd 没有输出API密钥")
+    return value
+
+
+def command_key(command: str, ttl: Optional[float] = None, refresh: bool = False, detach: bool = False) -> str:
+    """获取命令输出的密钥，优先使用有效期内的缓存；refresh 时忽略缓存重新执行"""
+    ttl = cache_ttl() if ttl is None else ttl
+    if ttl > 0 and not refresh:
+        entry = _read_cache(command)
+        if entry is not None and entry.get("expires", 0) > time.time():
+            return entry["value"]
+    value = run_command(command, detach)
+    if ttl > 0:
+        _write_cache(command, value, ttl)
+    return value
+
+
+def key_source(config: "ClaudeConfig") -> Optional[Dict[str, str]]:
+    """需要在运行 ccs 的进程中解析的密钥来源 {"api_key_env": ..., "api_key_cmd": ...}，使用明文密钥时返回None
+
+    守护进程只返回密钥来源，由客户端读取自己的环境变量和执行命令。
+    """
+    if config.api_key or not (config.api_key_env or config.api_key_cmd):
+        return None
+    return {"api_key_env": config.api_key_env or "", "api_key_cmd": config.api_key_cmd or ""}
+
+
+def resolve_key_source(source: Dict[str, str]) -> str:
+    """按密钥来源获取密钥：api_key_env 指定的环境变量优先，其次是 api_key_cmd 的输出"""
+    api_key_env = source.get("api_key_env")
+    api_key_cmd = source.get("api_key_cmd")
+    if api_key_env:
+        value = os.environ.get(api_key_env, "")
+        if value or not api_key_cmd:
+            if not value:
+                raise ValueError(f"环境变量 {api_key_env} 未设置（api_key_env）")
+            return value
+    if api_key_cmd:
+        return command_key(api_key_cmd)
+    return ""
+
+
+def resolve_api_key(config: "ClaudeConfig") -> str:
+    """配置的API密钥：明文 api_key 优先，其次是 api_key_env 指定的环境变量，最后是 api_key_cmd 的输出"""
+    source = key_source(config)
+    return config.api_key if source is None else resolve_key_source(source)
+
+
+def needs_refresh(command: str, ttl: Optional[float] = None) -> bool:
+    """命令的缓存不存在、已过期或即将过期"""
+    ttl = cache_ttl() if ttl is None else ttl
+    if ttl <= 0:
+        return False
+    entry = _read_cache(command)
+    return entry is None or entry.get("expires", 0) - time.time() < ttl * REFRESH_FRACTION
+
+
+def warm(config: Optional["ClaudeConfig"]) -> Optional[threading.Thread]:
+    """在后台线程中预先获取配置的密钥（仅 api_key_cmd 且缓存即将过期时），返回启动的线程
+
+    命令在没有控制终端的新会话中运行，需要交互输入的命令会失败而不是读取终端，留待下次启动时在前台执行。
+    """
+    if config is None or config.api_key or not config.api_key_cmd:
+        return None
+    if config.api_key_env and os.environ.get(config.api_key_env):
+        return None
+    command = config.api_key_cmd
+    if not needs_refresh(command):
+        return None
+    with _warming_lock:
+        if command in _warming:
+            return None
+        _warming.add(command)
+
+    def run() -> None:
+        try:
+            command_key(command, refresh=True, detach=True)
+        except ValueError:
+            pass
+        finally:
+            with _warming_lock:
+                _warming.discard(command)
+
+    thread = threading.Thread(target=run, name="ccs-api-key-warm", daemon=True)
+    thread.start()
+    return thread
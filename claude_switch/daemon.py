@@ -0,0 +1,302 @@
+"""
+常驻守护进程模块
+
+`ccs daemon start` 启动的后台进程在内存中保持已加载的配置，通过配置目录中的
+Unix域套接字回答补全、环境变量解析、搜索和列表查询，命令行和补全只需连接套接字，
+无需每次加载配置。守护进程在处理请求前检查配置文件是否变化，变化时自动重新加载。
+
+协议为每行一个JSON对象：请求 {"op": "...", ...参数}，
+响应 {"ok": true, "result": ...} 或 {"ok": false, "error": "..."}。
+
+客户端在守护进程未运行（套接字不存在或无法连接）或设置了 CCS_NO_DAEMON 时返回None，
+调用方据此回退到进程内加载。
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from claude_switch.config import (ClaudeConfig, ConfigManager, default_config_dir, resolve_run_target,
+                                  target_exists)
+
+SOCKET_NAME = "daemon.sock"
+PID_NAME = "daemon.pid"
+LOG_NAME = "daemon.log"
+CLIENT_TIMEOUT = 1.0
+START_TIMEOUT = 5.0
+
+
+class DaemonError(Exception):
+    """守护进程返回的错误"""
+
+
+def socket_path(config_dir: Optional[Path] = None) -> Path:
+    """守护进程套接字路径"""
+    return (config_dir or default_config_dir()) / SOCKET_NAME
+
+
+def pid_path(config_dir: Optional[Path] = None) -> Path:
+    """守护进程pid文件路径"""
+    return (config_dir or default_config_dir()) / PID_NAME
+
+
+def query(op: str, config_dir: Optional[Path] = None, timeout: float = CLIENT_TIMEOUT, **params) -> Optional[Any]:
+    """供命令行和补全使用：守护进程可用时返回查询结果，否则返回None以便回退到进程内加载"""
+    if os.environ.get("CCS_NO_DAEMON"):
+        return None
+    return request(op, config_dir, timeout, **params)
+
+
+def request(op: str, config_dir: Optional[Path] = None, timeout: float = CLIENT_TIMEOUT, **params) -> Optional[Any]:
+    """向守护进程发送请求并返回结果，守护进程不可用时返回None
+
+    守护进程处理请求出错时抛出DaemonError。
+    """
+    path = socket_path(config_dir)
+    if not path.exists():
+        return None
+
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps(dict(params, op=op)).encode('utf-8') + b"\n")
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if chunk.endswith(b"\n"):
+                    break
+        response = json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+
+    if not response.get("ok"):
+        raise DaemonError(response.get("error", "守护进程返回未知错误"))
+    return response.get("result")
+
+
+class ConfigDaemon:
+    """在内存中保持配置并处理查询请求"""
+
+    def __init__(self, manager: ConfigManager):
+        self.manager = manager
+        self.started = time.time()
+        self.requests = 0
+        self.reloads = 0
+        self._source_key = manager.source_key()
+
+    def refresh(self) -> bool:
+        """配置文件或配置层变化时重新加载（只重新解析变化的文件），返回是否重新加载"""
+        key = self.manager.source_key()
+        if key == self._source_key:
+            return False
+        self.manager.reload()
+        self._source_key = key
+        self.reloads += 1
+        return True
+
+    def handle(self, request: Dict[str, Any]) -> Any:
+        """处理单个请求，参数错误或无法解析时抛出ValueError"""
+        op = request.get("op")
+        handler = getattr(self, f"_op_{op}", None) if isinstance(op, str) else None
+        if handler is None:
+            raise ValueError(f"未知请求: {op}")
+        self.requests += 1
+        self.refresh()
+        return handler(request)
+
+    def warm_target(self) -> Optional[ClaudeConfig]:
+        """需要在后台刷新 api_key_cmd 密钥缓存的默认配置（在持有锁时取得，在锁外调用 credentials.warm）"""
+        if self.manager.get_load_error() is not None:
+            return None
+        return self.manager.get_default_config()
+
+    def _op_ping(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 3),
+            "config_file": str(self.manager.config_file),
+            "configs": len(self.manager.list_configs()),
+            "requests": self.requests,
+            "reloads": self.reloads,
+        }
+
+    def _op_complete(self, request: Dict[str, Any]) -> list:
+        index = self.manager.get_completion_index()
+        return list(index.complete(str(request.get("incomplete", ""))))
+
+    def _op_env(self, request: Dict[str, Any]) -> list:
+        # 处理请求时不解析 api_key_env/api_key_cmd：环境变量应来自运行 ccs 的Shell，
+        # 命令可能需要较长时间或交互，不能在持有全局锁时执行。只返回密钥来源，由客户端解析
+        # （守护进程只在锁外的后台线程中为默认配置预热密钥缓存）
+        config_name, model, env_vars, fallbacks = resolve_run_target(
+            self.manager, request.get("config_model"), resolve_key=False)
+        from claude_switch.credentials import key_source
+        return [config_name, model, env_vars, fallbacks, key_source(self.manager.get_config(config_name))]
+
+    def _op_exists(self, request: Dict[str, Any]) -> bool:
+        return target_exists(self.manager, str(request.get("config_model", "")))
+
+    def _op_search(self, request: Dict[str, Any]) -> list:
+        limit = request.get("limit")
+        results = self.manager.search(str(request.get("query", "")), int(limit) if limit is not None else None)
+        return [result.to_dict() for result in results]
+
+    def _op_list(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "default_config": self.manager.get_default_config_name(),
+            "load_error": self.manager.get_load_error(),
+            "layer_errors": self.manager.get_layer_errors(),
+            "configs": {name: config.to_dict() for name, config in self.manager.list_configs().items()},
+        }
+
+    def _op_stop(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"pid": os.getpid()}
+
+
+def serve(config_dir: Optional[Path] = None) -> None:
+    """在前台运行守护进程，直到收到stop请求或SIGTERM"""
+    import signal
+    import socketserver
+    import threading
+    from claude_switch.credentials import warm
+
+    manager = ConfigManager(str(config_dir) if config_dir else None)
+    daemon = ConfigDaemon(manager)
+    lock = threading.Lock()
+    sock_file = socket_path(manager.config_dir)
+    pid_file = pid_path(manager.config_dir)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                stop = False
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("请求必须是JSON对象")
+                    with lock:
+                        result = daemon.handle(request)
+                        target = daemon.warm_target()
+                    # 在锁外刷新默认配置即将过期的 api_key_cmd 密钥缓存，命令在后台线程中执行
+                    warm(target)
+                    response = {"ok": True, "result": result}
+                    stop = request.get("op") == "stop"
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"ok": False, "error": str(e)}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+                self.wfile.flush()
+                if stop:
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    manager.config_dir.mkdir(parents=True, exist_ok=True)
+    if sock_file.exists():
+        sock_file.unlink()
+    # 套接字会返回API密钥，只允许当前用户访问
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(str(sock_file), Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    pid_file.write_text(str(os.getpid()), encoding='utf-8')
+
+    def on_term(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_term)
+    warm(daemon.warm_target())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        for path in (sock_file, pid_file):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def read_pid(config_dir: Optional[Path] = None) -> Optional[int]:
+    """读取pid文件，进程已不存在时返回None"""
+    try:
+        pid = int(pid_path(config_dir).read_text(encoding='utf-8').strip())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return None
+    return pid
+
+
+def status(config_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """返回守护进程状态，未运行时返回None"""
+    try:
+        return request("ping", config_dir)
+    except DaemonError:
+        return None
+
+
+def start(config_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """在后台启动守护进程并等待其就绪，已在运行时直接返回其状态
+
+    启动失败时抛出DaemonError。
+    """
+    info = status(config_dir)
+    if info is not None:
+        return info
+
+    config_dir = config_dir or default_config_dir()
+    # 清理上次异常退出留下的套接字
+    try:
+        socket_path(config_dir).unlink()
+    except OSError:
+        pass
+
+    import subprocess
+    config_dir.mkdir(parents=True, exist_ok=True)
+    with open(config_dir / LOG_NAME, 'ab') as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "claude_switch.daemon", str(config_dir)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True,
+        )
+
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        info = status(config_dir)
+        if info is not None:
+            return info
+        if process.poll() is not None:
+            raise DaemonError(f"守护进程启动失败，请查看日志: {config_dir / LOG_NAME}")
+        time.sleep(0.02)
+    process.terminate()
+    raise DaemonError("等待守护进程就绪超时")
+
+
+def stop(config_dir: Optional[Path] = None) -> Optional[int]:
+    """停止守护进程，返回其pid，未运行时返回None"""
+    try:
+        result = request("stop", config_dir)
+    except DaemonError:
+        result = None
+    if result is not None:
+        pid = result["pid"]
+    else:
+        pid = read_pid(config_dir)
+        if pid is None:
+            return None
+        import signal
+        os.kill(pid, signal.SIGTERM)
+
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline and socket_path(config_dir).exists():
+        time.sleep(0.02)
+    return pid
+
+
+if __name__ == "__main__":
+    serve(Path(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,137 @@
+"""
+故障转移模块
+
+配置或模型可以通过 `fallbacks` 指定一组备用的 "配置[:模型]"。启动前对候选端点做一次
+有时间上限的可达性检查，跳过不可达的端点；失败记录在 cache/circuit.json（熔断器状态）中，
+冷却期内已知不可达的端点直接跳过，不再等待检查超时。
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from claude_switch.probe import probe_urls
+
+if TYPE_CHECKING:
+    from claude_switch.config import ConfigManager
+
+CIRCUIT_CACHE_NAME = "circuit.json"
+DEFAULT_CHECK_TIMEOUT = 2.0
+DEFAULT_COOLDOWN = 60.0
+
+Target = Tuple[str, str]
+
+
+def check_timeout() -> float:
+    """可达性检查超时（秒），可通过 CCS_FAILOVER_TIMEOUT 设置"""
+    try:
+        return float(os.environ.get("CCS_FAILOVER_TIMEOUT", DEFAULT_CHECK_TIMEOUT))
+    except ValueError:
+        return DEFAULT_CHECK_TIMEOUT
+
+
+def failover_chain(manager: "ConfigManager", config_name: str, model_name: str) -> List[Target]:
+    """按优先级返回 (配置名称, 模型名称) 候选列表：首选目标、模型级fallbacks、配置级fallbacks
+
+    备用项省略模型时，优先使用同名模型，否则使用其默认模型；不存在的备用项被忽略，
+    备用配置自身的fallbacks也会依次展开。
+    """
+    chain: List[Target] = []
+    pending: List[Target] = [(config_name, model_name)]
+    while pending:
+        name, model = pending.pop(0)
+        config = manager.get_config(name)
+        if config is None or (name, model) in chain:
+            continue
+        model_config = config.get_model(model)
+        if model_config is None:
+            continue
+        chain.append((name, model))
+
+        for entry in model_config.fallbacks + config.fallbacks:
+            fallback_name, _, fallback_model = entry.partition(":")
+            fallback = manager.get_config(fallback_name)
+            if fallback is None:
+                continue
+            if not fallback_model:
+                fallback_model = model if model in fallback.models else fallback.default_model
+            pending.append((fallback_name, fallback_model))
+    return chain
+
+
+class CircuitBreaker:
+    """按base_url记录最近的失败，冷却期内视为不可达"""
+
+    def __init__(self, cache_dir: Path, cooldown: float = DEFAULT_COOLDOWN):
+        self.path = cache_dir / CIRCUIT_CACHE_NAME
+        self.cooldown = cooldown
+        self.state: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def is_open(self, base_url: str, now: Optional[float] = None) -> bool:
+        """端点是否处于熔断状态（冷却期内失败过）"""
+        entry = self.state.get(base_url)
+        if not isinstance(entry, dict):
+            return False
+        now = time.time() if now is None else now
+        return now - entry.get("failed_at", 0) < self.cooldown
+
+    def record_failure(self, base_url: str, error: str) -> None:
+        entry = self.state.get(base_url) if isinstance(self.state.get(base_url), dict) else {}
+        self.state[base_url] = {
+            "failures": entry.get("failures", 0) + 1,
+            "failed_at": time.time(),
+            "error": error,
+        }
+
+    def record_success(self, base_url: str) -> None:
+        self.state.pop(base_url, None)
+
+    def save(self) -> None:
+        """写入熔断器状态，失败时静默忽略"""
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def select_target(manager: "ConfigManager", chain: List[Target], breaker: CircuitBreaker,
+                  timeout: float = DEFAULT_CHECK_TIMEOUT) -> Tuple[Optional[Target], List[Tuple[Target, str]]]:
+    """依次检查候选目标，返回 (第一个可达的目标, 被跳过的目标及原因)，全部不可达时目标为None"""
+    skipped: List[Tuple[Target, str]] = []
+    checked: Dict[str, str] = {}
+    try:
+        for target in chain:
+            base_url = manager.get_config(target[0]).base_url
+            if base_url not in checked:
+                if breaker.is_open(base_url):
+                    checked[base_url] = "熔断中: " + breaker.state[base_url].get("error", "")
+                else:
+                    result = probe_urls([base_url], timeout)[base_url]
+                    if result.ok:
+                        breaker.record_success(base_url)
+                        checked[base_url] = ""
+                    else:
+                        breaker.record_failure(base_url, result.error)
+                        checked[base_url] = result.error
+            if not checked[base_url]:
+                return target, skipped
+            skipped.append((target, checked[base_url]))
+        return None, skipped
+    finally:
+        breaker.save()
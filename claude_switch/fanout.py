@@ -0,0 +1,103 @@
+"""
+并发运行模块
+
+`ccs fanout` 将同一个提示词并发发送给多个 config:model 目标（`claude --print`），
+每个目标使用各自配置的环境变量，输出分别写入独立文件，总耗时约等于最慢的目标。
+"""
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_JOBS = 8
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+@dataclass
+class FanoutTarget:
+    """单个运行目标：解析失败时env为None，error记录原因"""
+    name: str
+    env: Optional[Dict[str, str]] = None
+    error: str = ""
+
+
+@dataclass
+class FanoutResult:
+    """单个目标的运行结果"""
+    target: str
+    exit_code: Optional[int]
+    wall_ms: float
+    output_path: Optional[Path]
+    error_path: Optional[Path]
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+
+def output_names(targets: Sequence[str]) -> List[str]:
+    """为每个目标生成不重复、可用作文件名的名称"""
+    names: List[str] = []
+    used = set()
+    for target in targets:
+        base = _UNSAFE_CHARS.sub("_", target).strip("._") or "target"
+        name, suffix = base, 2
+        while name in used:
+            name = f"{base}-{suffix}"
+            suffix += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def _run_target(target: FanoutTarget, command: List[str], prompt: bytes,
+                output_path: Path, error_path: Path) -> FanoutResult:
+    start = time.perf_counter()
+    try:
+        # 输出直接写入文件，不在内存中缓冲
+        with open(output_path, 'wb') as stdout, open(error_path, 'wb') as stderr:
+            process = subprocess.run(command, input=prompt, stdout=stdout, stderr=stderr, env=target.env)
+        exit_code, error = process.returncode, ""
+    except OSError as e:
+        exit_code, error = None, str(e)
+    wall_ms = (time.perf_counter() - start) * 1000
+    return FanoutResult(target.name, exit_code, wall_ms, output_path, error_path, error)
+
+
+def run_fanout(targets: Sequence[FanoutTarget], prompt: bytes, output_dir: Path, command: List[str],
+               jobs: int = DEFAULT_JOBS, on_result=None) -> List[FanoutResult]:
+    """并发运行所有目标，最多同时运行jobs个，按目标顺序返回结果
+
+    command 为完整的 claude 命令（如 ["claude", "--print"]），提示词通过标准输入传入；
+    on_result 在每个目标完成时调用（从工作线程中调用，已加锁串行化）。
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = output_names([target.name for target in targets])
+    lock = threading.Lock()
+
+    def run(index: int) -> FanoutResult:
+        target = targets[index]
+        if target.env is None:
+            result = FanoutResult(target.name, None, 0.0, None, None, target.error)
+        else:
+            result = _run_target(target, command, prompt, output_dir / f"{names[index]}.out",
+                                 output_dir / f"{names[index]}.err")
+        if on_result is not None:
+            with lock:
+                on_result(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return list(executor.map(run, range(len(targets))))
+
+
+def default_output_dir() -> Path:
+    """默认输出目录：当前目录下带时间戳的 fanout-YYYYmmdd-HHMMSS"""
+    return Path.cwd() / time.strftime("fanout-%Y%m%d-%H%M%S")
+
@@ -0,0 +1,104 @@
+"""
+文件写入工具模块
+"""
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - 非POSIX平台不加锁
+    fcntl = None  # type: ignore[assignment]
+
+LOCK_POLL_INTERVAL = 0.01
+
+
+class LockTimeout(OSError):
+    """等待文件锁超时"""
+
+
+def stat_key(path: Path) -> Optional[Tuple[int, int, int]]:
+    """返回用于判断文件是否被替换或修改的 (mtime_ns, size, inode)，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None) -> Iterator[None]:
+    """持有path上的fcntl排他锁（建议锁），仅用于写入方之间互斥，读取方无需加锁
+
+    超过timeout秒仍未获得锁时抛出LockTimeout；timeout为None时一直等待。
+    """
+    if fcntl is None:
+        yield
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if timeout is None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise LockTimeout(f"等待文件锁超时: {path}")
+                    time.sleep(LOCK_POLL_INTERVAL)
+        yield
+    finally:
+        # 关闭文件描述符即释放锁
+        os.close(fd)
+
+
+def fsync_dir(directory: Path) -> None:
+    """将目录项的变更（如rename）刷入磁盘，不支持时静默忽略"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, data: bytes) -> os.stat_result:
+    """原子地写入文件：先写入同目录下的临时文件并fsync，再rename覆盖目标文件
+
+    读取方只会看到完整的旧文件或完整的新文件。返回新文件的stat结果。
+    """
+    # 写入符号链接指向的实际文件，并保留原文件的权限（配置中含有API密钥）
+    path = Path(os.path.realpath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = None
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        # rename可能会更新ctime，因此在rename之后再取stat
+        stat = os.stat(path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    fsync_dir(path.parent)
+    return stat
@@ -0,0 +1,314 @@
+"""
+会话历史模块
+
+每次 `ccs run` 的配置、模型、开始和结束时间、退出码和时长记录在配置目录的 history.db 中
+（SQLite，WAL模式，按开始时间和配置建立索引），供 `ccs history` 和 `ccs stats` 查询。
+子进程模式在 claude 退出后才写入，不占用启动时间；exec模式下进程会被替换，只在exec前向
+history-pending.jsonl 追加一行（结束时间未知），下次打开数据库时再导入。
+超过保留期（CCS_HISTORY_RETENTION_DAYS，默认365天）的记录每天自动清理一次；设置 CCS_HISTORY=0 可关闭记录。
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+DB_NAME = "history.db"
+PENDING_NAME = "history-pending.jsonl"
+DEFAULT_RETENTION_DAYS = 365
+# 自动清理过期记录的最小间隔（秒）
+PRUNE_INTERVAL = 24 * 3600.0
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL,
+    model TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL,
+    exit_code INTEGER,
+    duration REAL,
+    mode TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started);
+CREATE INDEX IF NOT EXISTS sessions_profile ON sessions (profile, started);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL);
+"""
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def enabled() -> bool:
+    """是否记录会话历史（CCS_HISTORY=0 时关闭）"""
+    return os.environ.get("CCS_HISTORY", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def retention_days() -> float:
+    """历史记录保留天数，可通过 CCS_HISTORY_RETENTION_DAYS 设置"""
+    try:
+        return float(os.environ.get("CCS_HISTORY_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+    except ValueError:
+        return DEFAULT_RETENTION_DAYS
+
+
+def parse_duration(text: str) -> float:
+    """解析 30m、24h、7d、4w 形式的时长，返回秒数，格式错误时抛出ValueError"""
+    match = _DURATION_RE.match(text.strip().lower())
+    if not match:
+        raise ValueError(f"无效的时长: {text}（示例: 30m、24h、7d、4w）")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """已排序数值的百分位数（线性插值），没有数值时返回None"""
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+@dataclass
+class Session:
+    """一次 `ccs run` 启动，exec模式下 ended、exit_code 和 duration 为None"""
+    id: int
+    profile: str
+    model: str
+    started: float
+    ended: Optional[float]
+    exit_code: Optional[int]
+    duration: Optional[float]
+    mode: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class HistoryStore:
+    """会话历史数据库，首次访问时才连接并导入exec模式留下的待导入记录"""
+
+    def __init__(self, directory: Path, clock=time.time):
+        self.path = Path(directory) / DB_NAME
+        self.pending_path = Path(directory) / PENDING_NAME
+        self._clock = clock
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 自动提交模式，写入时显式开启事务
+            connection = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+            self._ingest_pending()
+            self._auto_prune()
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def record(self, profile: str, model: str, started: float, ended: Optional[float] = None,
+               exit_code: Optional[int] = None, mode: str = "subprocess") -> None:
+        """写入一条会话记录"""
+        duration = None if ended is None else ended - started
+        self._insert([(profile, model, started, ended, exit_code, duration, mode)])
+
+    def _insert(self, rows: List[tuple]) -> None:
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO sessions (profile, model, started, ended, exit_code, duration, mode) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _ingest_pending(self) -> None:
+        """导入exec模式追加的记录：先重命名文件，之后追加的记录写入新文件，不会丢失或重复导入
+
+        之前的进程在认领后崩溃或未能放回时留下的认领文件，在其进程已不存在时一并导入。
+        """
+        claims = self._adopt_stale_claims()
+        claimed = self.pending_path.with_name(f"{PENDING_NAME}.{os.getpid()}.ingest")
+        try:
+            os.replace(self.pending_path, claimed)
+            claims.append(claimed)
+        except OSError:
+            pass
+        for path in claims:
+            self._ingest_claimed(path)
+
+    def _adopt_stale_claims(self) -> List[Path]:
+        """以本进程的名称重新认领已不存在的进程留下的认领文件，多个进程同时认领时只有一个成功"""
+        adopted = []
+        prefix = f"{PENDING_NAME}."
+        for path in sorted(self.pending_path.parent.glob(f"{PENDING_NAME}.*.ingest")):
+            owner = path.name[len(prefix):-len(".ingest")].split("-", 1)[0]
+            if not owner.isdigit() or (int(owner) != os.getpid() and _process_alive(int(owner))):
+                continue
+            target = path.with_name(f"{PENDING_NAME}.{os.getpid()}-{os.urandom(4).hex()}.ingest")
+            try:
+                os.replace(path, target)
+            except OSError:
+                continue
+            adopted.append(target)
+        return adopted
+
+    def _ingest_claimed(self, claimed: Path) -> None:
+        rows = []
+        with open(claimed, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    rows.append((entry["profile"], entry["model"], entry["started"], None, None, None,
+                                 entry["mode"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        try:
+            if rows:
+                self._insert(rows)
+        except BaseException:
+            # 写入数据库失败时把记录追加回待导入文件，下次打开时重试
+            self._restore_pending(claimed)
+            raise
+        os.unlink(claimed)
+
+    def _restore_pending(self, claimed: Path) -> None:
+        try:
+            data = claimed.read_bytes()
+            fd = os.open(self.pending_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            os.unlink(claimed)
+        except OSError:
+            pass
+
+    def _auto_prune(self) -> None:
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'pruned'").fetchone()
+        now = self._clock()
+        if row is not None and now - row[0] < PRUNE_INTERVAL:
+            return
+        self.prune(now - retention_days() * 86400)
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pruned', ?)", (now,))
+
+    def prune(self, before: float) -> int:
+        """删除开始时间早于 before 的记录，返回删除的条数"""
+        with self.connection:
+            return self.connection.execute("DELETE FROM sessions WHERE started < ?", (before,)).rowcount
+
+    def compact(self) -> None:
+        """合并WAL日志并重建数据库文件以回收空间"""
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.execute("VACUUM")
+
+    def sessions(self, limit: int = 20, profile: Optional[str] = None,
+                 since: Optional[float] = None) -> List[Session]:
+        """按开始时间倒序返回最近的会话"""
+        query = "SELECT id, profile, model, started, ended, exit_code, duration, mode FROM sessions"
+        conditions, params = self._filters(profile, since)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY started DESC LIMIT ?"
+        return [Session(*row) for row in self.connection.execute(query, params + [limit])]
+
+    def stats(self, since: Optional[float] = None, profile: Optional[str] = None, by_model: bool = False,
+              bucket: Optional[float] = None) -> List[Dict[str, Any]]:
+        """按配置（by_model 时按配置:模型）统计次数、失败次数和时长的p50/p95
+
+        bucket 为时间窗口长度（秒）时，再按开始时间分段统计，分段从 since 起对齐。
+        """
+        conditions, params = self._filters(profile, since)
+        query = "SELECT profile, model, started, exit_code, duration FROM sessions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        origin = since or 0.0
+        groups: Dict[tuple, List[tuple]] = {}
+        for row_profile, model, started, exit_code, duration in self.connection.execute(query, params):
+            window = int((started - origin) // bucket) if bucket else 0
+            key = (window, row_profile, model if by_model else None)
+            groups.setdefault(key, []).append((exit_code, duration))
+
+        results = []
+        for (window, row_profile, model), rows in sorted(groups.items()):
+            durations = sorted(duration for _, duration in rows if duration is not None)
+            results.append({
+                "window_start": origin + window * bucket if bucket else since,
+                "profile": row_profile,
+                "model": model,
+                "count": len(rows),
+                "failures": sum(1 for exit_code, _ in rows if exit_code not in (None, 0)),
+                "total_s": round(sum(durations), 3),
+                "p50_s": percentile(durations, 50),
+                "p95_s": percentile(durations, 95),
+            })
+        return results
+
+    @staticmethod
+    def _filters(profile: Optional[str], since: Optional[float]):
+        conditions: List[str] = []
+        params: List[Any] = []
+        if profile:
+            conditions.append("profile = ?")
+            params.append(profile)
+        if since is not None:
+            conditions.append("started >= ?")
+            params.append(since)
+        return conditions, params
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def append_pending(directory: Path, profile: str, model: str, started: float, mode: str = "exec") -> None:
+    """以单次追加写入的方式记录一条待导入的会话（exec前调用，不打开数据库）"""
+    line = json.dumps({"profile": profile, "model": model, "started": started, "mode": mode},
+                      ensure_ascii=False) + "\n"
+    path = Path(directory) / PENDING_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def record_session(directory: Path, profile: str, model: str, started: float, ended: Optional[float] = None,
+                   exit_code: Optional[int] = None, mode: str = "subprocess") -> None:
+    """记录一次启动，结束时间未知时追加到待导入文件；关闭记录或写入失败时静默忽略"""
+    if not enabled():
+        return
+    try:
+        if ended is None:
+            append_pending(directory, profile, model, started, mode)
+            return
+        with HistoryStore(directory) as store:
+            store.record(profile, model, started, ended, exit_code, mode)
+    except (OSError, sqlite3.Error):
+        pass
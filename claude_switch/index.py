@@ -0,0 +1,255 @@
+"""
+配置检索索引模块
+
+补全索引和搜索索引在配置保存或快照重建时生成并随快照持久化，使用时直接加载。
+补全的前缀查询使用二分查找而不是逐个比较；搜索索引是配置名、模型名、模型ID和描述的三元组倒排索引，
+`ccs search` 和 `ccs run` 的模糊匹配只需对查询的三元组累加倒排列表，不逐个比较条目。
+"""
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from claude_switch.config import ClaudeConfig
+
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def _prefix_range(keys: List[str], prefix: str) -> range:
+    """返回有序列表中以prefix开头的元素下标范围"""
+    return range(bisect_left(keys, prefix), bisect_left(keys, prefix + _MAX_CHAR))
+
+
+class CompletionIndex:
+    """config:model 补全索引，支持不区分大小写的前缀和仅模型名前缀查询"""
+
+    def __init__(self, names: List[str], keys: List[str], helps: List[str],
+                 model_keys: List[str], model_refs: List[int]):
+        # names按小写排序，keys为对应的小写形式
+        self.names = names
+        self.keys = keys
+        self.helps = helps
+        # 模型名（小写）有序列表及其在names中的下标
+        self.model_keys = model_keys
+        self.model_refs = model_refs
+
+    @classmethod
+    def _from_entries(cls, entries: List[Tuple[str, str]]) -> "CompletionIndex":
+        """从 (config:model, 说明) 列表构建索引"""
+        entries.sort(key=lambda entry: (entry[0].lower(), entry[0]))
+
+        names = [entry[0] for entry in entries]
+        keys = [name.lower() for name in names]
+        helps = [entry[1] for entry in entries]
+        models = sorted((name.split(":", 1)[1].lower(), i) for i, name in enumerate(names))
+        return cls(names, keys, helps, [key for key, _ in models], [ref for _, ref in models])
+
+    @classmethod
+    def from_configs(cls, configs: Dict[str, "ClaudeConfig"]) -> "CompletionIndex":
+        """从配置字典构建索引"""
+        entries = []
+        for config_name, config in configs.items():
+            for model_name, model_config in config.models.items():
+                is_default = " (默认)" if model_name == config.default_model else ""
+                help_text = f"{model_config.model_id}{is_default}"
+                if model_config.description:
+                    help_text = f"{help_text} - {model_config.description}"
+                entries.append((f"{config_name}:{model_name}", help_text))
+        return cls._from_entries(entries)
+
+    @classmethod
+    def merged(cls, indexes: List["CompletionIndex"],
+               profile_names: Optional[List[Iterable[str]]] = None) -> "CompletionIndex":
+        """合并多个配置层的索引（优先级从低到高），同名配置只保留优先级最高的层中的条目
+
+        profile_names 为各层定义的配置名称：没有模型的配置不产生补全条目，但同样会覆盖低优先级层中的同名配置。
+        """
+        owners: Dict[str, int] = {}
+        for position, index in enumerate(indexes):
+            if profile_names is not None:
+                names: Iterable[str] = profile_names[position]
+            else:
+                names = [name.split(":", 1)[0] for name in index.names]
+            for name in names:
+                owners[name] = position
+        entries = [
+            (name, help_text)
+            for position, index in enumerate(indexes)
+            for name, help_text in zip(index.names, index.helps)
+            if owners.get(name.split(":", 1)[0]) == position
+        ]
+        return cls._from_entries(entries)
+
+    def to_data(self) -> tuple:
+        """转换为可持久化的数据"""
+        return (self.names, self.keys, self.helps, self.model_keys, self.model_refs)
+
+    @classmethod
+    def from_data(cls, data: tuple) -> "CompletionIndex":
+        """从持久化数据恢复索引"""
+        return cls(*data)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def complete(self, incomplete: str) -> Iterator[Tuple[str, str]]:
+        """查询补全候选：先按 config:model 前缀匹配，不含冒号时再按模型名前缀匹配"""
+        prefix = incomplete.lower()
+        matched = _prefix_range(self.keys, prefix)
+        for i in matched:
+            yield self.names[i], self.helps[i]
+
+        if not prefix or ":" in prefix:
+            return
+        extra = sorted({
+            self.model_refs[j] for j in _prefix_range(self.model_keys, prefix)
+            if self.model_refs[j] not in matched
+        })
+        for i in extra:
+            yield self.names[i], self.helps[i]
+
+
+_WORD_RE = re.compile(r"[^\W_]+")
+# 配置名和模型名、模型ID、描述的权重
+_FIELD_WEIGHTS = (3, 2, 1)
+# 条目至少包含查询中该比例的三元组才作为结果
+MIN_COVERAGE = 0.5
+# 参与名称匹配加分的候选数量为 limit 的倍数
+SHORTLIST_FACTOR = 5
+
+
+@lru_cache(maxsize=8192)
+def _word_trigrams(word: str) -> FrozenSet[str]:
+    padded = f" {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigrams(text: str) -> Set[str]:
+    """文本的三元组集合：按字母数字切分为词并转为小写，每个词两端补空格，短词也能匹配"""
+    grams: Set[str] = set()
+    for word in _WORD_RE.findall(text.lower()):
+        grams.update(_word_trigrams(word))
+    return grams
+
+
+@dataclass
+class SearchResult:
+    """一条搜索结果"""
+    name: str
+    model_id: str
+    description: str
+    score: float
+
+    @property
+    def config_name(self) -> str:
+        return self.name.split(":", 1)[0]
+
+    @property
+    def model_name(self) -> str:
+        return self.name.split(":", 1)[1]
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "config": self.config_name, "model": self.model_name,
+                "model_id": self.model_id, "description": self.description, "score": round(self.score, 3)}
+
+
+class SearchIndex:
+    """config:model 的三元组搜索索引
+
+    postings 将三元组映射为两个条目下标列表：包含该三元组的条目，以及按字段权重重复的条目
+    （在配置名/模型名中出现计3次，模型ID中计2次，描述中计1次）。查询时用 Counter 在C层面累加列表，
+    只对覆盖了足够多查询三元组且加权得分靠前的条目比较字符串，1万个条目时单次查询在毫秒级。
+    """
+
+    def __init__(self, names: List[str], model_ids: List[str], descriptions: List[str],
+                 postings: Dict[str, Tuple[List[int], List[int]]]):
+        self.names = names
+        self.model_ids = model_ids
+        self.descriptions = descriptions
+        self.postings = postings
+        self._keys: Optional[List[str]] = None
+
+    @classmethod
+    def from_configs(cls, configs: Dict[str, "ClaudeConfig"]) -> "SearchIndex":
+        """从配置字典构建索引"""
+        names: List[str] = []
+        model_ids: List[str] = []
+        descriptions: List[str] = []
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for config_name, config in configs.items():
+            for model_name, model_config in config.models.items():
+                entry = len(names)
+                description = " - ".join(filter(None, [config.description, model_config.description]))
+                names.append(f"{config_name}:{model_name}")
+                model_ids.append(model_config.model_id)
+                descriptions.append(description)
+                weights: Dict[str, int] = {}
+                for weight, text in zip(_FIELD_WEIGHTS, (f"{config_name} {model_name}", model_config.model_id,
+                                                         description)):
+                    for gram in trigrams(text):
+                        weights[gram] = weights.get(gram, 0) + weight
+                for gram, weight in weights.items():
+                    lists = postings.get(gram)
+                    if lists is None:
+                        lists = postings[gram] = ([], [])
+                    lists[0].append(entry)
+                    lists[1].extend([entry] * weight)
+        return cls(names, model_ids, descriptions, postings)
+
+    def to_data(self) -> tuple:
+        """转换为可持久化的数据"""
+        return (self.names, self.model_ids, self.descriptions, self.postings)
+
+    @classmethod
+    def from_data(cls, data: tuple) -> "SearchIndex":
+        """从持久化数据恢复索引"""
+        return cls(*data)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, query: str, limit: Optional[int] = 20,
+               exclude: Iterable[str] = ()) -> List[SearchResult]:
+        """按得分从高到低返回匹配的条目，exclude 中的配置（被更高优先级的配置层覆盖）不返回"""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        coverage: Counter = Counter()
+        weighted: Counter = Counter()
+        for gram in grams:
+            lists = self.postings.get(gram)
+            if lists is not None:
+                coverage.update(lists[0])
+                weighted.update(lists[1])
+
+        needed = max(1, round(len(grams) * MIN_COVERAGE))
+        candidates = [entry for entry, hits in coverage.items() if hits >= needed]
+        excluded = set(exclude)
+        if excluded:
+            candidates = [entry for entry in candidates if self.names[entry].split(":", 1)[0] not in excluded]
+        # 名称的精确、前缀和子串匹配另加分，只需比较加权得分靠前的条目
+        shortlist = candidates
+        if limit is not None and len(candidates) > SHORTLIST_FACTOR * limit:
+            shortlist = heapq.nlargest(SHORTLIST_FACTOR * limit, candidates, key=weighted.__getitem__)
+
+        if self._keys is None:
+            self._keys = [name.lower() for name in self.names]
+        query_key = query.strip().lower()
+        normalizer = _FIELD_WEIGHTS[0] * len(grams)
+        results = []
+        for entry in shortlist:
+            score = weighted[entry] / normalizer
+            key = self._keys[entry]
+            if key == query_key or key.split(":", 1)[0] == query_key:
+                score += 2.0
+            elif key.startswith(query_key):
+                score += 1.0
+            elif query_key in key:
+                score += 0.5
+            results.append(SearchResult(self.names[entry], self.model_ids[entry], self.descriptions[entry], score))
+        results.sort(key=lambda result: (-result.score, result.name))
+        return results[:limit] if limit is not None else results
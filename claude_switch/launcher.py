@@ -0,0 +1,93 @@
+"""
+Claude Code启动模块
+
+exec模式下 ccs 进程直接被 `claude` 替换，会话期间不再保留Python父进程，
+信号和退出码也不经过Python转发。`claude` 的路径解析一次后缓存在 cache 目录中，
+以PATH和可执行文件的mtime校验，不必每次启动都搜索PATH。
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CLAUDE_BINARY = "claude"
+BINARY_CACHE_NAME = "claude-path.json"
+LAUNCH_MODES = ("subprocess", "exec")
+
+
+def launch_mode(exec_mode: Optional[bool] = None) -> str:
+    """确定启动方式：命令行选项优先，其次是 CCS_LAUNCH_MODE，默认subprocess"""
+    if exec_mode is not None:
+        return "exec" if exec_mode else "subprocess"
+    mode = os.environ.get("CCS_LAUNCH_MODE", "").strip().lower()
+    return mode if mode in LAUNCH_MODES else "subprocess"
+
+
+def resolve_binary(cache_dir: Path, name: str = CLAUDE_BINARY, path_env: Optional[str] = None) -> Optional[str]:
+    """解析可执行文件路径，优先使用仍然有效的缓存，找不到时返回None"""
+    if path_env is None:
+        path_env = os.environ.get("PATH", os.defpath)
+    cache_file = cache_dir / BINARY_CACHE_NAME
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached["name"] == name and cached["path_env"] == path_env:
+            path = cached["path"]
+            if os.stat(path).st_mtime_ns == cached["mtime_ns"] and os.access(path, os.X_OK):
+                return path
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    import shutil
+    path = shutil.which(name, path=path_env)
+    if path is None:
+        return None
+    path = os.path.abspath(path)
+    _store_binary_cache(cache_file, {
+        "name": name, "path_env": path_env, "path": path, "mtime_ns": os.stat(path).st_mtime_ns,
+    })
+    return path
+
+
+def _store_binary_cache(cache_file: Path, data: Dict) -> None:
+    """写入路径缓存，失败时静默忽略"""
+    tmp_path = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def exec_claude(path: str, args: List[str], env: Dict[str, str]) -> None:
+    """用 claude 替换当前进程，成功时不会返回，失败时抛出OSError"""
+    os.execve(path, [CLAUDE_BINARY] + args, env)
+
+
+def _exit_code(status: int) -> int:
+    """将 wait 状态转换为与 subprocess 一致的退出码（被信号终止时为负的信号编号）"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_with_usage(command: List[str], env: Dict[str, str]) -> Tuple[int, float, Any]:
+    """作为子进程运行命令并用 os.wait4 等待，返回 (退出码, 墙钟秒数, 资源使用)"""
+    import subprocess
+    import time
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env)
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    process.returncode = _exit_code(status)
+    return process.returncode, time.perf_counter() - start, usage
@@ -13,7 +13,7 @@ Copyright (c) 2025 by lirong, All Rights Reserved.
 Claude Code切换器主程序 - 支持多模型版本
 """
 import typer
-from typing import Optional
+from typing import List, Optional
 from typing_extensions import Annotated
 from claude_switch.complete import complete_config_model_names
 
@@ -22,7 +22,15 @@ app = typer.Typer(no_args_is_help=True, help="Claude Code Config Switch", rich_m
 
 @app.command(name="list")
 @app.command(name="ls")
-def list_configs() -> None:
+def list_configs(
+    output_format: Annotated[Optional[str], typer.Option(
+        "--format", help="机器可读输出格式: json、jsonl 或 tsv（默认以表格展示）"
+    )] = None,
+    name: Annotated[Optional[str], typer.Option("--name", help="只显示该配置")] = None,
+    fields: Annotated[Optional[str], typer.Option(
+        "--fields", help="与 --format 一起使用，逗号分隔的输出字段，如 name,base_url"
+    )] = None
+) -> None:
     """[bold green]列出所有配置及其详情[/bold green]
 
     显示所有已保存的API配置，包括模型信息。
@@ -30,9 +38,10 @@ def list_configs() -> None:
     [bold]示例:[/bold]
     claude-switch list
     claude-switch ls
+    ccs list --format tsv --fields name,base_url
     """
     from claude_switch.commands import list_configs_impl
-    list_configs_impl()
+    list_configs_impl(output_format, name, fields)
 
 
 @app.command(name="edit")
@@ -44,19 +53,257 @@ def edit_config() -> None:
 
 @app.command(name="run")
 def use_config(
-    config_model: Annotated[Optional[str], typer.Argument(help="配置:模型", autocompletion=complete_config_model_names)] = None,
-    args: Annotated[Optional[str], typer.Option(help="传递给Claude Code的参数")] = None
+    config_model: Annotated[Optional[str], typer.Argument(
+        help="配置:模型（不存在时模糊匹配）", autocompletion=complete_config_model_names)] = None,
+    args: Annotated[Optional[str], typer.Option(help="传递给Claude Code的参数")] = None,
+    exec_mode: Annotated[Optional[bool], typer.Option(
+        "--exec/--subprocess", help="用claude替换ccs进程，或作为子进程启动（默认读取 CCS_LAUNCH_MODE）"
+    )] = None,
+    fastest: Annotated[Optional[str], typer.Option(
+        help="根据 'ccs probe' 的结果选择提供该模型（模型名称或模型ID）且延迟最低的配置"
+    )] = None,
+    via_proxy: Annotated[bool, typer.Option(
+        "--via-proxy", help="通过正在运行的 'ccs proxy' 发送请求（无参数时使用代理的第一个目标）"
+    )] = False,
+    no_cache: Annotated[bool, typer.Option(
+        "--no-cache", help="与 --via-proxy 一起使用，跳过代理的响应缓存"
+    )] = False,
+    timings: Annotated[bool, typer.Option(
+        "--timings", help="在标准错误输出启动各阶段耗时及claude子进程的CPU时间和峰值内存（也可设置 CCS_TIMINGS=1）"
+    )] = False,
+    timings_json: Annotated[bool, typer.Option(
+        "--timings-json", help="同 --timings，但以一行JSON输出（也可设置 CCS_TIMINGS=json）"
+    )] = False
 ) -> None:
     """使用指定配置启动Claude Code（无参数时使用默认配置）"""
     from claude_switch.commands import use_config_impl
-    use_config_impl(config_model, args)
+    timings_format = "json" if timings_json else "text" if timings else None
+    use_config_impl(config_model, args, exec_mode, fastest, via_proxy, no_cache, timings_format)
+
+
+@app.command(name="probe")
+def probe(
+    timeout: Annotated[Optional[float], typer.Option(help="每个端点的超时时间（秒，默认5）")] = None
+) -> None:
+    """并发测量所有端点的DNS、TCP连接、TLS和首字节延迟，结果供 run --fastest 使用"""
+    from claude_switch.commands import probe_impl
+    probe_impl(timeout)
+
+
+@app.command(name="fanout")
+def fanout(
+    targets: Annotated[List[str], typer.Argument(help="配置:模型（可指定多个）", autocompletion=complete_config_model_names)],
+    prompt_file: Annotated[Optional[str], typer.Option("--prompt-file", "-p", help="提示词文件，- 表示标准输入（默认读取标准输入）")] = None,
+    jobs: Annotated[Optional[int], typer.Option("--jobs", "-j", help="最大并发数（默认 min(目标数, 8)）")] = None,
+    output_dir: Annotated[Optional[str], typer.Option("--output-dir", "-o", help="输出目录（默认 ./fanout-时间戳）")] = None,
+    args: Annotated[Optional[str], typer.Option(help="额外传递给Claude Code的参数（已包含 --print）")] = None
+) -> None:
+    """将同一提示词并发发送给多个 config:model，分别保存输出并汇总耗时和退出码
+
+    [bold]示例:[/bold]
+    ccs fanout deepseek:chat anthropic:sonnet --prompt-file p.txt -j 4
+    """
+    from claude_switch.commands import fanout_impl
+    fanout_impl(targets, prompt_file, jobs, output_dir, args)
+
+
+@app.command(name="search")
+def search(
+    query: Annotated[str, typer.Argument(help="配置名、模型名、模型ID或描述中的关键词（支持拼写错误）")],
+    limit: Annotated[int, typer.Option("--limit", "-n", help="最多显示的结果数")] = 20,
+    as_json: Annotated[bool, typer.Option("--json", help="以JSON格式输出")] = False
+) -> None:
+    """模糊搜索配置和模型，按匹配程度排序
+
+    [bold]示例:[/bold]
+    ccs search sonnet
+    ccs search "deepsek coder"
+    """
+    from claude_switch.commands import search_impl
+    search_impl(query, limit, as_json)
+
+
+@app.command(name="proxy")
+def proxy(
+    targets: Annotated[Optional[List[str]], typer.Argument(help="上游 配置:模型（可指定多个）", autocompletion=complete_config_model_names)] = None,
+    model: Annotated[Optional[str], typer.Option(help="加入所有提供该模型（模型名称或模型ID）的配置")] = None,
+    host: Annotated[Optional[str], typer.Option(help="监听地址（默认 127.0.0.1）")] = None,
+    port: Annotated[Optional[int], typer.Option(help="监听端口（默认 8787 或 CCS_PROXY_PORT）")] = None,
+    strategy: Annotated[str, typer.Option(help="路由策略: round-robin|least-outstanding")] = "round-robin",
+    cache: Annotated[Optional[str], typer.Option(
+        help="缓存响应并在本地重放: deterministic（仅temperature为0的请求）|all")] = None,
+    cache_size: Annotated[Optional[int], typer.Option(help="响应缓存的总大小上限（MB，默认256）")] = None,
+    cache_ttl: Annotated[Optional[float], typer.Option(
+        help="响应缓存有效期（秒，默认86400 或 CCS_RESPONSE_CACHE_TTL）")] = None,
+    watch: Annotated[bool, typer.Option("--watch/--no-watch", help="配置文件变化时自动重新加载上游")] = True
+) -> None:
+    """在本地运行负载均衡代理，将请求分发到多个上游配置并复用keep-alive连接
+
+    [bold]示例:[/bold]
+    ccs proxy deepseek:chat deepseek-backup:chat --strategy least-outstanding
+    ccs proxy --model sonnet
+    ccs proxy deepseek:chat --cache deterministic
+    """
+    from claude_switch.commands import proxy_impl
+    proxy_impl(targets or [], model, host, port, strategy, cache, cache_size, cache_ttl, watch)
+
+
+@app.command(name="proxy-stats")
+def proxy_stats(
+    as_json: Annotated[bool, typer.Option("--json", help="以JSON格式输出")] = False
+) -> None:
+    """显示正在运行的代理的上游、速率限制排队（深度和等待时间）和缓存统计"""
+    from claude_switch.commands import proxy_stats_impl
+    proxy_stats_impl(as_json)
+
+
+@app.command(name="history")
+def history(
+    limit: Annotated[int, typer.Option("--limit", "-n", help="显示的会话数")] = 20,
+    profile: Annotated[Optional[str], typer.Option("--profile", help="只显示该配置的会话")] = None,
+    since: Annotated[Optional[str], typer.Option("--since", help="只显示该时长内的会话，如 24h、7d")] = None,
+    as_json: Annotated[bool, typer.Option("--json", help="以JSON格式输出")] = False
+) -> None:
+    """显示最近的 ccs run 会话（配置、模型、时长和退出码）"""
+    from claude_switch.commands import history_impl
+    history_impl(limit, profile, since, as_json)
+
+
+@app.command(name="history-prune")
+def history_prune(
+    older_than: Annotated[Optional[str], typer.Option(
+        "--older-than", help="删除早于该时长的会话，如 90d（默认使用 CCS_HISTORY_RETENTION_DAYS，365天）"
+    )] = None
+) -> None:
+    """删除过期的会话记录并压缩历史数据库"""
+    from claude_switch.commands import history_prune_impl
+    history_prune_impl(older_than)
+
+
+@app.command(name="stats")
+def stats(
+    window: Annotated[str, typer.Option("--window", "-w", help="统计的时间窗口，如 24h、7d、30d 或 all")] = "30d",
+    by_model: Annotated[bool, typer.Option("--by-model", help="按 配置:模型 分组")] = False,
+    bucket: Annotated[Optional[str], typer.Option("--bucket", help="按时间段分组，如 1d、1w")] = None,
+    profile: Annotated[Optional[str], typer.Option("--profile", help="只统计该配置")] = None,
+    as_json: Annotated[bool, typer.Option("--json", help="以JSON格式输出")] = False
+) -> None:
+    """按配置统计时间窗口内的会话次数、失败次数和时长的p50/p95"""
+    from claude_switch.commands import stats_impl
+    stats_impl(window, by_model, bucket, profile, as_json)
+
+
+@app.command(name="env")
+def env_config(
+    config_model: Annotated[Optional[str], typer.Argument(help="配置:模型", autocompletion=complete_config_model_names)] = None,
+    shell: Annotated[str, typer.Option(help="输出格式: bash|zsh|fish|json")] = "bash"
+) -> None:
+    """输出切换到指定配置的环境变量语句，配合 eval 在当前Shell中使用
+
+    [bold]示例:[/bold]
+    eval "$(ccs env deepseek:chat)"
+    """
+    from claude_switch.commands import env_config_impl
+    env_config_impl(config_model, shell)
+
+
+@app.command(name="shell-init")
+def shell_init(
+    shell: Annotated[str, typer.Option(help="Shell类型: bash|zsh|fish")] = "bash"
+) -> None:
+    """输出定义 ccs-use 函数的初始化脚本，用于在当前Shell中切换配置
+
+    [bold]示例:[/bold]
+    eval "$(ccs shell-init --shell bash)"
+    """
+    from claude_switch.commands import shell_init_impl
+    shell_init_impl(shell)
 
 
 @app.command(name="current")
-def current_config() -> None:
+def current_config(
+    output_format: Annotated[Optional[str], typer.Option(
+        "--format", help="机器可读输出格式: json、jsonl 或 tsv（默认以表格展示）"
+    )] = None,
+    fields: Annotated[Optional[str], typer.Option(
+        "--fields", help="与 --format 一起使用，逗号分隔的输出字段，如 default_config,ANTHROPIC_MODEL"
+    )] = None
+) -> None:
     """显示当前环境变量和默认配置"""
     from claude_switch.commands import current_config_impl
-    current_config_impl()
+    current_config_impl(output_format, fields)
+
+
+cache_app = typer.Typer(no_args_is_help=True, help="管理配置快照缓存")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command(name="rebuild")
+def cache_rebuild() -> None:
+    """重新解析配置文件并生成快照缓存"""
+    from claude_switch.commands import cache_rebuild_impl
+    cache_rebuild_impl()
+
+
+@cache_app.command(name="clear")
+def cache_clear() -> None:
+    """删除所有快照缓存，下次运行时从配置文件重新解析"""
+    from claude_switch.commands import cache_clear_impl
+    cache_clear_impl()
+
+
+@cache_app.command(name="clear-keys")
+def cache_clear_keys() -> None:
+    """删除 api_key_cmd 获取并缓存的API密钥，下次启动时重新执行命令"""
+    from claude_switch.commands import cache_clear_keys_impl
+    cache_clear_keys_impl()
+
+
+completion_app = typer.Typer(no_args_is_help=True, help="生成无需启动Python的静态补全脚本")
+app.add_typer(completion_app, name="completion")
+
+
+@completion_app.command(name="generate")
+def completion_generate(
+    shell: Annotated[str, typer.Option(help="Shell类型: bash|zsh|fish")] = "bash"
+) -> None:
+    """输出内嵌当前 config:model 候选项的静态补全脚本"""
+    from claude_switch.commands import completion_generate_impl
+    completion_generate_impl(shell)
+
+
+@completion_app.command(name="install")
+def completion_install(
+    shell: Annotated[str, typer.Option(help="Shell类型: bash|zsh|fish")] = "bash"
+) -> None:
+    """将静态补全脚本写入配置目录，配置变更后自动更新"""
+    from claude_switch.commands import completion_install_impl
+    completion_install_impl(shell)
+
+
+daemon_app = typer.Typer(no_args_is_help=True, help="管理在内存中保持配置的常驻守护进程")
+app.add_typer(daemon_app, name="daemon")
+
+
+@daemon_app.command(name="start")
+def daemon_start() -> None:
+    """在后台启动守护进程，之后的补全、run 和 list 将通过守护进程查询配置"""
+    from claude_switch.commands import daemon_start_impl
+    daemon_start_impl()
+
+
+@daemon_app.command(name="stop")
+def daemon_stop() -> None:
+    """停止守护进程"""
+    from claude_switch.commands import daemon_stop_impl
+    daemon_stop_impl()
+
+
+@daemon_app.command(name="status")
+def daemon_status() -> None:
+    """显示守护进程状态"""
+    from claude_switch.commands import daemon_status_impl
+    daemon_status_impl()
 
 
 def main():
@@ -0,0 +1,85 @@
+"""
+机器可读输出模块
+
+`ccs list` 和 `ccs current` 的 `--format json|jsonl|tsv` 输出：记录逐条写出，不导入也不经过rich渲染，
+可用 `--fields` 只输出部分字段。TSV第一行为字段名，值中的制表符和换行符被转义，列表以逗号连接。
+"""
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, TextIO
+
+if TYPE_CHECKING:
+    from claude_switch.config import ClaudeConfig
+
+FORMATS = ("json", "jsonl", "tsv")
+PROFILE_FIELDS = ("name", "default", "base_url", "api_key_env", "api_key_cmd", "default_model", "models",
+                  "timeout_ms", "disable_nonessential_traffic", "description", "fallbacks", "rate_limit")
+
+
+def profile_record(name: str, config: "ClaudeConfig", is_default: bool) -> Dict[str, Any]:
+    """配置的输出记录（不包含API密钥，api_key_env/api_key_cmd 只输出变量名和命令，不解析密钥）"""
+    return {
+        "name": name,
+        "default": is_default,
+        "base_url": config.base_url,
+        "api_key_env": config.api_key_env,
+        "api_key_cmd": config.api_key_cmd,
+        "default_model": config.default_model,
+        "models": {model_name: model.to_dict() for model_name, model in config.models.items()},
+        "timeout_ms": config.timeout_ms,
+        "disable_nonessential_traffic": config.disable_nonessential_traffic,
+        "description": config.description,
+        "fallbacks": config.fallbacks,
+        "rate_limit": config.rate_limit.to_dict() if config.rate_limit else None,
+    }
+
+
+def parse_fields(text: Optional[str], available: Sequence[str]) -> List[str]:
+    """解析逗号分隔的字段列表，未指定时返回全部字段，含有未知字段时抛出ValueError"""
+    if not text:
+        return list(available)
+    selected = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in available]
+    if unknown or not selected:
+        raise ValueError(f"未知字段: {', '.join(unknown) or text}（可选: {', '.join(available)}）")
+    return selected
+
+
+def _tsv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, dict):
+        # 模型等映射只输出键，rate_limit 等输出 键=值
+        if all(isinstance(item, dict) for item in value.values()):
+            value = list(value)
+        else:
+            value = [f"{key}={item}" for key, item in value.items()]
+    if isinstance(value, list):
+        value = ",".join(str(item) for item in value)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def write_records(records: Iterable[Dict[str, Any]], output_format: str, fields: Sequence[str],
+                  stream: TextIO) -> None:
+    """按格式逐条写出记录的指定字段"""
+    if output_format not in FORMATS:
+        raise ValueError(f"不支持的格式: {output_format}（可选: {', '.join(FORMATS)}）")
+
+    if output_format == "tsv":
+        stream.write("\t".join(fields) + "\n")
+    elif output_format == "json":
+        stream.write("[")
+    first = True
+    for record in records:
+        selected = {name: record.get(name) for name in fields}
+        if output_format == "tsv":
+            stream.write("\t".join(_tsv_value(value) for value in selected.values()) + "\n")
+        elif output_format == "jsonl":
+            stream.write(json.dumps(selected, ensure_ascii=False) + "\n")
+        else:
+            stream.write(("\n  " if first else ",\n  ") + json.dumps(selected, ensure_ascii=False))
+        first = False
+    if output_format == "json":
+        stream.write("]\n" if first else "\n]\n")
+    stream.flush()
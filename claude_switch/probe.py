@@ -0,0 +1,193 @@
+"""
+端点延迟探测模块
+
+`ccs probe` 并发测量配置中每个不同 base_url 的DNS解析、TCP连接、TLS握手和首字节延迟，
+结果带时间戳缓存在 cache/probe.json 中；`ccs run --fastest <模型>` 根据仍在有效期内的
+结果选择提供该模型且延迟最低的配置。
+"""
+import asyncio
+import json
+import os
+import socket
+import ssl
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from claude_switch.config import ConfigManager
+
+PROBE_CACHE_NAME = "probe.json"
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_TTL = 300.0
+
+
+def cache_ttl() -> float:
+    """探测结果有效期（秒），可通过 CCS_PROBE_TTL 设置"""
+    try:
+        return float(os.environ.get("CCS_PROBE_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+@dataclass
+class ProbeResult:
+    """单个端点的探测结果（毫秒），失败时error非空"""
+    base_url: str
+    dns_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    first_byte_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    status: Optional[int] = None
+    error: str = ""
+    timestamp: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and self.total_ms is not None
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+async def _probe(base_url: str, ssl_context: Optional[ssl.SSLContext]) -> ProbeResult:
+    result = ProbeResult(base_url, timestamp=time.time())
+    parts = urlsplit(base_url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        result.error = "不支持的URL"
+        return result
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    loop = asyncio.get_running_loop()
+    begin = time.perf_counter()
+
+    start = time.perf_counter()
+    infos = await loop.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    result.dns_ms = _elapsed_ms(start)
+
+    family, type_, proto, _, address = infos[0]
+    sock = socket.socket(family, type_, proto)
+    sock.setblocking(False)
+    writer = None
+    try:
+        start = time.perf_counter()
+        await loop.sock_connect(sock, address)
+        result.connect_ms = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        if secure:
+            context = ssl_context or ssl.create_default_context()
+            reader, writer = await asyncio.open_connection(sock=sock, ssl=context,
+                                                           server_hostname=parts.hostname)
+            result.tls_ms = _elapsed_ms(start)
+        else:
+            reader, writer = await asyncio.open_connection(sock=sock)
+
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        request = (f"HEAD {parts.path or '/'} HTTP/1.1\r\nHost: {host}\r\n"
+                   f"User-Agent: ccs-probe\r\nConnection: close\r\n\r\n")
+        start = time.perf_counter()
+        writer.write(request.encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        result.first_byte_ms = _elapsed_ms(start)
+        if not status_line:
+            raise ConnectionError("连接被关闭")
+        try:
+            result.status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            pass
+    finally:
+        if writer is not None:
+            writer.close()
+        else:
+            sock.close()
+
+    result.total_ms = _elapsed_ms(begin)
+    return result
+
+
+async def _probe_with_timeout(base_url: str, timeout: float,
+                              ssl_context: Optional[ssl.SSLContext]) -> ProbeResult:
+    try:
+        return await asyncio.wait_for(_probe(base_url, ssl_context), timeout)
+    except asyncio.TimeoutError:
+        return ProbeResult(base_url, error=f"超时（{timeout:g}s）", timestamp=time.time())
+    except (OSError, ssl.SSLError, ConnectionError) as e:
+        return ProbeResult(base_url, error=str(e) or type(e).__name__, timestamp=time.time())
+
+
+def probe_urls(urls: Iterable[str], timeout: float = DEFAULT_TIMEOUT,
+               ssl_context: Optional[ssl.SSLContext] = None) -> Dict[str, ProbeResult]:
+    """并发探测所有URL，每个URL最多等待timeout秒"""
+    unique = list(dict.fromkeys(urls))
+
+    async def probe_all() -> List[ProbeResult]:
+        return await asyncio.gather(*(_probe_with_timeout(url, timeout, ssl_context) for url in unique))
+
+    return {result.base_url: result for result in asyncio.run(probe_all())}
+
+
+def load_results(cache_dir: Path, ttl: float = DEFAULT_TTL) -> Dict[str, ProbeResult]:
+    """读取缓存中仍在有效期内的探测结果"""
+    try:
+        with open(cache_dir / PROBE_CACHE_NAME, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        cached = [ProbeResult(**item) for item in data.values()]
+    except (OSError, ValueError, TypeError, AttributeError):
+        return {}
+    now = time.time()
+    return {result.base_url: result for result in cached if now - result.timestamp <= ttl}
+
+
+def store_results(cache_dir: Path, results: Dict[str, ProbeResult]) -> None:
+    """将探测结果合并写入缓存，失败时静默忽略"""
+    try:
+        with open(cache_dir / PROBE_CACHE_NAME, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            data = {}
+    except (OSError, ValueError):
+        data = {}
+    data.update({url: asdict(result) for url, result in results.items()})
+
+    path = cache_dir / PROBE_CACHE_NAME
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def model_candidates(manager: "ConfigManager", model: str) -> List[Tuple[str, str, str]]:
+    """返回提供指定模型的 (配置名称, 模型名称, base_url)，模型可以是模型名称或模型ID"""
+    candidates = []
+    for config_name, config in manager.list_configs().items():
+        for model_name, model_config in config.models.items():
+            if model in (model_name, model_config.model_id):
+                candidates.append((config_name, model_name, config.base_url))
+                break
+    return candidates
+
+
+def select_fastest(candidates: List[Tuple[str, str, str]],
+                   results: Dict[str, ProbeResult]) -> Optional[Tuple[str, str, ProbeResult]]:
+    """从候选中选择探测成功且总延迟最低的配置，返回 (配置名称, 模型名称, 探测结果)"""
+    best: Optional[Tuple[str, str, ProbeResult]] = None
+    for config_name, model_name, base_url in candidates:
+        result = results.get(base_url)
+        if result is None or not result.ok:
+            continue
+        if best is None or result.total_ms < best[2].total_ms:  # type: ignore[operator]
+            best = (config_name, model_name, result)
+    return best
@@ -0,0 +1,681 @@
+"""
+本地负载均衡代理模块
+
+`ccs proxy` 在本机监听一个端口，将 Anthropic 风格的HTTP请求（包括SSE流式响应）转发到由多个
+配置组成的上游池，支持轮询（round-robin）和最少未完成请求（least-outstanding）两种路由策略。
+每个上游保持一组keep-alive连接，多个Claude Code会话共享已完成TLS握手的连接。
+
+客户端使用代理启动时生成的令牌（记录在 cache/proxy.json 中）认证；代理将其替换为上游配置的
+API密钥，并把请求体中的模型改写为所选上游的模型ID。启用 `--cache` 时，确定性请求的响应由
+response_cache 模块缓存并在本地重放；配置了 `rate_limit` 的上游由 ratelimit 模块排队限速。
+`GET /ccs/stats` 返回上游、限速队列和缓存的统计信息。
+"""
+import asyncio
+import itertools
+import json
+import os
+import secrets
+import ssl
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+
+from claude_switch.ratelimit import RateLimiter, estimate_tokens, usage_tokens
+from claude_switch.response_cache import (BYPASS_HEADER, KEY_HEADERS, CachedResponse, ResponseCache,
+                                          is_cacheable, request_key)
+
+if TYPE_CHECKING:
+    from claude_switch.config import ConfigManager
+
+PROXY_STATE_NAME = "proxy.json"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+STRATEGIES = ("round-robin", "least-outstanding")
+MAX_IDLE_CONNECTIONS = 16
+CONNECT_TIMEOUT = 10.0
+MAX_HEADERS = 200
+COPY_CHUNK_SIZE = 65536
+STATS_PATH = "/ccs/stats"
+
+# 逐跳头部只对单个连接有效，不能转发
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-connection", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+})
+
+Headers = List[Tuple[str, str]]
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class ProxyError(Exception):
+    """所有上游均无法完成请求"""
+
+
+def default_port() -> int:
+    """默认监听端口，可通过 CCS_PROXY_PORT 设置"""
+    try:
+        return int(os.environ.get("CCS_PROXY_PORT", DEFAULT_PORT))
+    except ValueError:
+        return DEFAULT_PORT
+
+
+def get_header(headers: Headers, name: str) -> Optional[str]:
+    """按名称（不区分大小写）取头部的值，不存在时返回None"""
+    name = name.lower()
+    for key, value in reversed(headers):
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _is_chunked(headers: Headers) -> bool:
+    return "chunked" in (get_header(headers, "transfer-encoding") or "").lower()
+
+
+async def read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, Headers]]:
+    """读取起始行和头部，连接在两个请求之间被关闭时返回None"""
+    line = await reader.readline()
+    if not line:
+        return None
+    start_line = line.decode('latin-1').rstrip("\r\n")
+    headers: Headers = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("连接被关闭")
+        if line in (b"\r\n", b"\n"):
+            return start_line, headers
+        if len(headers) >= MAX_HEADERS:
+            raise ValueError("头部过多")
+        name, sep, value = line.decode('latin-1').partition(":")
+        if not sep:
+            raise ValueError(f"无效的头部: {name.strip()}")
+        headers.append((name.strip(), value.strip()))
+
+
+async def read_body(reader: asyncio.StreamReader, headers: Headers) -> bytes:
+    """读取完整的请求体（Content-Length 或 chunked）"""
+    if _is_chunked(headers):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    length = int(get_header(headers, "content-length") or 0)
+    return await reader.readexactly(length) if length else b""
+
+
+def _has_no_body(method: str, status: int) -> bool:
+    return method == "HEAD" or status in (204, 304) or 100 <= status < 200
+
+
+async def relay_body(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: Headers,
+                     method: str, status: int, capture: Optional[bytearray] = None) -> None:
+    """将上游响应体原样转发给客户端：chunked 响应（如SSE）逐块转发并立即刷新
+
+    capture 不为None时同时收集去除传输编码后的响应体（用于写入响应缓存）。
+    """
+    if _has_no_body(method, status):
+        return
+    if _is_chunked(headers):
+        while True:
+            size_line = await reader.readline()
+            if not size_line:
+                raise ConnectionError("上游连接被关闭")
+            writer.write(size_line)
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise ConnectionError("上游返回了无效的分块大小") from None
+            if size == 0:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        raise ConnectionError("上游连接被关闭")
+                    writer.write(line)
+                    if line in (b"\r\n", b"\n"):
+                        break
+                await writer.drain()
+                return
+            chunk = await reader.readexactly(size + 2)
+            writer.write(chunk)
+            if capture is not None:
+                capture += chunk[:-2]
+            await writer.drain()
+
+    length = get_header(headers, "content-length")
+    remaining = int(length) if length is not None else -1
+    while remaining != 0:
+        data = await reader.read(COPY_CHUNK_SIZE if remaining < 0 else min(COPY_CHUNK_SIZE, remaining))
+        if not data:
+            if remaining > 0:
+                raise ConnectionError("上游连接被关闭")
+            break
+        writer.write(data)
+        if capture is not None:
+            capture += data
+        await writer.drain()
+        if remaining > 0:
+            remaining -= len(data)
+
+
+def _is_framed(headers: Headers, method: str, status: int) -> bool:
+    """响应体长度是否可以确定（否则只能以关闭连接结束）"""
+    return (_has_no_body(method, status) or _is_chunked(headers)
+            or get_header(headers, "content-length") is not None)
+
+
+class Upstream:
+    """一个上游目标（配置:模型）及其空闲连接"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model_id: str,
+                 small_fast_model: str = "", timeout: float = 600.0, auth_token: str = "",
+                 limiter: Optional[RateLimiter] = None):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"不支持的URL: {base_url}")
+        self.name = name
+        self.base_url = base_url
+        self.secure = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.secure else 80)
+        self.host_header = self.host if parts.port is None else f"{self.host}:{parts.port}"
+        self.path_prefix = parts.path.rstrip("/")
+        self.api_key = api_key
+        self.auth_token = auth_token
+        self.model_id = model_id
+        self.small_fast_model = small_fast_model
+        self.timeout = timeout
+        # 同一配置的上游共享一个限速器
+        self.limiter = limiter
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.connections = 0
+        self.idle: List[Connection] = []
+
+    def auth_headers(self) -> Headers:
+        if self.api_key:
+            return [("x-api-key", self.api_key)]
+        if self.auth_token:
+            return [("authorization", f"Bearer {self.auth_token}")]
+        return []
+
+    async def connect(self, ssl_context: Optional[ssl.SSLContext] = None) -> Connection:
+        """建立新连接（https 时完成TLS握手）"""
+        context = (ssl_context or ssl.create_default_context()) if self.secure else None
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context,
+                                    server_hostname=self.host if self.secure else None),
+            CONNECT_TIMEOUT)
+        self.connections += 1
+        return connection
+
+    def take_idle(self) -> Optional[Connection]:
+        """取出一个仍然打开的空闲连接"""
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def release(self, connection: Connection) -> None:
+        """归还可以复用的连接，空闲连接过多时直接关闭"""
+        if len(self.idle) < MAX_IDLE_CONNECTIONS and not connection[1].is_closing():
+            self.idle.append(connection)
+        else:
+            connection[1].close()
+
+    def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "base_url": self.base_url, "requests": self.requests,
+                "failures": self.failures, "outstanding": self.outstanding,
+                "connections": self.connections, "idle": len(self.idle)}
+
+
+class UpstreamPool:
+    """上游池：按路由策略给出本次请求尝试上游的顺序"""
+
+    def __init__(self, upstreams: Sequence[Upstream], strategy: str = "round-robin"):
+        if not upstreams:
+            raise ValueError("上游池为空")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"不支持的路由策略: {strategy}（可选: {', '.join(STRATEGIES)}）")
+        self.upstreams = list(upstreams)
+        self.strategy = strategy
+        self._counter = itertools.count()
+        # 请求中出现任一上游的快速小模型时，改写为所选上游的快速小模型
+        self.small_fast_models = {u.small_fast_model for u in self.upstreams
+                                  if u.small_fast_model and u.small_fast_model != u.model_id}
+
+    def order(self) -> List[Upstream]:
+        """第一个为首选上游，其余在首选上游连接失败时依次尝试"""
+        start = next(self._counter) % len(self.upstreams)
+        ordered = self.upstreams[start:] + self.upstreams[:start]
+        if self.strategy == "least-outstanding":
+            # 稳定排序：未完成请求数相同的上游之间仍然轮询
+            ordered.sort(key=lambda upstream: upstream.outstanding)
+        return ordered
+
+    def rewrite_body(self, body: bytes, upstream: Upstream) -> bytes:
+        """将JSON请求体中的model改写为上游的模型ID，非JSON请求体原样返回"""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+        if not isinstance(data, dict) or "model" not in data:
+            return body
+        if data["model"] in self.small_fast_models and upstream.small_fast_model:
+            data["model"] = upstream.small_fast_model
+        else:
+            data["model"] = upstream.model_id
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+    def close(self) -> None:
+        for upstream in self.upstreams:
+            upstream.close()
+
+
+def build_upstreams(manager: "ConfigManager", targets: Sequence[str],
+                    previous: Optional[UpstreamPool] = None) -> List[Upstream]:
+    """由 配置[:模型] 列表构建上游，无法解析时抛出ValueError
+
+    热加载时传入原来的上游池：rate_limit 未变化的配置沿用原来的限速器，
+    排队中的请求、并发计数、令牌桶和 Retry-After 暂停不会因为修改了其他配置项而被重置。
+    """
+    from claude_switch.config import resolve_run_target
+
+    existing = {upstream.name.split(":", 1)[0]: upstream.limiter
+                for upstream in (previous.upstreams if previous is not None else ()) if upstream.limiter is not None}
+    upstreams = []
+    limiters: Dict[str, Optional[RateLimiter]] = {}
+    for target in targets:
+        config_name, model, env_vars, _ = resolve_run_target(manager, target)
+        if config_name not in limiters:
+            limiter = RateLimiter.from_config(manager.get_config(config_name).rate_limit)
+            old = existing.get(config_name)
+            if limiter is not None and old is not None and old.settings() == limiter.settings():
+                limiter = old
+            limiters[config_name] = limiter
+        upstreams.append(Upstream(
+            f"{config_name}:{model}", env_vars["ANTHROPIC_BASE_URL"], env_vars["ANTHROPIC_API_KEY"],
+            env_vars["ANTHROPIC_MODEL"], env_vars["ANTHROPIC_SMALL_FAST_MODEL"],
+            int(env_vars["API_TIMEOUT_MS"]) / 1000,
+            # 配置未设置API密钥时沿用环境中的 ANTHROPIC_AUTH_TOKEN
+            auth_token=os.environ.get("ANTHROPIC_AUTH_TOKEN", ""),
+            limiter=limiters[config_name],
+        ))
+    return upstreams
+
+
+def _format_head(start_line: str, headers: Headers) -> bytes:
+    lines = [start_line] + [f"{name}: {value}" for name, value in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+
+class ProxyServer:
+    """本地代理服务器"""
+
+    def __init__(self, pool: UpstreamPool, token: Optional[str] = None, host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT, ssl_context: Optional[ssl.SSLContext] = None,
+                 cache: Optional[ResponseCache] = None, cache_mode: str = "deterministic"):
+        self.pool = pool
+        self.token = token or secrets.token_urlsafe(32)
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.cache = cache
+        self.cache_mode = cache_mode
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """停止监听并断开所有客户端连接"""
+        if self.server is not None:
+            self.server.close()
+        for task in list(self._clients):
+            task.cancel()
+        if self._clients:
+            await asyncio.gather(*self._clients, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        self.pool.close()
+
+    def replace_pool(self, pool: UpstreamPool) -> None:
+        """替换上游池（配置热加载后调用），进行中的请求继续使用原来的上游"""
+        previous, self.pool = self.pool, pool
+        previous.close()
+
+    def _authorized(self, headers: Headers) -> bool:
+        supplied = get_header(headers, "x-api-key")
+        authorization = get_header(headers, "authorization") or ""
+        if supplied is None and authorization.lower().startswith("bearer "):
+            supplied = authorization[7:].strip()
+        return supplied is not None and secrets.compare_digest(supplied, self.token)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self._clients.add(task)
+        try:
+            while True:
+                try:
+                    head = await read_head(reader)
+                    if head is None:
+                        break
+                    method, target, version = head[0].split(" ", 2)
+                    body = await read_body(reader, head[1])
+                except ValueError as e:
+                    await self._respond_error(writer, 400, "invalid_request_error", f"无效的请求: {e}", False)
+                    break
+                headers = head[1]
+                keep_alive = (version == "HTTP/1.1"
+                              and (get_header(headers, "connection") or "").lower() != "close")
+
+                if not self._authorized(headers):
+                    await self._respond_error(writer, 401, "authentication_error",
+                                              "无效的代理令牌，请使用 'ccs run --via-proxy' 启动", keep_alive)
+                elif not target.startswith("/"):
+                    await self._respond_error(writer, 400, "invalid_request_error", "只支持相对路径请求",
+                                              keep_alive)
+                elif target == STATS_PATH and method == "GET":
+                    await self._respond_json(writer, 200, self.stats(), keep_alive)
+                else:
+                    try:
+                        keep_alive = await self._forward(method, target, headers, body, writer, keep_alive)
+                    except ProxyError as e:
+                        await self._respond_error(writer, 502, "api_error", f"所有上游均不可用: {e}", keep_alive)
+                if not keep_alive:
+                    break
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._clients.discard(task)  # type: ignore[arg-type]
+
+    async def _respond_json(self, writer: asyncio.StreamWriter, status: int, data: Any, keep_alive: bool) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        writer.write(_format_head(f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}", [
+            ("content-type", "application/json"),
+            ("content-length", str(len(body))),
+            ("connection", "keep-alive" if keep_alive else "close"),
+        ]) + body)
+        await writer.drain()
+
+    async def _respond_error(self, writer: asyncio.StreamWriter, status: int, error_type: str,
+                             message: str, keep_alive: bool) -> None:
+        await self._respond_json(writer, status, {"type": "error", "error": {"type": error_type, "message": message}},
+                                 keep_alive)
+
+    def stats(self) -> Dict[str, Any]:
+        """上游、限速队列和响应缓存的统计信息"""
+        rate_limits: Dict[str, Any] = {}
+        for upstream in self.pool.upstreams:
+            if upstream.limiter is not None:
+                config_name = upstream.name.partition(":")[0]
+                rate_limits.setdefault(config_name, upstream.limiter.stats())
+        cache = None
+        if self.cache is not None:
+            cache = {"mode": self.cache_mode, "hits": self.cache.hits, "misses": self.cache.misses,
+                     "evictions": self.cache.evictions, "bytes": self.cache.total_bytes}
+        return {"strategy": self.pool.strategy, "upstreams": [u.stats() for u in self.pool.upstreams],
+                "rate_limits": rate_limits, "cache": cache}
+
+    def _upstream_request(self, upstream: Upstream, method: str, target: str,
+                          headers: Headers, body: bytes) -> bytes:
+        skipped = HOP_BY_HOP_HEADERS | {"host", "content-length", "x-api-key", "authorization", BYPASS_HEADER}
+        forwarded: Headers = [("Host", upstream.host_header)]
+        forwarded += [(name, value) for name, value in headers if name.lower() not in skipped]
+        forwarded += upstream.auth_headers()
+        if body or method in ("POST", "PUT", "PATCH"):
+            forwarded.append(("Content-Length", str(len(body))))
+        forwarded.append(("Connection", "keep-alive"))
+        return _format_head(f"{method} {upstream.path_prefix}{target} HTTP/1.1", forwarded) + body
+
+    async def _roundtrip(self, connection: Connection, data: bytes, timeout: float) -> Tuple[str, Headers]:
+        reader, writer = connection
+        writer.write(data)
+        await writer.drain()
+        head = await asyncio.wait_for(read_head(reader), timeout)
+        if head is None:
+            raise ConnectionError("上游关闭了连接")
+        return head
+
+    async def _send(self, upstream: Upstream, data: bytes) -> Tuple[Connection, Tuple[str, Headers]]:
+        """发送请求并读取响应头；复用的空闲连接已被上游关闭时改用新连接重试一次"""
+        connection = upstream.take_idle()
+        if connection is not None:
+            try:
+                return connection, await self._roundtrip(connection, data, upstream.timeout)
+            except asyncio.TimeoutError:
+                connection[1].close()
+                raise
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                connection[1].close()
+        connection = await upstream.connect(self.ssl_context)
+        try:
+            return connection, await self._roundtrip(connection, data, upstream.timeout)
+        except BaseException:
+            connection[1].close()
+            raise
+
+    def _cache_status(self, pool: UpstreamPool, method: str, target: str, headers: Headers, body: bytes,
+                      upstream: Upstream) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (缓存状态头部的值, 缓存键)，请求不使用缓存时缓存键为None"""
+        if self.cache is None or method != "POST":
+            return None, None
+        if ((get_header(headers, BYPASS_HEADER) or "").lower() == "bypass"
+                or "no-cache" in (get_header(headers, "cache-control") or "").lower()):
+            return "bypass", None
+        try:
+            data = json.loads(pool.rewrite_body(body, upstream))
+        except ValueError:
+            return None, None
+        if not is_cacheable(data, self.cache_mode):
+            return None, None
+        key_headers = {name: get_header(headers, name) or "" for name in KEY_HEADERS}
+        return "miss", request_key(target, data, key_headers)
+
+    async def _replay(self, cached: CachedResponse, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        """重放缓存的响应：SSE响应按事件逐块发送，与上游的流式响应一致"""
+        headers = cached.headers + [(BYPASS_HEADER, "hit")]
+        connection = ("connection", "keep-alive" if keep_alive else "close")
+        if cached.is_event_stream:
+            writer.write(_format_head(f"HTTP/1.1 {cached.status} OK",
+                                      headers + [("transfer-encoding", "chunked"), connection]))
+            for event in cached.events():
+                writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+            writer.write(b"0\r\n\r\n")
+        else:
+            writer.write(_format_head(f"HTTP/1.1 {cached.status} OK",
+                                      headers + [("content-length", str(len(cached.body))), connection]))
+            writer.write(cached.body)
+        await writer.drain()
+
+    async def _forward(self, method: str, target: str, headers: Headers, body: bytes,
+                       writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        """转发请求并将响应写回客户端，返回客户端连接能否继续使用
+
+        在收到响应头之前失败时依次尝试下一个上游；响应开始转发后出错则直接关闭客户端连接。
+        可缓存的请求命中缓存时直接重放，不访问上游。
+        """
+        # 热加载替换上游池时，本次请求仍使用开始时的上游池
+        pool = self.pool
+        ordered = pool.order()
+        cache_status, cache_key = self._cache_status(pool, method, target, headers, body, ordered[0])
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)  # type: ignore[union-attr]
+            if cached is not None:
+                await self._replay(cached, writer, keep_alive)
+                return keep_alive
+
+        errors = []
+        for upstream in ordered:
+            upstream_body = pool.rewrite_body(body, upstream)
+            data = self._upstream_request(upstream, method, target, headers, upstream_body)
+            limiter = upstream.limiter
+            estimated = estimate_tokens(upstream_body) if limiter is not None else 0
+            actual: Optional[int] = None
+            admitted = False
+            # 排队中的请求也计入未完成请求数，least-outstanding 会避开正在限速的上游
+            upstream.outstanding += 1
+            try:
+                if limiter is not None:
+                    await limiter.acquire(estimated)
+                    admitted = True
+                upstream.requests += 1
+                try:
+                    connection, (status_line, response_headers) = await self._send(upstream, data)
+                # Python 3.11之前 asyncio.TimeoutError 不是 OSError 的子类
+                except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        ssl.SSLError) as e:
+                    upstream.failures += 1
+                    errors.append(f"{upstream.name}: {str(e) or type(e).__name__}")
+                    continue
+
+                version, _, rest = status_line.partition(" ")
+                try:
+                    status = int(rest.split(" ", 1)[0])
+                except ValueError:
+                    connection[1].close()
+                    upstream.failures += 1
+                    errors.append(f"{upstream.name}: 无效的响应 {status_line!r}")
+                    continue
+                if status == 429 and limiter is not None:
+                    try:
+                        limiter.pause(float(get_header(response_headers, "retry-after") or 0))
+                    except ValueError:
+                        pass
+                framed = _is_framed(response_headers, method, status)
+                keep_alive = keep_alive and framed
+                upstream_reusable = (framed and version == "HTTP/1.1" and
+                                     (get_header(response_headers, "connection") or "").lower() != "close")
+
+                forwarded = [(name, value) for name, value in response_headers
+                             if name.lower() not in HOP_BY_HOP_HEADERS or name.lower() == "transfer-encoding"]
+                if cache_status is not None:
+                    forwarded.append((BYPASS_HEADER, cache_status))
+                forwarded.append(("connection", "keep-alive" if keep_alive else "close"))
+                writer.write(_format_head(f"HTTP/1.1 {rest}", forwarded))
+                cacheable = cache_key is not None and status == 200
+                count_usage = limiter is not None and bool(limiter.tokens_per_minute)
+                capture = bytearray() if cacheable or count_usage else None
+                try:
+                    await relay_body(connection[0], writer, response_headers, method, status, capture)
+                except BaseException:
+                    connection[1].close()
+                    raise
+                if upstream_reusable:
+                    upstream.release(connection)
+                else:
+                    connection[1].close()
+                if count_usage:
+                    actual = usage_tokens(bytes(capture))  # type: ignore[arg-type]
+                if cacheable:
+                    # 首选上游失败时，响应来自模型ID不同的备用上游，按实际发送给它的请求体计算缓存键
+                    store_key = cache_key if upstream is ordered[0] else self._cache_status(
+                        pool, method, target, headers, body, upstream)[1]
+                    stored = [(name, value) for name, value in response_headers
+                              if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "content-length"]
+                    if store_key is not None:
+                        self.cache.put(store_key, CachedResponse(status, stored, bytes(capture)))  # type: ignore
+                return keep_alive
+            finally:
+                upstream.outstanding -= 1
+                if admitted:
+                    await limiter.release(estimated, actual)  # type: ignore[union-attr]
+        raise ProxyError("; ".join(errors))
+
+
+def state_path(cache_dir: Path) -> Path:
+    return cache_dir / PROXY_STATE_NAME
+
+
+def write_state(cache_dir: Path, server: ProxyServer, targets: Sequence[str]) -> None:
+    """记录代理地址和令牌（权限0600，令牌可以使用上游的API密钥）"""
+    data = {"pid": os.getpid(), "url": server.url, "token": server.token, "targets": list(targets),
+            "strategy": server.pool.strategy, "cache": server.cache_mode if server.cache is not None else None}
+    path = state_path(cache_dir)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_state(cache_dir: Path) -> Optional[Dict[str, Any]]:
+    """读取正在运行的代理信息，代理未运行时返回None"""
+    try:
+        with open(state_path(cache_dir), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        os.kill(int(data["pid"]), 0)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def fetch_stats(state: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
+    """从正在运行的代理获取统计信息"""
+    import http.client
+
+    parts = urlsplit(state["url"])
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    try:
+        connection.request("GET", STATS_PATH, headers={"x-api-key": state["token"]})
+        response = connection.getresponse()
+        data = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise OSError(data.get("error", {}).get("message", f"HTTP {response.status}"))
+    return data
+
+
+def remove_state(cache_dir: Path) -> None:
+    """删除本进程写入的代理信息"""
+    data = read_state(cache_dir)
+    if data is not None and data.get("pid") == os.getpid():
+        try:
+            os.unlink(state_path(cache_dir))
+        except OSError:
+            pass
+
+
+def serve(server: ProxyServer, cache_dir: Path, targets: Sequence[str], on_ready=None) -> None:
+    """在前台运行代理，直到收到SIGINT/SIGTERM"""
+    import signal
+
+    async def main() -> None:
+        await server.start()
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set)
+        write_state(cache_dir, server, targets)
+        try:
+            if on_ready is not None:
+                on_ready(server)
+            await stopped.wait()
+        finally:
+            remove_state(cache_dir)
+            await server.close()
+
+    asyncio.run(main())
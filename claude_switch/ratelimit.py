@@ -0,0 +1,189 @@
+"""
+速率限制模块
+
+配置的 `rate_limit`（每分钟请求数、每分钟token数、最大并发数）由 `ccs proxy` 执行：同一配置的
+所有上游共享一个令牌桶调度器，超出限制的请求按到达顺序排队等待，而不是各个会话分别收到429后
+各自退避。token数在请求前按请求体大小估算，响应结束后按响应中的 usage 校正。
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+# 估算时每个token大约对应的字节数
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(body: bytes) -> int:
+    """按请求体大小估算输入token数"""
+    return max(1, len(body) // BYTES_PER_TOKEN)
+
+
+def _usage_total(usage: Any) -> int:
+    if not isinstance(usage, dict):
+        return 0
+    return sum(value for name, value in usage.items()
+               if name in ("input_tokens", "output_tokens", "cache_creation_input_tokens")
+               and isinstance(value, int))
+
+
+def usage_tokens(body: bytes) -> Optional[int]:
+    """从JSON或SSE响应体中读取实际消耗的token数，没有usage时返回None"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        return _usage_total(data.get("usage")) if "usage" in data else None
+
+    total = None
+    for line in body.splitlines():
+        if not line.startswith(b"data:"):
+            continue
+        try:
+            event = json.loads(line[5:])
+        except ValueError:
+            continue
+        if not isinstance(event, dict):
+            continue
+        usage = event.get("usage")
+        if isinstance(event.get("message"), dict):
+            usage = event["message"].get("usage", usage)
+        if usage is not None:
+            total = (total or 0) + _usage_total(usage)
+    return total
+
+
+class RateLimiter:
+    """令牌桶调度器：请求和token两个桶加上并发上限，等待的请求严格按先来先服务放行"""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrent: int = 0, clock=time.monotonic):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrent = max_concurrent
+        self._clock = clock
+        self._request_level = float(requests_per_minute)
+        self._token_level = float(tokens_per_minute)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._queue: Deque[object] = deque()
+        self._condition: Optional[asyncio.Condition] = None
+        self.active = 0
+        self.admitted = 0
+        self.tokens = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @classmethod
+    def from_config(cls, rate_limit) -> Optional["RateLimiter"]:
+        """由配置的 RateLimit 创建，未设置任何限制时返回None"""
+        if rate_limit is None:
+            return None
+        limiter = cls(rate_limit.requests_per_minute, rate_limit.tokens_per_minute, rate_limit.max_concurrent)
+        if not (limiter.requests_per_minute or limiter.tokens_per_minute or limiter.max_concurrent):
+            return None
+        return limiter
+
+    def settings(self) -> Tuple[int, int, int]:
+        """限速设置 (requests_per_minute, tokens_per_minute, max_concurrent)"""
+        return self.requests_per_minute, self.tokens_per_minute, self.max_concurrent
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def _refill(self) -> float:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._request_level = min(float(self.requests_per_minute),
+                                      self._request_level + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._token_level = min(float(self.tokens_per_minute),
+                                    self._token_level + elapsed * self.tokens_per_minute / 60)
+        return now
+
+    def _delay(self, tokens: int) -> float:
+        """当前还需要等待多久才能放行一个消耗tokens的请求"""
+        now = self._refill()
+        delay = max(0.0, self._paused_until - now)
+        if self.requests_per_minute and self._request_level < 1:
+            delay = max(delay, (1 - self._request_level) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            # 单个请求超过整个桶容量时，等桶满后放行
+            needed = min(tokens, self.tokens_per_minute)
+            if self._token_level < needed:
+                delay = max(delay, (needed - self._token_level) * 60 / self.tokens_per_minute)
+        return delay
+
+    async def acquire(self, tokens: int) -> float:
+        """排队直到可以发送请求，返回等待的秒数；放行后必须调用 release"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        start = self._clock()
+        ticket = object()
+        self._queue.append(ticket)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        async with self._condition:
+            try:
+                while True:
+                    timeout: Optional[float] = None
+                    if self._queue[0] is ticket:
+                        delay = self._delay(tokens)
+                        if delay > 0:
+                            timeout = delay
+                        elif not self.max_concurrent or self.active < self.max_concurrent:
+                            break
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                # 放行或取消后让下一个排队的请求重新检查
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+            if self.requests_per_minute:
+                self._request_level -= 1
+            if self.tokens_per_minute:
+                self._token_level -= tokens
+            self.active += 1
+            self.admitted += 1
+            self.tokens += tokens
+        waited = self._clock() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    async def release(self, estimated: int, actual: Optional[int] = None) -> None:
+        """请求结束：释放并发名额，并按实际用量校正token桶"""
+        self.active -= 1
+        if actual is not None:
+            self.tokens += actual - estimated
+            if self.tokens_per_minute:
+                self._token_level = min(float(self.tokens_per_minute), self._token_level - (actual - estimated))
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """上游返回429时，在Retry-After期间暂停放行"""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "tokens": self.tokens,
+            "total_wait_s": round(self.total_wait, 3),
+            "avg_wait_s": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+            "max_wait_s": round(self.max_wait, 3),
+        }
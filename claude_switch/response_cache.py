@@ -0,0 +1,177 @@
+"""
+响应缓存模块
+
+`ccs proxy --cache` 将确定性请求（temperature为0；`--cache all` 时为所有请求）的完整响应保存在
+cache/responses/ 中，相同的请求再次出现时直接在本地重放（包括SSE流式响应），不再产生网络往返和
+token消耗。缓存按总大小做LRU淘汰，并在有效期后过期；请求带有 `x-ccs-cache: bypass` 或
+`Cache-Control: no-cache` 头部时跳过缓存（`ccs run --via-proxy --no-cache`）。
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+RESPONSES_DIR_NAME = "responses"
+CACHE_MODES = ("deterministic", "all")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 24 * 3600.0
+BYPASS_HEADER = "x-ccs-cache"
+# 影响响应内容、需要计入缓存键的请求头
+KEY_HEADERS = ("anthropic-version", "anthropic-beta")
+# 不影响模型输出的请求字段（Claude Code 的 metadata.user_id 每个会话都不同）
+IGNORED_FIELDS = ("metadata",)
+
+
+def cache_ttl() -> float:
+    """缓存有效期（秒），可通过 CCS_RESPONSE_CACHE_TTL 设置"""
+    try:
+        return float(os.environ.get("CCS_RESPONSE_CACHE_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def is_cacheable(data: Any, mode: str) -> bool:
+    """请求是否可以缓存：deterministic 模式下只缓存 temperature 为0的请求"""
+    if not isinstance(data, dict) or "messages" not in data:
+        return False
+    return mode == "all" or data.get("temperature") == 0
+
+
+def request_key(path: str, data: Dict[str, Any], headers: Mapping[str, str]) -> str:
+    """请求的缓存键：路径、相关请求头和规范化（键排序、去除无关字段）后的请求体的哈希"""
+    normalized = {name: value for name, value in data.items() if name not in IGNORED_FIELDS}
+    payload = json.dumps([path, [headers.get(name, "") for name in KEY_HEADERS], normalized],
+                         sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    """缓存的完整响应，body 为去除传输编码后的响应体"""
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    created: float = 0.0
+
+    @property
+    def is_event_stream(self) -> bool:
+        return any(name.lower() == "content-type" and value.startswith("text/event-stream")
+                   for name, value in self.headers)
+
+    def events(self) -> List[bytes]:
+        """按SSE事件切分响应体，用于逐事件重放"""
+        events = []
+        start = 0
+        while True:
+            end = self.body.find(b"\n\n", start)
+            if end < 0:
+                break
+            events.append(self.body[start:end + 2])
+            start = end + 2
+        if start < len(self.body):
+            events.append(self.body[start:])
+        return events
+
+
+class ResponseCache:
+    """磁盘上的响应缓存：每个条目一个文件，按最近使用时间（mtime）做LRU淘汰"""
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sizes: Optional[Dict[str, int]] = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def _entry_sizes(self) -> Dict[str, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            try:
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".bin"):
+                        self._sizes[entry.name[:-4]] = entry.stat().st_size
+            except OSError:
+                pass
+        return self._sizes
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entry_sizes().values())
+
+    def _remove(self, key: str) -> None:
+        self._entry_sizes().pop(key, None)
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """读取未过期的缓存响应并标记为最近使用，未命中时返回None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            response = CachedResponse(meta["status"], [tuple(h) for h in meta["headers"]],  # type: ignore[misc]
+                                      body, meta["created"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        if time.time() - response.created > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        """写入缓存并在超过总大小上限时淘汰最久未使用的条目，失败时静默忽略"""
+        meta = {"status": response.status, "headers": response.headers, "created": response.created or time.time()}
+        data = json.dumps(meta, ensure_ascii=False).encode('utf-8') + b"\n" + response.body
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._entry_sizes()[key] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        sizes = self._entry_sizes()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        used = []
+        for key in sizes:
+            try:
+                used.append((os.stat(self._path(key)).st_mtime_ns, key))
+            except OSError:
+                used.append((0, key))
+        for _, key in sorted(used):
+            if total <= self.max_bytes:
+                break
+            total -= sizes.get(key, 0)
+            self._remove(key)
+            self.evictions += 1
@@ -0,0 +1,204 @@
+"""
+静态Shell补全脚本生成模块
+
+生成内嵌了当前 config:model 候选项的 bash/zsh/fish 补全脚本，按TAB时完全由Shell处理，
+不再回调Python。已安装的脚本在配置保存或通过 `ccs edit` 编辑后自动重新生成。
+"""
+import os
+import re
+import shlex
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from claude_switch.config import ConfigManager
+
+SHELLS = ("bash", "zsh", "fish")
+PROG_NAMES = ("ccs", "claude-switch")
+# 位置参数为 config:model 的子命令
+CONFIG_MODEL_COMMANDS = ("run", "env", "fanout", "proxy")
+SCRIPT_HEADER = "ccs 静态补全脚本，由 `ccs completion generate` 生成；配置变更后自动更新，请勿手动修改"
+
+_MARKUP_RE = re.compile(r"\[/?[a-z ]+\]")
+
+Entries = List[Tuple[str, str]]
+
+
+def _one_line(text: str) -> str:
+    return " ".join(_MARKUP_RE.sub("", text or "").split())
+
+
+def collect_commands() -> Tuple[Entries, Dict[str, Entries]]:
+    """从typer应用中收集顶层命令及命令组的子命令"""
+    import typer.main
+    from claude_switch.main import app
+
+    group = typer.main.get_command(app)
+    commands: Entries = []
+    subcommands: Dict[str, Entries] = {}
+    for name, command in group.commands.items():
+        if getattr(command, "hidden", False):
+            continue
+        commands.append((name, _one_line(command.get_short_help_str(limit=80))))
+        children = getattr(command, "commands", None)
+        if children:
+            subcommands[name] = [
+                (child_name, _one_line(child.get_short_help_str(limit=80)))
+                for child_name, child in children.items()
+            ]
+    return commands, subcommands
+
+
+def _bash_script(commands: Entries, subcommands: Dict[str, Entries], candidates: Entries) -> str:
+    lines = [f"# {SCRIPT_HEADER}"]
+    lines.append("_ccs_static_commands=(" + " ".join(shlex.quote(name) for name, _ in commands) + ")")
+    lines.append("_ccs_static_candidates=(")
+    lines.extend(f"    {shlex.quote(name)}" for name, _ in candidates)
+    lines.append(")")
+    cases = "\n".join(
+        f"        {shlex.quote(group)}) subcommands={shlex.quote(' '.join(name for name, _ in children))} ;;"
+        for group, children in subcommands.items()
+    )
+    config_commands = " ".join(CONFIG_MODEL_COMMANDS)
+    lines.append(f'''
+_ccs_static_complete() {{
+    local line="${{COMP_LINE:0:COMP_POINT}}"
+    local cur="${{line##*[[:space:]]}}"
+    local -a words
+    read -ra words <<< "$line"
+    local position=${{#words[@]}}
+    [[ -n "$cur" ]] && position=$((position - 1))
+    COMPREPLY=()
+
+    if (( position == 1 )); then
+        COMPREPLY=($(compgen -W "${{_ccs_static_commands[*]}}" -- "$cur"))
+        return
+    fi
+
+    local subcommands=""
+    case "${{words[1]}}" in
+{cases}
+    esac
+    if (( position == 2 )) && [[ -n "$subcommands" ]]; then
+        COMPREPLY=($(compgen -W "$subcommands" -- "$cur"))
+        return
+    fi
+
+    if [[ " {config_commands} " == *" ${{words[1]}} "* && "$cur" != -* ]]; then
+        local candidate
+        for candidate in "${{_ccs_static_candidates[@]}}"; do
+            if [[ "$candidate" == "$cur"* ]] || [[ "$cur" != *:* && "${{candidate#*:}}" == "$cur"* ]]; then
+                COMPREPLY+=("$candidate")
+            fi
+        done
+        # bash按冒号拆分单词，只需补全最后一个冒号之后的部分
+        if [[ "$cur" == *:* && "$COMP_WORDBREAKS" == *:* ]]; then
+            local colon_prefix="${{cur%"${{cur##*:}}"}}"
+            local i
+            for i in "${{!COMPREPLY[@]}}"; do
+                COMPREPLY[$i]="${{COMPREPLY[$i]#"$colon_prefix"}}"
+            done
+        fi
+    fi
+}}
+complete -F _ccs_static_complete {" ".join(PROG_NAMES)}''')
+    return "\n".join(lines) + "\n"
+
+
+def _zsh_entry(name: str, description: str) -> str:
+    return shlex.quote(f"{name.replace(':', chr(92) + ':')}:{description}")
+
+
+def _zsh_script(commands: Entries, subcommands: Dict[str, Entries], candidates: Entries) -> str:
+    lines = [f"#compdef {' '.join(PROG_NAMES)}", f"# {SCRIPT_HEADER}", "_ccs_static_complete() {"]
+    lines.append("    local -a commands subcommands candidates")
+    lines.append("    commands=(")
+    lines.extend(f"        {_zsh_entry(name, help_text)}" for name, help_text in commands)
+    lines.append("    )")
+    lines.append("    candidates=(")
+    lines.extend(f"        {_zsh_entry(name, help_text)}" for name, help_text in candidates)
+    lines.append("    )")
+    cases = "\n".join(
+        f"        {shlex.quote(group)}) subcommands=("
+        + " ".join(_zsh_entry(name, help_text) for name, help_text in children) + ") ;;"
+        for group, children in subcommands.items()
+    )
+    config_commands = " ".join(CONFIG_MODEL_COMMANDS)
+    lines.append(f'''
+    if (( CURRENT == 2 )); then
+        _describe -t commands 'ccs 命令' commands
+        return
+    fi
+    case ${{words[2]}} in
+{cases}
+    esac
+    if (( CURRENT == 3 && ${{#subcommands}} )); then
+        _describe -t commands '子命令' subcommands
+    elif [[ " {config_commands} " == *" ${{words[2]}} "* && ${{words[CURRENT]}} != -* ]]; then
+        _describe -t profiles '配置:模型' candidates
+    fi
+}}
+compdef _ccs_static_complete {" ".join(PROG_NAMES)}''')
+    return "\n".join(lines) + "\n"
+
+
+def _fish_quote(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _fish_script(commands: Entries, subcommands: Dict[str, Entries], candidates: Entries) -> str:
+    lines = [f"# {SCRIPT_HEADER}", "function __ccs_static_candidates"]
+    if candidates:
+        lines.append("    printf '%s\\t%s\\n' \\")
+        lines.extend(f"        {_fish_quote(name)} {_fish_quote(help_text)} \\" for name, help_text in candidates)
+        lines[-1] = lines[-1][:-2]
+    lines.append("end")
+    lines.append("")
+    for prog in PROG_NAMES:
+        lines.append(f"complete -c {prog} -e")
+        lines.append(f"complete -c {prog} -f")
+        for name, help_text in commands:
+            lines.append(f"complete -c {prog} -n __fish_use_subcommand -a {_fish_quote(name)} -d {_fish_quote(help_text)}")
+        for group, children in subcommands.items():
+            for name, help_text in children:
+                lines.append(
+                    f"complete -c {prog} -n {_fish_quote('__fish_seen_subcommand_from ' + group)} "
+                    f"-a {_fish_quote(name)} -d {_fish_quote(help_text)}"
+                )
+        condition = _fish_quote("__fish_seen_subcommand_from " + " ".join(CONFIG_MODEL_COMMANDS))
+        lines.append(f"complete -c {prog} -n {condition} -a '(__ccs_static_candidates)'")
+    return "\n".join(lines) + "\n"
+
+
+_GENERATORS = {"bash": _bash_script, "zsh": _zsh_script, "fish": _fish_script}
+
+
+def generate_script(shell: str, manager: "ConfigManager") -> str:
+    """生成指定Shell的静态补全脚本"""
+    if shell not in _GENERATORS:
+        raise ValueError(f"不支持的Shell: {shell}（可选: {', '.join(SHELLS)}）")
+    index = manager.get_completion_index()
+    candidates = [(name, _one_line(help_text)) for name, help_text in zip(index.names, index.helps)]
+    commands, subcommands = collect_commands()
+    return _GENERATORS[shell](commands, subcommands, candidates)
+
+
+def script_path(manager: "ConfigManager", shell: str) -> Path:
+    """已安装补全脚本的路径"""
+    return manager.config_dir / "completions" / f"ccs.{shell}"
+
+
+def install_script(shell: str, manager: "ConfigManager") -> Path:
+    """生成并写入补全脚本，返回脚本路径"""
+    path = script_path(manager, shell)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(generate_script(shell, manager), encoding='utf-8')
+    os.replace(tmp_path, path)
+    return path
+
+
+def refresh_installed_scripts(manager: "ConfigManager") -> List[Path]:
+    """重新生成所有已安装的补全脚本，未安装任何脚本时直接返回"""
+    installed = [shell for shell in SHELLS if script_path(manager, shell).exists()]
+    return [install_script(shell, manager) for shell in installed]
@@ -0,0 +1,77 @@
+"""
+Shell环境变量导出模块
+
+`ccs env` 输出可直接 eval 的 export/unset 语句，`ccs shell-init` 输出定义 `ccs-use` 函数的脚本，
+在当前Shell中切换配置后，直接运行 `claude` 不再经过Python进程。
+"""
+import json
+import shlex
+from typing import Dict, List, Mapping, Tuple
+
+SHELLS = ("bash", "zsh", "fish", "json")
+INIT_SHELLS = ("bash", "zsh", "fish")
+USE_FUNCTION = "ccs-use"
+
+
+def env_changes(env_vars: Mapping[str, str], environ: Mapping[str, str]) -> Tuple[Dict[str, str], List[str]]:
+    """计算需要设置和删除的环境变量
+
+    ANTHROPIC_API_KEY 非空时删除 ANTHROPIC_AUTH_TOKEN；API_KEY 为空而环境中已有
+    AUTH_TOKEN 时保留 AUTH_TOKEN 并删除 API_KEY，避免两者同时生效。
+    """
+    exports = dict(env_vars)
+    unsets: List[str] = []
+    if exports.get("ANTHROPIC_API_KEY"):
+        unsets.append("ANTHROPIC_AUTH_TOKEN")
+    elif environ.get("ANTHROPIC_AUTH_TOKEN"):
+        exports.pop("ANTHROPIC_API_KEY", None)
+        unsets.append("ANTHROPIC_API_KEY")
+    return exports, unsets
+
+
+def apply_env_vars(env_vars: Mapping[str, str], environ: Mapping[str, str]) -> Dict[str, str]:
+    """将配置的环境变量合并到environ的副本中"""
+    exports, unsets = env_changes(env_vars, environ)
+    merged = dict(environ)
+    merged.update(exports)
+    for name in unsets:
+        merged.pop(name, None)
+    return merged
+
+
+def _fish_quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def render_env(shell: str, exports: Mapping[str, str], unsets: List[str]) -> str:
+    """生成指定Shell的环境变量设置语句"""
+    if shell == "json":
+        return json.dumps({"set": dict(exports), "unset": unsets}, ensure_ascii=False, indent=2) + "\n"
+    if shell == "fish":
+        lines = [f"set -gx {name} {_fish_quote(value)};" for name, value in exports.items()]
+        lines.extend(f"set -e {name};" for name in unsets)
+    elif shell in ("bash", "zsh"):
+        lines = [f"export {name}={shlex.quote(value)};" for name, value in exports.items()]
+        lines.extend(f"unset {name};" for name in unsets)
+    else:
+        raise ValueError(f"不支持的Shell: {shell}（可选: {', '.join(SHELLS)}）")
+    return "\n".join(lines) + "\n"
+
+
+def shell_init_script(shell: str) -> str:
+    """生成定义 ccs-use 函数的初始化脚本"""
+    if shell == "fish":
+        return f"""function {USE_FUNCTION} --description '在当前Shell中切换Claude Code配置'
+    set -l __ccs_env (command ccs env --shell fish $argv)
+    or return $status
+    printf '%s\\n' $__ccs_env | source
+end
+"""
+    if shell in ("bash", "zsh"):
+        return f"""{USE_FUNCTION}() {{
+    local __ccs_env
+    __ccs_env="$(command ccs env --shell {shell} "$@")" || return
+    eval "$__ccs_env"
+}}
+"""
+    raise ValueError(f"不支持的Shell: {shell}（可选: {', '.join(INIT_SHELLS)}）")
@@ -0,0 +1,167 @@
+"""
+配置快照缓存模块
+
+将解析后的配置数据以 marshal 格式缓存在 cache 目录中，避免每次启动都重新解析 YAML。
+快照以源文件的 mtime、大小和内容哈希为键，任一项不匹配即视为失效。
+
+快照文件由一个很小的头部和数据区组成。每个配置在数据区中单独序列化为一个数据块
+（profile blob），头部只记录名称和偏移量，读取快照时不会解码任何配置，
+具体配置在首次访问时才解码，因此启动耗时基本不随配置数量增长。
+"""
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+SNAPSHOT_VERSION = 3
+SNAPSHOT_SUFFIX = ".snap"
+
+_HEADER_LEN = struct.Struct("<I")
+
+
+def snapshot_path(cache_dir: Path, source: Path) -> Path:
+    """获取源文件对应的快照文件路径"""
+    key = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:16]
+    return cache_dir / f"{source.name}.{key}{SNAPSHOT_SUFFIX}"
+
+
+def content_digest(raw: bytes) -> str:
+    """计算源文件内容哈希"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def pack_profiles(configs_data: Dict[str, dict]) -> Dict[str, bytes]:
+    """将每个配置单独序列化为数据块，含有不支持的类型时抛出ValueError"""
+    return {name: marshal.dumps(config_data) for name, config_data in configs_data.items()}
+
+
+def unpack_profile(blob) -> dict:
+    """解码单个配置数据块"""
+    return marshal.loads(blob)
+
+
+class Snapshot:
+    """已加载的快照：元数据、按配置拆分的数据块和按需解码的附加数据段"""
+
+    def __init__(self, meta: Any, names: List[str], bounds: List[int],
+                 sections: Dict[str, tuple], body, body_offset: int):
+        self.meta = meta
+        self.names = names
+        self._bounds = bounds
+        self._sections = sections
+        self._body = body
+        self._body_offset = body_offset
+
+    def _read(self, start: int, end: int) -> bytes:
+        return self._body[self._body_offset + start:self._body_offset + end]
+
+    def profile_index(self) -> Dict[str, int]:
+        """返回名称到数据块序号的有序映射（不解码任何配置）"""
+        return dict(zip(self.names, range(len(self.names))))
+
+    def decode_profile(self, index: int) -> dict:
+        """解码指定序号的配置数据块"""
+        return unpack_profile(self._read(self._bounds[index], self._bounds[index + 1]))
+
+    def section(self, name: str) -> Optional[Any]:
+        """解码附加数据段，不存在时返回None"""
+        span = self._sections.get(name)
+        if span is None:
+            return None
+        try:
+            return marshal.loads(self._read(*span))
+        except (EOFError, ValueError, TypeError):
+            return None
+
+
+def load_snapshot(cache_dir: Path, source: Path, stat: os.stat_result,
+                  read_source: Callable[[], bytes]) -> Optional[Snapshot]:
+    """读取仍然有效的快照，失效或损坏时返回None
+
+    mtime和大小不一致时直接失效；inode和ctime也一致时视为未修改；
+    否则（如文件被复制或touch过）再读取源文件比对内容哈希。
+    快照通过mmap映射，只有被访问的数据块才会真正读入内存。
+    """
+    try:
+        with open(snapshot_path(cache_dir, source), 'rb') as f:
+            body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (header_len,) = _HEADER_LEN.unpack_from(body)
+        header_end = _HEADER_LEN.size + header_len
+        (version, marshal_version, mtime_ns, ctime_ns, ino, size, digest,
+         meta, names, bounds, sections) = marshal.loads(body[_HEADER_LEN.size:header_end])
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+    if (version != SNAPSHOT_VERSION or marshal_version != marshal.version
+            or mtime_ns != stat.st_mtime_ns or size != stat.st_size):
+        return None
+    if (ctime_ns != stat.st_ctime_ns or ino != stat.st_ino) and digest != content_digest(read_source()):
+        return None
+    return Snapshot(meta, names, bounds, sections, body, header_end)
+
+
+def store_snapshot(cache_dir: Path, source: Path, stat: os.stat_result, raw: bytes, meta: Any,
+                   profiles: Dict[str, bytes], sections: Optional[Dict[str, Any]] = None) -> bool:
+    """写入快照，失败时静默忽略（缓存只是加速手段）"""
+    chunks: List[bytes] = []
+    bounds = [0]
+    for blob in profiles.values():
+        chunks.append(blob)
+        bounds.append(bounds[-1] + len(blob))
+
+    offset = bounds[-1]
+    section_spans = {}
+    try:
+        for name, value in (sections or {}).items():
+            data = marshal.dumps(value)
+            section_spans[name] = (offset, offset + len(data))
+            chunks.append(data)
+            offset += len(data)
+
+        header = marshal.dumps((
+            SNAPSHOT_VERSION, marshal.version, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino,
+            stat.st_size, content_digest(raw), meta, list(profiles), bounds, section_spans
+        ))
+    except ValueError:
+        # 含有marshal不支持的类型，不缓存
+        return False
+
+    path = snapshot_path(cache_dir, source)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        # 快照中含有配置的原始内容（包括API密钥），只允许当前用户访问
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def clear_snapshots(cache_dir: Path) -> int:
+    """删除cache目录中的所有快照，返回删除数量"""
+    removed = 0
+    try:
+        entries = list(cache_dir.iterdir())
+    except OSError:
+        return 0
+    for entry in entries:
+        if entry.name.endswith(SNAPSHOT_SUFFIX):
+            try:
+                entry.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,123 @@
+"""
+启动耗时统计模块
+
+`ccs run --timings`（或 CCS_TIMINGS=1）记录启动路径上各阶段（导入、读取配置、解析目标、构建环境变量、
+查找并启动 claude）的耗时，claude 退出后再报告其墙钟时间、CPU时间和峰值内存；
+`--timings-json`（或 CCS_TIMINGS=json）改为输出一行JSON，便于在多台机器上汇总。
+报告写到标准错误，不影响 claude 的输出。未启用时各阶段只有一次属性判断的开销。
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+FORMATS = ("text", "json")
+
+
+def env_format() -> Optional[str]:
+    """从 CCS_TIMINGS 读取输出格式：json 表示JSON，其他非空且非0的值表示文本，未设置时返回None"""
+    value = os.environ.get("CCS_TIMINGS", "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return "json" if value == "json" else "text"
+
+
+def rusage_dict(usage: Any) -> Dict[str, float]:
+    """将 resource.struct_rusage 转换为 用户CPU秒、系统CPU秒、峰值内存（KB）"""
+    max_rss = usage.ru_maxrss
+    if sys.platform == "darwin":
+        # macOS 的 ru_maxrss 单位是字节，Linux 是KB
+        max_rss //= 1024
+    return {"user_s": round(usage.ru_utime, 3), "sys_s": round(usage.ru_stime, 3), "max_rss_kb": max_rss}
+
+
+class Timings:
+    """按名称记录嵌套的耗时区间，以及 claude 子进程的资源使用"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.format: Optional[str] = env_format()
+        self.start = clock()
+        self.spans: List[Dict[str, Any]] = []
+        self.child: Optional[Dict[str, Any]] = None
+        self._depth = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.format is not None
+
+    def enable(self, output_format: str = "text") -> None:
+        if output_format not in FORMATS:
+            raise ValueError(f"不支持的格式: {output_format}（可选: {', '.join(FORMATS)}）")
+        self.format = output_format
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """记录代码块的耗时；区间可以嵌套，报告中按开始时间排列并缩进"""
+        if self.format is None:
+            yield
+            return
+        start = self._clock()
+        depth = self._depth
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth = depth
+            self.spans.append({
+                "name": name,
+                "depth": depth,
+                "start_ms": round((start - self.start) * 1000, 3),
+                "duration_ms": round((self._clock() - start) * 1000, 3),
+            })
+
+    def record_child(self, wall_s: float, exit_code: int, usage: Any) -> None:
+        """记录 claude 子进程的墙钟时间、退出码和 os.wait4 返回的资源使用"""
+        self.child = dict({"wall_s": round(wall_s, 3), "exit_code": exit_code}, **rusage_dict(usage))
+
+    def report(self) -> Dict[str, Any]:
+        import resource
+        spans = sorted(self.spans, key=lambda span: (span["start_ms"], span["depth"]))
+        return {
+            "spans": spans,
+            "total_ms": round(max((span["start_ms"] + span["duration_ms"] for span in spans), default=0.0), 3),
+            "self": rusage_dict(resource.getrusage(resource.RUSAGE_SELF)),
+            "child": self.child,
+        }
+
+    def render(self) -> str:
+        report = self.report()
+        if self.format == "json":
+            import json
+            return json.dumps(report, ensure_ascii=False) + "\n"
+
+        width = max([len(span["name"]) + 2 * span["depth"] for span in report["spans"]] + [4])
+        lines = ["ccs 启动耗时:"]
+        for span in report["spans"]:
+            name = "  " * span["depth"] + span["name"]
+            lines.append(f"  {name:<{width}}  {span['duration_ms']:>9.2f} ms  (+{span['start_ms']:.2f})")
+        lines.append(f"  {'合计':<{width - 2}}  {report['total_ms']:>9.2f} ms")
+        usage = report["self"]
+        lines.append(f"ccs 进程: 用户CPU {usage['user_s']:.3f}s  系统CPU {usage['sys_s']:.3f}s  "
+                     f"峰值内存 {usage['max_rss_kb'] / 1024:.1f}MB")
+        child = report["child"]
+        if child is None:
+            lines.append("claude 子进程: 无（exec模式或未启动）")
+        else:
+            lines.append(f"claude 子进程: 墙钟 {child['wall_s']:.3f}s  用户CPU {child['user_s']:.3f}s  "
+                         f"系统CPU {child['sys_s']:.3f}s  峰值内存 {child['max_rss_kb'] / 1024:.1f}MB  "
+                         f"退出码 {child['exit_code']}")
+        return "\n".join(lines) + "\n"
+
+    def emit(self, stream: Optional[TextIO] = None) -> None:
+        """启用时将报告写到标准错误"""
+        if self.format is None:
+            return
+        stream = stream or sys.stderr
+        stream.write(self.render())
+        stream.flush()
+
+
+# 进程内唯一的记录器，导入时开始计时
+recorder = Timings()
@@ -0,0 +1,236 @@
+"""
+配置文件监视模块
+
+代理等长时间运行、内嵌 ConfigManager 的进程可以用 ConfigWatcher 在配置文件或配置层变化时自动热加载：
+Linux 上通过 ctypes 调用 inotify 监视配置所在的目录（配置文件通过rename整体替换，监视文件本身会丢失事件），
+不可用时退回到定期比较文件的 (mtime, size, inode)。检测到变化后等待一段时间不再变化（去抖）再在后台线程中
+重新解析，成功后一次性替换管理器中的配置，并通过回调报告增加、删除和修改的配置；
+编辑到一半或格式错误的配置不会替换当前配置，只通过 on_error 报告。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from claude_switch.config import ConfigDiff, ConfigManager
+
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_POLL_INTERVAL = 1.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+
+
+def watched_directories(manager: "ConfigManager") -> List[Path]:
+    """需要监视的目录：配置目录、系统配置目录及各自的 conf.d（不存在时监视最近的已存在的上级目录）"""
+    from claude_switch.config import FRAGMENT_DIR_NAME
+
+    roots = [manager.config_dir] + ([manager.system_dir] if manager.system_dir else [])
+    directories: List[Path] = []
+    for root in roots:
+        for directory in (root, root / FRAGMENT_DIR_NAME):
+            while not directory.is_dir() and directory != directory.parent:
+                directory = directory.parent
+            if directory not in directories:
+                directories.append(directory)
+    return directories
+
+
+class _PollSource:
+    """定期比较配置文件状态"""
+
+    name = "poll"
+
+    def __init__(self, manager: "ConfigManager", stop: threading.Event, interval: float):
+        self.manager = manager
+        self.stop = stop
+        self.interval = interval
+        self._key = manager.source_key()
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """在 timeout 秒内（None表示一直等待）检测到变化时返回True，超时或停止时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            step = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if step <= 0 or self.stop.wait(step):
+                return False
+            key = self.manager.source_key()
+            if key != self._key:
+                self._key = key
+                return True
+
+    def wake(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifySource:
+    """通过inotify监视配置所在的目录，只在目录中有事件时才检查配置"""
+
+    name = "inotify"
+
+    def __init__(self, manager: "ConfigManager"):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 仅在Linux上可用")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.manager = manager
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._wake_read, self._wake_write = os.pipe()
+        self._watch()
+
+    def _watch(self) -> None:
+        # 对已监视的目录重复添加只会返回原来的监视描述符；新建的 conf.d 等目录在这里加入监视
+        for directory in watched_directories(self.manager):
+            self._add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """在 timeout 秒内（None表示一直等待）监视的目录中有事件时返回True，超时或停止时返回False"""
+        readable, _, _ = select.select([self.fd, self._wake_read], [], [], timeout)
+        if self._wake_read in readable or not readable:
+            return False
+        # 只关心是否有事件，具体变化由 source_key 判断
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        self._watch()
+        return True
+
+    def wake(self) -> None:
+        os.write(self._wake_write, b"x")
+
+    def close(self) -> None:
+        for fd in (self.fd, self._wake_read, self._wake_write):
+            os.close(fd)
+
+
+class ConfigWatcher:
+    """监视配置文件和配置层，变化时在后台线程中热加载并调用回调
+
+    on_change(diff) 在配置确实发生变化时调用，on_error(message) 在新内容无法解析、
+    继续使用上次的配置时调用；回调在监视线程中执行。
+    """
+
+    def __init__(self, manager: "ConfigManager", on_change: Optional[Callable[["ConfigDiff"], None]] = None,
+                 on_error: Optional[Callable[[str], None]] = None, debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True):
+        self.manager = manager
+        self.on_change = on_change
+        self.on_error = on_error
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.reloads = 0
+        self._key = manager.source_key()
+        self._stop = threading.Event()
+        self._source = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def backend(self) -> Optional[str]:
+        """正在使用的监视方式（inotify 或 poll），未启动时为None"""
+        return self._source.name if self._source is not None else None
+
+    def start(self) -> "ConfigWatcher":
+        """启动后台监视线程"""
+        if self._thread is not None:
+            return self
+        self._source = None
+        if self.use_inotify:
+            try:
+                self._source = _InotifySource(self.manager)
+            except (OSError, AttributeError):
+                self._source = None
+        if self._source is None:
+            self._source = _PollSource(self.manager, self._stop, self.poll_interval)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ccs-config-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止监视并等待线程退出"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._source.wake()  # type: ignore[union-attr]
+        self._thread.join(timeout)
+        self._source.close()  # type: ignore[union-attr]
+        self._thread = None
+
+    def __enter__(self) -> "ConfigWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        source = self._source
+        while not self._stop.is_set():
+            if not source.wait(None):  # type: ignore[union-attr]
+                continue
+            # 去抖：直到 debounce 秒内没有新的变化才重新加载，编辑器的多次写入只触发一次
+            while source.wait(self.debounce):  # type: ignore[union-attr]
+                pass
+            if not self._stop.is_set():
+                self.check()
+
+    def check(self) -> Optional["ConfigDiff"]:
+        """配置文件或配置层有变化时热加载，返回配置的变化（没有重新加载时返回None）"""
+        key = self.manager.source_key()
+        if key == self._key:
+            return None
+        try:
+            diff = self.manager.hot_reload()
+        except ValueError as e:
+            # 同一内容只报告一次，文件再次变化后重试
+            self._key = key
+            self._notify(self.on_error, f"配置文件解析失败，继续使用上次的配置: {e}")
+            return None
+        if diff is None:
+            # 本进程正在写入配置，写入完成后的事件会再次触发检查
+            return None
+        self._key = key
+        self.reloads += 1
+        for error in diff.errors:
+            self._notify(self.on_error, f"配置片段解析失败，继续使用上次的内容: {error}")
+        if diff:
+            self._notify(self.on_change, diff)
+        return diff
+
+    @staticmethod
+    def _notify(callback, argument) -> None:
+        if callback is None:
+            return
+        try:
+            callback(argument)
+        except Exception:
+            # 回调出错不能终止监视线程
+            traceback.print_exc()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""检查 `ccs run` 启动路径的导入耗时，超出预算时以非零状态退出（供CI使用）。"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STARTUP_CODE = "import claude_switch.cli, claude_switch.commands"
+BASELINE_CODE = "pass"
+
+
+def measure(code):
+    """运行一次 -X importtime，返回 (顶层模块累计耗时us字典, 总耗时us)"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True, check=True
+    )
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):
+            try:
+                top_level[name.strip()] = int(cumulative)
+            except ValueError:
+                continue
+    return top_level, sum(top_level.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=80.0,
+                        help="启动路径相对于空解释器允许增加的导入耗时（毫秒）")
+    parser.add_argument("--runs", type=int, default=5, help="重复次数，取最小值以减少噪声")
+    parser.add_argument("--top", type=int, default=10, help="显示耗时最多的顶层模块数量")
+    args = parser.parse_args()
+
+    best_modules, best_total = None, None
+    baseline = None
+    for _ in range(args.runs):
+        modules, total = measure(STARTUP_CODE)
+        if best_total is None or total < best_total:
+            best_modules, best_total = modules, total
+        _, base_total = measure(BASELINE_CODE)
+        baseline = base_total if baseline is None else min(baseline, base_total)
+
+    overhead_ms = (best_total - baseline) / 1000
+    print(f"解释器基线导入耗时: {baseline / 1000:.1f} ms")
+    print(f"启动路径导入耗时:   {best_total / 1000:.1f} ms (增加 {overhead_ms:.1f} ms, 预算 {args.budget_ms:.1f} ms)")
+    for name, cumulative in sorted(best_modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    heavy = {"typer", "click", "rich", "yaml"} & {name.split(".")[0] for name in best_modules}
+    if heavy:
+        print(f"错误: 启动路径导入了重量级模块: {', '.join(sorted(heavy))}")
+        sys.exit(1)
+    if overhead_ms > args.budget_ms:
+        print("错误: 启动路径导入耗时超出预算")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
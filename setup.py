@@ -29,8 +29,8 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "claude-switch=claude_switch.main:app",
-            "ccs=claude_switch.main:app",
+            "claude-switch=claude_switch.cli:main",
+            "ccs=claude_switch.cli:main",
         ],
     },
     author="lirong",
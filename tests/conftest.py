@@ -6,6 +6,18 @@ from pathlib import Path
 from typing import Generator
 
 
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch):
+    """Keep tests hermetic: ignore a running ccs daemon, system-wide configs and the developer's launch mode and timings setting, and do not record history."""
+    from claude_switch.timings import recorder
+    monkeypatch.setenv("CCS_NO_DAEMON", "1")
+    monkeypatch.delenv("CCS_LAUNCH_MODE", raising=False)
+    monkeypatch.delenv("CCS_TIMINGS", raising=False)
+    monkeypatch.setenv("CCS_HISTORY", "0")
+    monkeypatch.setenv("CCS_SYSTEM_CONFIG_DIR", "")
+    monkeypatch.setattr(recorder, "format", None)
+
+
 @pytest.fixture
 def temp_config_dir() -> Generator[Path, None, None]:
     """Create a temporary config directory for testing."""
@@ -0,0 +1,96 @@
+"""Tests for backends.py module."""
+import pytest
+import yaml
+from claude_switch.backends import (
+    YamlBackend,
+    JsonBackend,
+    TomlBackend,
+    get_backend,
+    backend_for_path,
+    resolve_config_file
+)
+
+SAMPLE_DATA = {
+    "configs": {
+        "deepseek": {
+            "api_key": "sk-xxx",
+            "base_url": "https://api.deepseek.com/anthropic",
+            "timeout_ms": 600000,
+            "disable_nonessential_traffic": True,
+            "description": "DeepSeek API",
+            "models": {
+                "chat": {"model_id": "deepseek-chat", "small_fast_model": "", "description": "聊天模型"},
+                "v3.1": {"model_id": "deepseek-v3.1", "small_fast_model": "", "description": ""},
+            },
+            "default_model": "chat",
+        }
+    },
+    "default_config": "deepseek",
+}
+
+
+class TestBackends:
+    """Tests for the individual format backends."""
+
+    @pytest.mark.parametrize("backend", [YamlBackend(), YamlBackend(prefer_c=False), JsonBackend(), TomlBackend()])
+    def test_roundtrip(self, backend):
+        """Test dumping and loading preserves the config data."""
+        assert backend.load(backend.dump(SAMPLE_DATA)) == SAMPLE_DATA
+
+    def test_yaml_prefers_libyaml(self):
+        """Test the YAML backend uses the C loader when libyaml is available."""
+        _, loader, dumper = YamlBackend()._loader_dumper()
+        if yaml.__with_libyaml__:
+            assert loader is yaml.CSafeLoader
+            assert dumper is yaml.CSafeDumper
+        else:
+            assert loader is yaml.SafeLoader
+
+    @pytest.mark.parametrize("backend,raw", [
+        (YamlBackend(), b"invalid: yaml: [[["),
+        (JsonBackend(), b"{not json"),
+        (TomlBackend(), b"= broken"),
+    ])
+    def test_invalid_content_raises_value_error(self, backend, raw):
+        """Test every backend reports malformed content as ValueError."""
+        with pytest.raises(ValueError):
+            backend.load(raw)
+
+    def test_empty_content(self):
+        """Test empty files load as an empty dict."""
+        assert YamlBackend().load(b"") == {}
+        assert JsonBackend().load(b"") == {}
+
+
+class TestBackendSelection:
+    """Tests for backend lookup and config file resolution."""
+
+    def test_get_backend_by_name_or_extension(self):
+        """Test looking up backends by name or extension."""
+        assert get_backend("json").name == "json"
+        assert get_backend("yml").name == "yaml"
+        assert get_backend(".TOML").name == "toml"
+
+    def test_get_backend_unknown(self):
+        """Test an unknown format raises ValueError."""
+        with pytest.raises(ValueError, match="不支持的配置格式"):
+            get_backend("ini")
+
+    def test_backend_for_path(self, temp_config_dir):
+        """Test choosing a backend from the file extension."""
+        assert backend_for_path(temp_config_dir / "config.yml").name == "yaml"
+        assert backend_for_path(temp_config_dir / "config.json").name == "json"
+
+    def test_resolve_default_is_yaml(self, temp_config_dir):
+        """Test the default config file is config.yaml."""
+        assert resolve_config_file(temp_config_dir) == temp_config_dir / "config.yaml"
+
+    def test_resolve_existing_file(self, temp_config_dir):
+        """Test an existing config file in another format is detected."""
+        (temp_config_dir / "config.toml").write_text("", encoding='utf-8')
+        assert resolve_config_file(temp_config_dir) == temp_config_dir / "config.toml"
+
+    def test_resolve_explicit_format(self, temp_config_dir):
+        """Test an explicit format setting wins over detection."""
+        (temp_config_dir / "config.yaml").write_text("", encoding='utf-8')
+        assert resolve_config_file(temp_config_dir, "json") == temp_config_dir / "config.json"
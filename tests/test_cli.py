@@ -0,0 +1,172 @@
+"""Tests for cli.py module."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from claude_switch.cli import parse_args, parse_run_args, main
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 快速启动路径上不允许出现的重量级模块
+HEAVY_MODULES = {"typer", "click", "rich", "yaml"}
+
+
+def _imported_modules(code: str, home: Path) -> set:
+    """用 -X importtime 运行代码并返回导入的顶层模块名"""
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=str(PROJECT_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True, check=True
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+
+class TestParseRunArgs:
+    """Tests for parse_run_args function."""
+
+    def test_no_args(self):
+        """Test parsing run without arguments."""
+        assert parse_run_args([]) == (None, None, None, False, False, None)
+
+    def test_config_and_args(self):
+        """Test parsing config:model with --args in both spellings."""
+        assert parse_run_args(["deepseek:chat", "--args", "--print"]) == ("deepseek:chat", "--print", None, False, False, None)
+        assert parse_run_args(["--args=--debug", "deepseek"]) == ("deepseek", "--debug", None, False, False, None)
+
+    def test_launch_mode_flags(self):
+        """Test parsing --exec and --subprocess."""
+        assert parse_run_args(["deepseek", "--exec"]) == ("deepseek", None, True, False, False, None)
+        assert parse_run_args(["--subprocess"]) == (None, None, False, False, False, None)
+        assert parse_run_args(["--exec", "--subprocess"]) is None
+        assert parse_run_args(["--exec=1"]) is None
+
+    def test_via_proxy_flag(self):
+        """Test parsing --via-proxy."""
+        assert parse_run_args(["--via-proxy"]) == (None, None, None, True, False, None)
+        assert parse_run_args(["deepseek", "--via-proxy", "--exec"]) == ("deepseek", None, True, True, False, None)
+        assert parse_run_args(["--via-proxy", "--no-cache"]) == (None, None, None, True, True, None)
+
+    def test_timings_flags(self):
+        """Test --timings and --timings-json select the report format."""
+        assert parse_run_args(["deepseek", "--timings"]) == ("deepseek", None, None, False, False, "text")
+        assert parse_run_args(["--timings-json"]) == (None, None, None, False, False, "json")
+
+    def test_unknown_forms_fall_back(self):
+        """Test unknown options or extra positionals are left to typer."""
+        assert parse_run_args(["--help"]) is None
+        assert parse_run_args(["a", "b"]) is None
+        assert parse_run_args(["--args"]) is None
+
+
+class TestParseArgs:
+    """Tests for the generic fast-path argument parser."""
+
+    def test_env_args(self):
+        """Test parsing `env` arguments."""
+        assert parse_args(["test:chat", "--shell", "fish"], ("shell",)) == ("test:chat", {"shell": "fish"})
+        assert parse_args(["--shell=json"], ("shell",)) == (None, {"shell": "json"})
+
+    def test_positional_not_allowed(self):
+        """Test commands without positionals fall back on extra arguments."""
+        assert parse_args(["zsh"], ("shell",), positional=False) is None
+        assert parse_args(["--shell", "zsh"], ("shell",), positional=False) == (None, {"shell": "zsh"})
+
+
+class TestMain:
+    """Tests for main entry point dispatch."""
+
+    @patch('claude_switch.commands.use_config_impl')
+    def test_run_fast_path(self, mock_use):
+        """Test `run` is dispatched without going through typer."""
+        with patch.object(sys, "argv", ["ccs", "run", "deepseek", "--args", "--print"]):
+            main()
+
+        mock_use.assert_called_once_with("deepseek", "--print", None, via_proxy=False, no_cache=False, timings=None)
+
+    @patch('claude_switch.commands.env_config_impl')
+    def test_env_fast_path(self, mock_env):
+        """Test `env` is dispatched without going through typer."""
+        with patch.object(sys, "argv", ["ccs", "env", "deepseek", "--shell", "zsh"]):
+            main()
+
+        mock_env.assert_called_once_with("deepseek", "zsh")
+
+    @patch('claude_switch.commands.shell_init_impl')
+    def test_shell_init_fast_path(self, mock_init):
+        """Test `shell-init` is dispatched without going through typer."""
+        with patch.object(sys, "argv", ["ccs", "shell-init"]):
+            main()
+
+        mock_init.assert_called_once_with("bash")
+
+    @patch('claude_switch.commands.list_configs_impl')
+    def test_list_format_fast_path(self, mock_list):
+        """Test `list --format` is dispatched without going through typer."""
+        with patch.object(sys, "argv", ["ccs", "ls", "--format", "tsv", "--name", "a", "--fields=name"]):
+            main()
+
+        mock_list.assert_called_once_with("tsv", "a", "name")
+
+    @patch('claude_switch.commands.current_config_impl')
+    def test_current_format_fast_path(self, mock_current):
+        """Test `current --format` is dispatched without going through typer."""
+        with patch.object(sys, "argv", ["ccs", "current", "--format", "json"]):
+            main()
+
+        mock_current.assert_called_once_with("json", None)
+
+    @patch('claude_switch.main.app')
+    def test_list_without_format_uses_typer(self, mock_app):
+        """Test the interactive `list` still goes through typer and rich."""
+        with patch.object(sys, "argv", ["ccs", "list", "--name", "a"]):
+            main()
+
+        mock_app.assert_called_once()
+
+    @patch('claude_switch.main.app')
+    def test_other_commands_use_typer(self, mock_app):
+        """Test other commands fall back to the typer app."""
+        with patch.object(sys, "argv", ["ccs", "list"]):
+            main()
+
+        mock_app.assert_called_once()
+
+
+class TestStartupImports:
+    """Import-time budget checks for the startup path."""
+
+    def test_run_path_avoids_heavy_imports(self, temp_config_dir):
+        """Test the `ccs run` path imports neither typer, rich nor yaml."""
+        modules = _imported_modules(
+            "import claude_switch.cli, claude_switch.commands", temp_config_dir
+        )
+        assert "claude_switch" in modules
+        assert not modules & HEAVY_MODULES
+
+    def test_list_format_avoids_heavy_imports(self, temp_config_dir):
+        """Test `ccs list --format json` streams from the snapshot without typer, rich or yaml."""
+        manager = ConfigManager(str(temp_config_dir / ".config" / "claude-code-switch"))
+        manager.add_config("test", ClaudeConfig(api_key="sk-test", base_url="https://api.test.com",
+                                                models={"chat": ModelConfig(model_id="test-chat")}))
+        code = ("import sys; sys.argv = ['ccs', 'list', '--format', 'json']; "
+                "from claude_switch.cli import main; main()")
+
+        modules = _imported_modules(code, temp_config_dir)
+
+        assert not modules & HEAVY_MODULES
+
+    def test_config_module_import_is_lazy(self, temp_config_dir):
+        """Test importing config does not create the global ConfigManager."""
+        code = (
+            "import claude_switch.config as c, claude_switch.complete; "
+            "assert c._config_manager is None"
+        )
+        modules = _imported_modules(code, temp_config_dir)
+        assert "yaml" not in modules
+        assert not (temp_config_dir / ".config").exists()
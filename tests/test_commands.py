@@ -1,13 +1,21 @@
 """Tests for commands.py module."""
+import json
 import pytest
 from unittest.mock import patch
 from claude_switch.commands import (
     list_configs_impl,
     edit_config_impl,
     use_config_impl,
-    current_config_impl
+    current_config_impl,
+    cache_rebuild_impl,
+    cache_clear_impl,
+    completion_generate_impl,
+    completion_install_impl,
+    env_config_impl,
+    search_impl,
+    shell_init_impl
 )
-from claude_switch.config import ClaudeConfig, ModelConfig
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
 
 
 class TestListConfigsImpl:
@@ -58,6 +66,50 @@ class TestListConfigsImpl:
         mock_manager.list_configs.assert_not_called()
 
 
+class TestListConfigsMachineOutput:
+    """Tests for the --format output of list_configs_impl."""
+
+    @patch('claude_switch.commands.config_manager')
+    def test_jsonl_streams_configs(self, mock_manager, sample_claude_config, capsys):
+        """Test JSON Lines output iterates the manager without materializing every config."""
+        mock_manager.get_load_error.return_value = None
+        mock_manager.get_default_config_name.return_value = "b"
+        mock_manager.iter_configs.return_value = iter([("a", sample_claude_config), ("b", sample_claude_config)])
+
+        list_configs_impl("jsonl", fields="name,default,models")
+
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [(line["name"], line["default"]) for line in lines] == [("a", False), ("b", True)]
+        assert list(lines[0]["models"]) == ["test-model"]
+        mock_manager.list_configs.assert_not_called()
+
+    @patch('claude_switch.commands.config_manager')
+    def test_name_filter(self, mock_manager, sample_claude_config, capsys):
+        """Test --name fetches only the requested config."""
+        mock_manager.get_load_error.return_value = None
+        mock_manager.get_config.return_value = sample_claude_config
+
+        list_configs_impl("tsv", name="test-config", fields="name,base_url")
+
+        assert capsys.readouterr().out == "name\tbase_url\ntest-config\thttps://api.test.com\n"
+        mock_manager.get_config.assert_called_once_with("test-config")
+        mock_manager.iter_configs.assert_not_called()
+
+    @patch('claude_switch.commands.config_manager')
+    def test_errors(self, mock_manager, capsys):
+        """Test a missing config, unknown field or --fields without --format exits with an error."""
+        mock_manager.get_load_error.return_value = None
+        mock_manager.get_config.return_value = None
+
+        for kwargs in ({"output_format": "json", "name": "missing"},
+                       {"output_format": "json", "fields": "api_key"},
+                       {"fields": "name"}):
+            with pytest.raises(SystemExit):
+                list_configs_impl(**kwargs)
+
+        assert capsys.readouterr().out == ""
+
+
 class TestEditConfigImpl:
     """Tests for edit_config_impl function."""
 
@@ -73,6 +125,8 @@ class TestEditConfigImpl:
         edit_config_impl()
 
         mock_subprocess.assert_called_once_with(["vim", "/path/to/config.yaml"])
+        mock_manager.reload.assert_called_once()
+        mock_manager.refresh_completion_scripts.assert_called_once()
 
     @patch('claude_switch.commands.subprocess.run')
     @patch('claude_switch.commands.os.path.exists')
@@ -165,10 +219,13 @@ class TestUseConfigImpl:
     def test_use_config_not_exists(self, mock_print, mock_manager, mock_subprocess):
         """Test using nonexistent config."""
         mock_manager.get_config.return_value = None
+        mock_manager.search.return_value = []
 
         use_config_impl("nonexistent")
 
-        mock_manager.get_config.assert_called_once_with("nonexistent")
+        mock_manager.get_config.assert_called_with("nonexistent")
+        mock_manager.search.assert_called_once()
+        mock_print.assert_called_with("[red]✗[/red] 配置 'nonexistent' 不存在")
         mock_subprocess.assert_not_called()
 
     @patch('claude_switch.commands.subprocess.run')
@@ -209,6 +266,110 @@ class TestUseConfigImpl:
         mock_subprocess.assert_not_called()
 
 
+class TestUseConfigExecMode:
+    """Tests for the exec launch mode of use_config_impl."""
+
+    @patch('claude_switch.commands.exec_claude')
+    @patch('claude_switch.commands.resolve_binary')
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_exec_mode(self, mock_print, mock_manager, mock_subprocess, mock_resolve, mock_exec,
+                       sample_claude_config):
+        """Test exec mode replaces the process with the resolved binary."""
+        mock_manager.get_config.return_value = sample_claude_config
+        mock_resolve.return_value = "/usr/local/bin/claude"
+
+        use_config_impl("test-config", "--debug", exec_mode=True)
+
+        mock_subprocess.assert_not_called()
+        path, args, env = mock_exec.call_args[0]
+        assert path == "/usr/local/bin/claude"
+        assert args == ["--debug"]
+        assert env["ANTHROPIC_MODEL"] == "test-model-id"
+
+    @patch('claude_switch.commands.exec_claude')
+    @patch('claude_switch.commands.resolve_binary')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_exec_mode_from_environment(self, mock_print, mock_manager, mock_resolve, mock_exec,
+                                        sample_claude_config, monkeypatch):
+        """Test CCS_LAUNCH_MODE=exec enables exec mode and a missing binary is reported."""
+        monkeypatch.setenv("CCS_LAUNCH_MODE", "exec")
+        mock_manager.get_config.return_value = sample_claude_config
+        mock_resolve.return_value = None
+
+        use_config_impl("test-config")
+
+        mock_exec.assert_not_called()
+        assert "未找到Claude Code命令" in mock_print.call_args[0][0]
+
+
+class TestFuzzyRun:
+    """Tests for fuzzy matching of unknown run targets and search_impl."""
+
+    @pytest.fixture
+    def manager(self, temp_config_dir):
+        manager = ConfigManager(str(temp_config_dir))
+        for name, models in (("deepseek", ("chat", "reasoner")), ("kimi", ("k2",)), ("kimi-cn", ("k2",))):
+            config = ClaudeConfig(api_key="sk-test", base_url=f"https://{name}.test")
+            for model in models:
+                config.add_model(model, ModelConfig(model_id=f"{name}-{model}"))
+            manager.add_config(name, config)
+        with patch('claude_switch.commands.config_manager', manager):
+            yield manager
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_typo_resolved(self, mock_print, mock_subprocess, manager):
+        """Test a misspelled config name runs the closest config with its default model."""
+        use_config_impl("deepsek")
+
+        assert mock_subprocess.call_args[1]["env"]["ANTHROPIC_MODEL"] == "deepseek-chat"
+        mock_print.assert_any_call("[dim]'deepsek' 匹配到 deepseek[/dim]")
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_typo_with_model(self, mock_print, mock_subprocess, manager):
+        """Test a misspelled config:model pair resolves to the matching model."""
+        use_config_impl("deepsek:reasoner")
+
+        assert mock_subprocess.call_args[1]["env"]["ANTHROPIC_MODEL"] == "deepseek-reasoner"
+
+    @patch('claude_switch.commands.sys.stdin.isatty', return_value=False)
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_ambiguous_non_interactive(self, mock_print, mock_subprocess, mock_isatty, manager):
+        """Test an ambiguous query fails with the candidates when stdin is not a terminal."""
+        use_config_impl("kimi:k3")
+
+        mock_subprocess.assert_not_called()
+        message = mock_print.call_args[0][0]
+        assert "匹配到多个配置" in message
+        assert "kimi:k2" in message and "kimi-cn:k2" in message
+
+    @patch('builtins.input', return_value="2")
+    @patch('claude_switch.commands.sys.stdin.isatty', return_value=True)
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_ambiguous_interactive(self, mock_print, mock_subprocess, mock_isatty, mock_input, manager):
+        """Test the user picks a candidate by number on a terminal."""
+        use_config_impl("kimi:k3")
+
+        choice = mock_print.call_args_list[2][0][0].split()[1]
+
+        assert choice in ("kimi:k2", "kimi-cn:k2")
+        assert mock_subprocess.call_args[1]["env"]["ANTHROPIC_MODEL"] == choice.replace(":", "-")
+
+    def test_search_json(self, manager, capsys):
+        """Test search --json prints ranked results."""
+        search_impl("reasoner", as_json=True)
+
+        results = json.loads(capsys.readouterr().out)
+        assert results[0]["name"] == "deepseek:reasoner"
+        assert set(results[0]) == {"name", "config", "model", "model_id", "description", "score"}
+
+
 class TestCurrentConfigImpl:
     """Tests for current_config_impl function."""
 
@@ -239,3 +400,121 @@ class TestCurrentConfigImpl:
         current_config_impl()
 
         mock_manager.get_default_config_name.assert_called_once()
+
+
+    @patch('claude_switch.commands.config_manager')
+    def test_current_config_json(self, mock_manager, monkeypatch, capsys):
+        """Test --format json prints the default config and masked environment variables."""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-test")
+        monkeypatch.setenv("ANTHROPIC_MODEL", "test-model")
+        mock_manager.get_default_config_name.return_value = "test-config"
+
+        current_config_impl("json", "default_config,ANTHROPIC_MODEL,ANTHROPIC_API_KEY")
+
+        assert json.loads(capsys.readouterr().out) == [
+            {"default_config": "test-config", "ANTHROPIC_MODEL": "test-model", "ANTHROPIC_API_KEY": "********"}
+        ]
+
+
+class TestCacheImpl:
+    """Tests for cache_rebuild_impl and cache_clear_impl functions."""
+
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_cache_rebuild_success(self, mock_print, mock_manager):
+        """Test rebuilding the snapshot cache."""
+        mock_manager.rebuild_cache.return_value = True
+
+        cache_rebuild_impl()
+
+        mock_manager.rebuild_cache.assert_called_once()
+        mock_manager.get_load_error.assert_not_called()
+
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_cache_rebuild_load_error(self, mock_print, mock_manager):
+        """Test rebuilding reports a config load error."""
+        mock_manager.rebuild_cache.return_value = False
+        mock_manager.get_load_error.return_value = "bad yaml"
+
+        cache_rebuild_impl()
+
+        assert "bad yaml" in mock_print.call_args_list[0][0][0]
+
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_cache_clear(self, mock_print, mock_manager):
+        """Test clearing the snapshot cache."""
+        mock_manager.clear_cache.return_value = 2
+
+        cache_clear_impl()
+
+        mock_manager.clear_cache.assert_called_once()
+
+
+class TestCompletionImpl:
+    """Tests for completion_generate_impl and completion_install_impl functions."""
+
+    @patch('claude_switch.shell_completion.generate_script')
+    @patch('claude_switch.commands.config_manager')
+    def test_completion_generate(self, mock_manager, mock_generate, capsys):
+        """Test generating writes the script to stdout."""
+        mock_generate.return_value = "complete -F _ccs ccs\n"
+
+        completion_generate_impl("bash")
+
+        mock_generate.assert_called_once_with("bash", mock_manager)
+        assert capsys.readouterr().out == "complete -F _ccs ccs\n"
+
+    @patch('claude_switch.shell_completion.install_script')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_completion_install_unsupported_shell(self, mock_print, mock_manager, mock_install):
+        """Test installing for an unsupported shell is rejected."""
+        completion_install_impl("tcsh")
+
+        mock_install.assert_not_called()
+
+
+class TestEnvImpl:
+    """Tests for env_config_impl and shell_init_impl functions."""
+
+    @patch('claude_switch.commands.config_manager')
+    def test_env_bash(self, mock_manager, sample_claude_config, capsys, monkeypatch):
+        """Test env prints export statements for eval."""
+        monkeypatch.delenv("ANTHROPIC_AUTH_TOKEN", raising=False)
+        mock_manager.get_config.return_value = sample_claude_config
+
+        env_config_impl("test-config:test-model", "bash")
+
+        out = capsys.readouterr().out
+        mock_manager.get_config.assert_called_once_with("test-config")
+        assert "export ANTHROPIC_MODEL=test-model-id;" in out
+        assert "unset ANTHROPIC_AUTH_TOKEN;" in out
+
+    @patch('claude_switch.commands.config_manager')
+    def test_env_unknown_config(self, mock_manager, capsys):
+        """Test errors go to stderr with a non-zero exit status."""
+        mock_manager.get_config.return_value = None
+
+        with pytest.raises(SystemExit) as exc_info:
+            env_config_impl("nonexistent", "bash")
+
+        captured = capsys.readouterr()
+        assert exc_info.value.code == 1
+        assert captured.out == ""
+        assert "不存在" in captured.err
+
+    @patch('claude_switch.commands.config_manager')
+    def test_env_unsupported_shell(self, mock_manager):
+        """Test unknown output formats are rejected before loading configs."""
+        with pytest.raises(SystemExit):
+            env_config_impl("test-config", "tcsh")
+
+        mock_manager.get_config.assert_not_called()
+
+    def test_shell_init(self, capsys):
+        """Test shell-init prints the ccs-use function."""
+        shell_init_impl("zsh")
+
+        assert "ccs-use()" in capsys.readouterr().out
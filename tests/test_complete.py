@@ -3,6 +3,12 @@ import pytest
 from unittest.mock import patch
 from claude_switch.complete import complete_config_model_names
 from claude_switch.config import ClaudeConfig, ModelConfig
+from claude_switch.index import CompletionIndex
+
+
+def _set_configs(mock_manager, configs):
+    """让mock的配置管理器返回由configs生成的补全索引"""
+    mock_manager.get_completion_index.return_value = CompletionIndex.from_configs(configs)
 
 
 class TestCompleteConfigModelNames:
@@ -21,7 +27,7 @@ class TestCompleteConfigModelNames:
         )
         config.add_model("chat", model1)
         config.add_model("reasoner", model2)
-        mock_manager.list_configs.return_value = {"deepseek": config}
+        _set_configs(mock_manager, {"deepseek": config})
 
         results = list(complete_config_model_names(""))
 
@@ -46,7 +52,7 @@ class TestCompleteConfigModelNames:
         )
         config2.add_model("sonnet", ModelConfig(model_id="claude-sonnet"))
 
-        mock_manager.list_configs.return_value = {"deepseek": config1, "anthropic": config2}
+        _set_configs(mock_manager, {"deepseek": config1, "anthropic": config2})
 
         results = list(complete_config_model_names("deep"))
 
@@ -65,7 +71,7 @@ class TestCompleteConfigModelNames:
         )
         config.add_model("chat", model1)
         config.add_model("coder", model2)
-        mock_manager.list_configs.return_value = {"deepseek": config}
+        _set_configs(mock_manager, {"deepseek": config})
 
         results = list(complete_config_model_names("deepseek:c"))
 
@@ -84,7 +90,7 @@ class TestCompleteConfigModelNames:
             default_model="chat"
         )
         config.add_model("chat", model)
-        mock_manager.list_configs.return_value = {"deepseek": config}
+        _set_configs(mock_manager, {"deepseek": config})
 
         results = list(complete_config_model_names(""))
 
@@ -104,7 +110,7 @@ class TestCompleteConfigModelNames:
             base_url="https://api.test.com"
         )
         config.add_model("chat", model)
-        mock_manager.list_configs.return_value = {"deepseek": config}
+        _set_configs(mock_manager, {"deepseek": config})
 
         results = list(complete_config_model_names(""))
 
@@ -121,7 +127,7 @@ class TestCompleteConfigModelNames:
             base_url="https://api.test.com"
         )
         config.add_model("chat", model)
-        mock_manager.list_configs.return_value = {"deepseek": config}
+        _set_configs(mock_manager, {"deepseek": config})
 
         results = list(complete_config_model_names("anthropic:"))
 
@@ -130,8 +136,31 @@ class TestCompleteConfigModelNames:
     @patch('claude_switch.complete.config_manager')
     def test_complete_config_model_names_empty_configs(self, mock_manager):
         """Test completing config:model names with empty configs."""
-        mock_manager.list_configs.return_value = {}
+        _set_configs(mock_manager, {})
 
         results = list(complete_config_model_names(""))
 
         assert len(results) == 0
+
+    @patch('claude_switch.complete.config_manager')
+    def test_complete_config_model_names_case_insensitive(self, mock_manager):
+        """Test completion prefixes match case-insensitively."""
+        config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com")
+        config.add_model("Chat", ModelConfig(model_id="deepseek-chat"))
+        _set_configs(mock_manager, {"DeepSeek": config})
+
+        results = list(complete_config_model_names("deepseek:c"))
+
+        assert [r[0] for r in results] == ["DeepSeek:Chat"]
+
+    @patch('claude_switch.complete.config_manager')
+    def test_complete_config_model_names_model_only_prefix(self, mock_manager):
+        """Test a bare model name prefix finds config:model candidates."""
+        config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com")
+        config.add_model("chat", ModelConfig(model_id="deepseek-chat"))
+        config.add_model("reasoner", ModelConfig(model_id="deepseek-reasoner"))
+        _set_configs(mock_manager, {"deepseek": config})
+
+        results = list(complete_config_model_names("reas"))
+
+        assert [r[0] for r in results] == ["deepseek:reasoner"]
@@ -1,8 +1,10 @@
 """Tests for config.py module."""
+import os
 import yaml
 import pytest
+from unittest.mock import patch
 from pathlib import Path
-from claude_switch.config import ModelConfig, ClaudeConfig, ConfigManager
+from claude_switch.config import ModelConfig, ClaudeConfig, ConfigManager, RateLimit
 
 
 class TestModelConfig:
@@ -388,3 +390,532 @@ class TestConfigManager:
         assert "model2" in loaded.models
         assert loaded.default_model == "model2"
         assert loaded.models["model2"].small_fast_model == "model1-id"
+
+    def test_save_writes_snapshot(self, temp_config_dir, sample_claude_config):
+        """Test saving configs also writes a snapshot."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("test-config", sample_claude_config)
+
+        assert manager.get_snapshot_path().exists()
+
+    def test_load_uses_snapshot(self, temp_config_dir, sample_claude_config):
+        """Test a valid snapshot is used instead of parsing YAML."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("test-config", sample_claude_config)
+
+        with patch('yaml.load') as mock_load:
+            manager2 = ConfigManager(str(temp_config_dir))
+            mock_load.assert_not_called()
+
+        loaded = manager2.get_config("test-config")
+        assert loaded is not None
+        assert loaded.models["test-model"].model_id == "test-model-id"
+
+    def test_stale_snapshot_falls_back_to_yaml(self, temp_config_dir, sample_claude_config):
+        """Test an edited config file is re-parsed instead of using the snapshot."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("test-config", sample_claude_config)
+
+        data = yaml.safe_load(manager.config_file.read_text(encoding='utf-8'))
+        data['configs']['test-config']['description'] = "Edited by hand"
+        manager.config_file.write_text(yaml.dump(data, allow_unicode=True), encoding='utf-8')
+
+        manager2 = ConfigManager(str(temp_config_dir))
+        assert manager2.get_config("test-config").description == "Edited by hand"
+
+    def test_rebuild_and_clear_cache(self, temp_config_dir, sample_claude_config):
+        """Test rebuilding and clearing the snapshot cache."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("test-config", sample_claude_config)
+
+        assert manager.clear_cache() == 1
+        assert not manager.get_snapshot_path().exists()
+
+        assert manager.rebuild_cache() is True
+        assert manager.get_snapshot_path().exists()
+        assert manager.config_exists("test-config")
+
+    @pytest.mark.parametrize("config_format", ["json", "toml"])
+    def test_persistence_other_formats(self, temp_config_dir, sample_claude_config, config_format):
+        """Test configs persist when stored as JSON or TOML."""
+        manager = ConfigManager(str(temp_config_dir), config_format=config_format)
+        manager.add_config("test-config", sample_claude_config)
+        manager.set_default_config("test-config")
+        manager.clear_cache()
+
+        manager2 = ConfigManager(str(temp_config_dir))
+        assert manager2.get_config_file_path() == str(temp_config_dir / f"config.{config_format}")
+        assert manager2.get_config("test-config").models["test-model"].model_id == "test-model-id"
+        assert manager2.get_default_config_name() == "test-config"
+
+    def test_config_format_from_env(self, temp_config_dir, monkeypatch):
+        """Test CCS_CONFIG_FORMAT selects the config file format."""
+        monkeypatch.setenv("CCS_CONFIG_FORMAT", "json")
+        manager = ConfigManager(str(temp_config_dir))
+        assert manager.config_file == temp_config_dir / "config.json"
+
+    def test_snapshot_decodes_profiles_lazily(self, temp_config_dir, sample_claude_config):
+        """Test get_config decodes only the requested profile from the snapshot."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("first", sample_claude_config)
+        manager.add_config("second", ClaudeConfig(api_key="sk-2", base_url="https://two.com"))
+
+        with patch('claude_switch.config.ConfigManager._build_config',
+                   wraps=ConfigManager._build_config) as mock_build:
+            manager2 = ConfigManager(str(temp_config_dir))
+            assert manager2.config_exists("second")
+            mock_build.assert_not_called()
+
+            assert manager2.get_config("first").api_key == "sk-test-key-123"
+            assert mock_build.call_count == 1
+
+            configs = manager2.list_configs()
+            assert mock_build.call_count == 2
+            assert list(configs) == ["first", "second"]
+
+    def test_save_after_lazy_load_keeps_all_profiles(self, temp_config_dir, sample_claude_config):
+        """Test saving from a lazily loaded manager writes undecoded profiles too."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("first", sample_claude_config)
+        manager.add_config("second", ClaudeConfig(api_key="sk-2", base_url="https://two.com"))
+
+        manager2 = ConfigManager(str(temp_config_dir))
+        manager2.set_default_config("second")
+        manager2.clear_cache()
+
+        manager3 = ConfigManager(str(temp_config_dir))
+        assert set(manager3.list_configs()) == {"first", "second"}
+        assert manager3.get_default_config().api_key == "sk-2"
+
+    def test_completion_index_persisted_in_snapshot(self, temp_config_dir, sample_claude_config):
+        """Test the completion index is loaded from the snapshot without decoding profiles."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("test-config", sample_claude_config)
+
+        with patch('claude_switch.config.ConfigManager._build_config') as mock_build:
+            manager2 = ConfigManager(str(temp_config_dir))
+            results = list(manager2.get_completion_index().complete("test"))
+            mock_build.assert_not_called()
+
+        assert [name for name, _ in results] == ["test-config:test-model"]
+
+    def test_completion_index_refreshed_on_save(self, temp_config_dir, sample_claude_config):
+        """Test saving a config rebuilds the completion index."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("first", sample_claude_config)
+        assert len(manager.get_completion_index()) == 1
+
+        config2 = ClaudeConfig(api_key="sk-2", base_url="https://two.com")
+        config2.add_model("chat", ModelConfig(model_id="chat-id"))
+        manager.add_config("second", config2)
+
+        assert len(manager.get_completion_index()) == 2
+        assert len(ConfigManager(str(temp_config_dir)).get_completion_index()) == 2
+
+    def test_search_index_persisted_in_snapshot(self, temp_config_dir, sample_claude_config):
+        """Test fuzzy search uses the snapshot's search index without decoding profiles."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("test-config", sample_claude_config)
+
+        with patch('claude_switch.config.ConfigManager._build_config') as mock_build:
+            results = ConfigManager(str(temp_config_dir)).search("tset-config")
+            mock_build.assert_not_called()
+
+        assert [result.name for result in results] == ["test-config:test-model"]
+
+    def test_iter_configs_decodes_lazily(self, temp_config_dir, sample_claude_config):
+        """Test iter_configs yields every config and decodes snapshot blocks one at a time."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("a", sample_claude_config)
+        manager.add_config("b", sample_claude_config)
+
+        fresh = ConfigManager(str(temp_config_dir))
+        configs = fresh.iter_configs()
+        name, config = next(configs)
+
+        assert (name, config.base_url) == ("a", sample_claude_config.base_url)
+        assert isinstance(fresh._configs["b"], int)
+        assert [name for name, _ in configs] == ["b"]
+
+
+def _write_fragment(path: Path, configs: dict, default_config: str = "") -> Path:
+    """Write a JSON config fragment with the given profiles."""
+    import json
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"configs": {
+        name: {"api_key": f"sk-{name}", "base_url": base_url, "models": {"m": {"model_id": f"{name}-m"}}}
+        for name, base_url in configs.items()
+    }}
+    if default_config:
+        data["default_config"] = default_config
+    path.write_text(json.dumps(data))
+    return path
+
+
+class TestConfigLayers:
+    """Tests for conf.d fragments and the system config layer."""
+
+    @pytest.fixture
+    def system_dir(self, temp_config_dir, monkeypatch):
+        path = temp_config_dir / "system"
+        monkeypatch.setenv("CCS_SYSTEM_CONFIG_DIR", str(path))
+        return path
+
+    def test_precedence(self, temp_config_dir, system_dir):
+        """Test the user file overrides conf.d, later fragments override earlier ones, then the system layer."""
+        user_dir = temp_config_dir / "user"
+        _write_fragment(system_dir / "config.json", {"a": "https://system", "s": "https://system"})
+        _write_fragment(system_dir / "conf.d" / "10-site.json", {"b": "https://site"})
+        _write_fragment(user_dir / "conf.d" / "10-team.json", {"a": "https://team", "b": "https://team"})
+        _write_fragment(user_dir / "conf.d" / "20-mine.json", {"b": "https://mine"})
+        (user_dir / "conf.d" / ".hidden.json").write_text("not json")
+        (user_dir / "conf.d" / "README.md").write_text("ignored")
+        manager = ConfigManager(str(user_dir))
+        manager.update_config("a", ClaudeConfig(api_key="sk-user", base_url="https://user",
+                                                models={"m": ModelConfig(model_id="user-m")}))
+
+        configs = ConfigManager(str(user_dir)).list_configs()
+
+        assert {name: config.base_url for name, config in configs.items()} == {
+            "a": "https://user", "s": "https://system", "b": "https://mine"}
+        assert list(configs)[0] == "a"
+        assert len(manager.get_layer_files()) == 4
+
+    def test_writes_only_user_file(self, temp_config_dir, system_dir):
+        """Test edits never copy layer profiles into the user file and layer profiles stay read-only."""
+        _write_fragment(temp_config_dir / "conf.d" / "team.json", {"team": "https://team"}, default_config="team")
+        manager = ConfigManager(str(temp_config_dir))
+
+        assert manager.get_default_config_name() == "team"
+        assert manager.get_default_config().base_url == "https://team"
+        assert not manager.add_config("team", ClaudeConfig(api_key="sk", base_url="https://x"))
+        assert not manager.remove_config("team")
+
+        override = ClaudeConfig(api_key="sk-me", base_url="https://override", models={"m": ModelConfig(model_id="o")})
+        assert manager.update_config("team", override)
+        with open(manager.config_file) as f:
+            saved = yaml.safe_load(f)
+        assert list(saved["configs"]) == ["team"]
+        assert saved["configs"]["team"]["base_url"] == "https://override"
+
+        assert manager.remove_config("team")
+        assert ConfigManager(str(temp_config_dir)).get_config("team").base_url == "https://team"
+
+    def test_fragment_snapshots_and_incremental_reload(self, temp_config_dir, system_dir):
+        """Test each fragment has its own snapshot and reload re-parses only changed fragments."""
+        one = _write_fragment(temp_config_dir / "conf.d" / "one.json", {"one": "https://one"})
+        two = _write_fragment(temp_config_dir / "conf.d" / "two.json", {"two": "https://two"})
+        ConfigManager(str(temp_config_dir))
+
+        manager = ConfigManager(str(temp_config_dir))
+        first, second = manager._layers
+        assert first._snapshot is not None and second._snapshot is not None
+
+        _write_fragment(two, {"two": "https://two-v2"})
+        os.utime(two, ns=(1, 1))
+        manager.reload()
+
+        assert manager._layers[0] is first
+        assert manager._layers[1] is not second
+        assert manager.get_config("two").base_url == "https://two-v2"
+        assert manager.get_config("one").base_url == "https://one"
+        assert one.exists()
+
+    def test_broken_fragment_skipped(self, temp_config_dir, system_dir):
+        """Test a fragment that fails to parse is skipped and reported."""
+        _write_fragment(temp_config_dir / "conf.d" / "good.json", {"good": "https://good"})
+        (temp_config_dir / "conf.d" / "bad.json").write_text("{not json")
+
+        manager = ConfigManager(str(temp_config_dir))
+
+        assert list(manager.list_configs()) == ["good"]
+        assert manager.get_load_error() is None
+        error, = manager.get_layer_errors()
+        assert "bad.json" in error
+
+    def test_completion_index_merges_layers(self, temp_config_dir, system_dir):
+        """Test completion covers layer profiles and uses the overriding profile's models."""
+        _write_fragment(temp_config_dir / "conf.d" / "team.json", {"team": "https://team", "a": "https://team"})
+        manager = ConfigManager(str(temp_config_dir))
+        manager.update_config("a", ClaudeConfig(api_key="sk", base_url="https://a",
+                                                models={"chat": ModelConfig(model_id="a-chat")}))
+
+        names = ConfigManager(str(temp_config_dir)).get_completion_index().names
+
+        assert names == ["a:chat", "team:m"]
+
+    def test_search_merges_layers(self, temp_config_dir, system_dir):
+        """Test search covers layer profiles and hides models of overridden profiles."""
+        _write_fragment(temp_config_dir / "conf.d" / "team.json", {"team": "https://team", "a": "https://team"})
+        manager = ConfigManager(str(temp_config_dir))
+        manager.update_config("a", ClaudeConfig(api_key="sk", base_url="https://a",
+                                                models={"chat": ModelConfig(model_id="a-chat")}))
+
+        fresh = ConfigManager(str(temp_config_dir))
+
+        assert [result.name for result in fresh.search("team")] == ["team:m"]
+        assert "a:m" not in [result.name for result in fresh.search("a:m", limit=None)]
+        assert fresh.search("a:chat")[0].name == "a:chat"
+
+    def test_completion_shadowed_by_profile_without_models(self, temp_config_dir, system_dir):
+        """Test an overriding profile without models still hides the lower layer's completions."""
+        _write_fragment(temp_config_dir / "conf.d" / "team.json", {"team": "https://team", "a": "https://team"})
+        manager = ConfigManager(str(temp_config_dir))
+        manager.update_config("a", ClaudeConfig(api_key="sk", base_url="https://a"))
+
+        assert ConfigManager(str(temp_config_dir)).get_completion_index().names == ["team:m"]
+
+    def test_source_key_tracks_fragments(self, temp_config_dir, system_dir):
+        """Test adding or changing a fragment changes the source key."""
+        manager = ConfigManager(str(temp_config_dir))
+        key = manager.source_key()
+
+        _write_fragment(system_dir / "conf.d" / "site.json", {"site": "https://site"})
+
+        assert manager.source_key() != key
+
+
+class TestHotReload:
+    """Tests for ConfigManager.hot_reload method."""
+
+    def _config(self, base_url: str) -> ClaudeConfig:
+        return ClaudeConfig(api_key="sk", base_url=base_url, models={"m": ModelConfig(model_id="m")})
+
+    def test_reports_changes(self, temp_config_dir):
+        """Test added, removed and changed profiles are reported and the new state is swapped in."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("keep", self._config("https://keep"))
+        manager.add_config("edit", self._config("https://old"))
+        manager.add_config("drop", self._config("https://drop"))
+
+        other = ConfigManager(str(temp_config_dir))
+        with other.transaction():
+            other.update_config("edit", self._config("https://new"))
+            other.remove_config("drop")
+            other.add_config("new", self._config("https://added"))
+            other.set_default_config("new")
+        diff = manager.hot_reload()
+
+        assert (diff.added, diff.removed, diff.changed, diff.default_changed) == (["new"], ["drop"], ["edit"], True)
+        assert manager.get_config("edit").base_url == "https://new"
+        assert not manager.hot_reload()
+
+    def test_malformed_keeps_last_good(self, temp_config_dir):
+        """Test a file that fails to parse raises and leaves the loaded profiles active."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("a", self._config("https://a"))
+        manager.config_file.write_text("configs: [unclosed")
+
+        with pytest.raises(ValueError):
+            manager.hot_reload()
+
+        assert manager.get_load_error() is None
+        assert manager.get_config("a").base_url == "https://a"
+
+    def test_broken_fragment_keeps_last_good(self, temp_config_dir, monkeypatch):
+        """Test a fragment that stops parsing keeps its previous profiles and is reported."""
+        monkeypatch.setenv("CCS_SYSTEM_CONFIG_DIR", "")
+        fragment = _write_fragment(temp_config_dir / "conf.d" / "team.json", {"team": "https://team"})
+        manager = ConfigManager(str(temp_config_dir))
+        fragment.write_text("{broken")
+
+        diff = manager.hot_reload()
+
+        assert not diff
+        assert "team.json" in diff.errors[0]
+        assert manager.get_config("team").base_url == "https://team"
+        assert manager.get_layer_errors() == []
+
+    def test_skipped_in_transaction(self, temp_config_dir):
+        """Test no reload happens while the manager is writing."""
+        manager = ConfigManager(str(temp_config_dir))
+
+        with manager.transaction():
+            assert manager.hot_reload() is None
+
+
+class TestConfigTransaction:
+    """Tests for batched saves through ConfigManager.transaction."""
+
+    def _config(self, index: int) -> ClaudeConfig:
+        config = ClaudeConfig(api_key=f"sk-{index}", base_url=f"https://{index}.test")
+        config.add_model("chat", ModelConfig(model_id=f"chat-{index}"))
+        return config
+
+    def test_to_dict_matches_asdict(self, sample_claude_config):
+        """Test serialization without deep copies matches asdict apart from unset optional fields."""
+        from dataclasses import asdict
+        expected = asdict(sample_claude_config)
+        for name in ('fallbacks', 'rate_limit', 'api_key_cmd', 'api_key_env'):
+            del expected[name]
+        for model in expected['models'].values():
+            del model['fallbacks']
+        assert sample_claude_config.to_dict() == expected
+        assert list(sample_claude_config.to_dict()) == list(expected)
+
+        sample_claude_config.fallbacks = ["backup"]
+        sample_claude_config.rate_limit = RateLimit(requests_per_minute=50, max_concurrent=2)
+        assert sample_claude_config.to_dict()['fallbacks'] == ["backup"]
+        assert sample_claude_config.to_dict()['rate_limit'] == asdict(sample_claude_config)['rate_limit']
+
+    def test_rate_limit_round_trip(self, sample_claude_config):
+        """Test rate_limit is rebuilt as a RateLimit from plain data."""
+        sample_claude_config.rate_limit = RateLimit(tokens_per_minute=40000)
+
+        config = ClaudeConfig.from_dict(sample_claude_config.to_dict())
+
+        assert config.rate_limit == RateLimit(tokens_per_minute=40000)
+        assert ClaudeConfig.from_dict(ClaudeConfig(api_key="k", base_url="u").to_dict()).rate_limit is None
+
+    def test_mutations_write_once(self, temp_config_dir):
+        """Test any number of mutations inside a transaction are serialized once."""
+        manager = ConfigManager(str(temp_config_dir))
+
+        with patch.object(manager.backend, 'dump', wraps=manager.backend.dump) as mock_dump:
+            with manager.transaction():
+                for i in range(50):
+                    manager.add_config(f"p{i}", self._config(i))
+                manager.remove_config("p0")
+                manager.set_default_config("p1")
+                assert not manager.config_file.exists()
+
+        assert mock_dump.call_count == 1
+        reloaded = ConfigManager(str(temp_config_dir))
+        assert len(reloaded.list_configs()) == 49
+        assert reloaded.get_default_config_name() == "p1"
+
+    def test_nested_transactions(self, temp_config_dir):
+        """Test nested transactions join the outermost one."""
+        manager = ConfigManager(str(temp_config_dir))
+
+        with manager.transaction():
+            with manager.transaction():
+                manager.add_config("inner", self._config(1))
+            assert not manager.config_file.exists()
+            manager.add_config("outer", self._config(2))
+
+        assert set(ConfigManager(str(temp_config_dir)).list_configs()) == {"inner", "outer"}
+
+    def test_rollback_on_exception(self, temp_config_dir):
+        """Test an exception discards all mutations and reloads from disk."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("kept", self._config(1))
+
+        with pytest.raises(RuntimeError):
+            with manager.transaction():
+                manager.add_config("dropped", self._config(2))
+                manager.remove_config("kept")
+                raise RuntimeError("boom")
+
+        assert set(manager.list_configs()) == {"kept"}
+        assert set(ConfigManager(str(temp_config_dir)).list_configs()) == {"kept"}
+
+    def test_no_changes_no_write(self, temp_config_dir):
+        """Test a transaction without mutations leaves the file untouched."""
+        manager = ConfigManager(str(temp_config_dir))
+        with manager.transaction():
+            manager.get_config("missing")
+        assert not manager.config_file.exists()
+
+    def test_save_is_atomic(self, temp_config_dir, sample_claude_config):
+        """Test a failed write leaves the previous file intact."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("first", sample_claude_config)
+        before = manager.config_file.read_bytes()
+
+        with patch('claude_switch.fileutil.os.fsync', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                manager.add_config("second", self._config(2))
+
+        assert manager.config_file.read_bytes() == before
+        assert [p.name for p in temp_config_dir.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def _stress_writer(config_dir: str, writer: int, count: int) -> None:
+    manager = ConfigManager(config_dir)
+    for i in range(count):
+        config = ClaudeConfig(api_key=f"sk-{writer}-{i}", base_url="https://stress.test")
+        config.add_model("chat", ModelConfig(model_id=f"model-{writer}-{i}"))
+        assert manager.add_config(f"w{writer}-{i}", config)
+
+
+def _stress_reader(config_dir: str, stop, errors) -> None:
+    while not stop.is_set():
+        manager = ConfigManager(config_dir)
+        if manager.get_load_error() or not manager.list_configs():
+            errors.put(manager.get_load_error() or "no profiles")
+            return
+
+
+class TestConcurrentAccess:
+    """Tests for locking between writers and lock-free readers."""
+
+    def test_writer_reloads_external_changes(self, temp_config_dir, sample_claude_config):
+        """Test a stale manager does not overwrite profiles added by another process."""
+        first = ConfigManager(str(temp_config_dir))
+        second = ConfigManager(str(temp_config_dir))
+
+        first.add_config("first", sample_claude_config)
+        second.add_config("second", sample_claude_config)
+
+        assert set(ConfigManager(str(temp_config_dir)).list_configs()) == {"first", "second"}
+        assert not second.add_config("first", sample_claude_config)
+
+    def test_lock_is_exclusive(self, temp_config_dir):
+        """Test a held writer lock blocks other writers until the timeout."""
+        from claude_switch.fileutil import LockTimeout, file_lock
+        manager = ConfigManager(str(temp_config_dir))
+
+        with manager.transaction():
+            with pytest.raises(LockTimeout):
+                with file_lock(manager.lock_file, timeout=0.05):
+                    pass
+
+    def test_retry_when_file_changes_during_read(self, temp_config_dir, sample_claude_config):
+        """Test a torn read caused by an in-place writer is retried."""
+        writer = ConfigManager(str(temp_config_dir))
+        writer.add_config("test-config", sample_claude_config)
+        writer.clear_cache()
+
+        manager = ConfigManager.__new__(ConfigManager)
+        real_load = writer.backend.load
+        calls = []
+
+        def torn_load(raw):
+            calls.append(raw)
+            if len(calls) == 1:
+                # 模拟读取期间文件被就地改写
+                os.utime(manager.config_file, ns=(0, 0))
+                raise ValueError("truncated")
+            return real_load(raw)
+
+        with patch('claude_switch.backends.YamlBackend.load', side_effect=torn_load):
+            manager.__init__(str(temp_config_dir))
+
+        assert len(calls) == 2
+        assert manager.get_load_error() is None
+        assert manager.config_exists("test-config")
+
+    def test_concurrent_readers_and_writers(self, temp_config_dir, sample_claude_config):
+        """Stress test: readers never see a torn file and no writer update is lost."""
+        import multiprocessing
+        if "fork" not in multiprocessing.get_all_start_methods():
+            pytest.skip("fork start method not available")
+        ctx = multiprocessing.get_context("fork")
+        ConfigManager(str(temp_config_dir)).add_config("seed", sample_claude_config)
+
+        stop, errors = ctx.Event(), ctx.Queue()
+        readers = [ctx.Process(target=_stress_reader, args=(str(temp_config_dir), stop, errors)) for _ in range(6)]
+        writers = [ctx.Process(target=_stress_writer, args=(str(temp_config_dir), w, 10)) for w in range(4)]
+        for process in readers + writers:
+            process.start()
+        for process in writers:
+            process.join(60)
+        stop.set()
+        for process in readers:
+            process.join(60)
+
+        assert all(process.exitcode == 0 for process in writers)
+        assert errors.empty()
+        configs = ConfigManager(str(temp_config_dir)).list_configs()
+        assert len(configs) == 1 + 4 * 10
@@ -0,0 +1,184 @@
+"""Tests for credentials.py module."""
+import os
+import stat
+import time
+import pytest
+from unittest.mock import patch
+from claude_switch import credentials, daemon
+from claude_switch.commands import cache_clear_keys_impl
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig, resolve_run_target
+from claude_switch.daemon import ConfigDaemon
+
+
+@pytest.fixture
+def runtime_dir(temp_config_dir, monkeypatch):
+    """Keep the credential cache in a temporary runtime directory."""
+    path = temp_config_dir / "run"
+    path.mkdir()
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(path))
+    monkeypatch.delenv("CCS_API_KEY_TTL", raising=False)
+    return path
+
+
+@pytest.fixture
+def counting_command(temp_config_dir):
+    """Return a shell command that prints a key and counts its invocations."""
+    counter = temp_config_dir / "count"
+
+    def make(key: str = "sk-from-cmd") -> str:
+        return f"echo x >> {counter}; echo '  {key}  '"
+
+    make.count = lambda: len(counter.read_text().splitlines()) if counter.exists() else 0
+    return make
+
+
+def _wait_for_cache(command: str, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while credentials._read_cache(command) is None:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _config(**kwargs) -> ClaudeConfig:
+    config = ClaudeConfig(base_url="https://api.test", **dict({"api_key": ""}, **kwargs))
+    config.add_model("chat", ModelConfig(model_id="chat"))
+    return config
+
+
+class TestCommandKey:
+    """Tests for command_key function."""
+
+    def test_cached(self, runtime_dir, counting_command):
+        """Test the command runs once, output is stripped and the cache is private."""
+        command = counting_command()
+
+        assert credentials.command_key(command) == "sk-from-cmd"
+        assert credentials.command_key(command) == "sk-from-cmd"
+
+        assert counting_command.count() == 1
+        path = credentials._cache_path(command)
+        assert path.parent == runtime_dir / "claude-code-switch" / "credentials"
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+
+    def test_ttl(self, runtime_dir, counting_command, monkeypatch):
+        """Test expired entries are refreshed and a TTL of 0 disables caching."""
+        command = counting_command()
+        credentials._write_cache(command, "sk-stale", -1)
+        assert credentials.command_key(command) == "sk-from-cmd"
+
+        monkeypatch.setenv("CCS_API_KEY_TTL", "0")
+        credentials.clear_cache()
+        credentials.command_key(command)
+        credentials.command_key(command)
+
+        assert counting_command.count() == 3
+        assert not credentials._cache_path(command).exists()
+
+    @patch('claude_switch.commands.print')
+    def test_clear_keys_command(self, mock_print, runtime_dir, counting_command):
+        """Test ccs cache clear-keys removes cached keys."""
+        credentials.command_key(counting_command())
+
+        cache_clear_keys_impl()
+
+        assert "1 个" in mock_print.call_args[0][0]
+        assert not credentials._cache_path(counting_command()).exists()
+
+    def test_ignores_shared_cache_file(self, runtime_dir, counting_command):
+        """Test a cache file readable by other users is not trusted."""
+        command = counting_command()
+        credentials.command_key(command)
+        os.chmod(credentials._cache_path(command), 0o644)
+
+        credentials.command_key(command)
+
+        assert counting_command.count() == 2
+
+    def test_failure_hides_output(self, runtime_dir, capfd):
+        """Test a failing command reports only its exit code and never echoes its output."""
+        with pytest.raises(ValueError) as excinfo:
+            credentials.command_key("echo sk-secret; echo sk-secret >&2; exit 3")
+
+        assert "退出码 3" in str(excinfo.value)
+        assert "sk-secret" not in str(excinfo.value)
+        out, err = capfd.readouterr()
+        assert "sk-secret" not in out + err
+        with pytest.raises(ValueError):
+            credentials.command_key("true")
+
+    def test_no_terminal(self, runtime_dir):
+        """Test commands never read stdin and warming runs them outside the terminal's session."""
+        command = "python3 -c 'import os, sys; print(\"sk-%d-%s\" % (os.getsid(0), sys.stdin.read()))'"
+
+        assert credentials.run_command(command) == f"sk-{os.getsid(0)}-"
+        assert credentials.run_command(command, detach=True) != f"sk-{os.getsid(0)}-"
+
+
+class TestResolveApiKey:
+    """Tests for resolving keys through ClaudeConfig."""
+
+    def test_precedence(self, runtime_dir, counting_command, monkeypatch):
+        """Test a plain api_key wins, then api_key_env, then api_key_cmd."""
+        monkeypatch.setenv("TEST_CCS_KEY", "sk-from-env")
+        command = counting_command()
+
+        assert _config(api_key="sk-plain", api_key_cmd=command).to_env_vars()["ANTHROPIC_API_KEY"] == "sk-plain"
+        assert _config(api_key_env="TEST_CCS_KEY", api_key_cmd=command).to_env_vars()["ANTHROPIC_API_KEY"] == \
+            "sk-from-env"
+        monkeypatch.delenv("TEST_CCS_KEY")
+        assert _config(api_key_env="TEST_CCS_KEY", api_key_cmd=command).to_env_vars()["ANTHROPIC_API_KEY"] == \
+            "sk-from-cmd"
+        with pytest.raises(ValueError):
+            _config(api_key_env="TEST_CCS_KEY").to_env_vars()
+
+    def test_lazy_per_profile(self, runtime_dir, counting_command, temp_config_dir):
+        """Test only the selected profile's command runs and no key is written to the config file."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("a", _config(api_key_cmd=counting_command("sk-a")))
+        manager.add_config("b", _config(api_key_cmd=counting_command("sk-b")))
+
+        fresh = ConfigManager(str(temp_config_dir))
+        fresh.list_configs()
+        assert counting_command.count() == 0
+        _, _, env_vars, _ = resolve_run_target(fresh, "b")
+
+        assert env_vars["ANTHROPIC_API_KEY"] == "sk-b"
+        assert counting_command.count() == 1
+        text = manager.config_file.read_text()
+        assert "api_key_cmd" in text and "api_key:" not in text
+
+
+class TestWarm:
+    """Tests for warming the default profile's key in the background."""
+
+    def test_warm(self, runtime_dir, counting_command):
+        """Test warming fills the cache once and is skipped while the entry is fresh."""
+        config = _config(api_key_cmd=counting_command())
+
+        credentials.warm(config).join(5)
+
+        assert credentials.warm(config) is None
+        assert credentials.warm(_config(api_key="sk-plain")) is None
+        assert credentials.command_key(config.api_key_cmd) == "sk-from-cmd"
+        assert counting_command.count() == 1
+
+    def test_daemon_warms_default(self, runtime_dir, counting_command, temp_config_dir):
+        """Test the daemon warms the default profile's key in the background without blocking requests."""
+        manager = ConfigManager(str(temp_config_dir))
+        command = "sleep 1; " + counting_command()
+        manager.add_config("a", _config(api_key_cmd=command))
+        manager.set_default_config("a")
+
+        assert ConfigDaemon(manager).warm_target().api_key_cmd == command
+        daemon.start(temp_config_dir)
+        try:
+            started = time.monotonic()
+            assert daemon.request("complete", temp_config_dir, incomplete="a")
+            assert time.monotonic() - started < 0.5
+            assert _wait_for_cache(command)
+        finally:
+            daemon.stop(temp_config_dir)
+        assert counting_command.count() == 1
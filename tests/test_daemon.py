@@ -0,0 +1,261 @@
+"""Tests for daemon.py module."""
+import os
+import pytest
+from unittest.mock import patch
+from claude_switch import daemon
+from claude_switch.complete import complete_config_model_names
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+
+
+def _make_manager(config_dir) -> ConfigManager:
+    manager = ConfigManager(str(config_dir))
+    config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com", description="Test")
+    config.add_model("chat", ModelConfig(model_id="test-chat"))
+    config.add_model("coder", ModelConfig(model_id="test-coder"))
+    manager.add_config("test", config)
+    manager.set_default_config("test")
+    return manager
+
+
+class TestConfigDaemon:
+    """Tests for request handling inside the daemon."""
+
+    def test_ping(self, temp_config_dir):
+        """Test ping reports process and config information."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        info = server.handle({"op": "ping"})
+
+        assert info["pid"] == os.getpid()
+        assert info["configs"] == 1
+        assert info["requests"] == 1
+
+    def test_complete(self, temp_config_dir):
+        """Test completion uses the in-memory index."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        results = server.handle({"op": "complete", "incomplete": "test:co"})
+
+        assert [name for name, _ in results] == ["test:coder"]
+
+    def test_search(self, temp_config_dir):
+        """Test fuzzy search returns serialized results from the in-memory index."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        results = server.handle({"op": "search", "query": "tset:coder", "limit": 1})
+
+        assert [result["name"] for result in results] == ["test:coder"]
+        assert results[0]["model_id"] == "test-coder"
+
+    def test_exists(self, temp_config_dir):
+        """Test exists reports whether a config and model are defined."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        assert server.handle({"op": "exists", "config_model": "test"}) is True
+        assert server.handle({"op": "exists", "config_model": "test:coder"}) is True
+        assert server.handle({"op": "exists", "config_model": "test:missing"}) is False
+        assert server.handle({"op": "exists", "config_model": "tset"}) is False
+
+    def test_env_default(self, temp_config_dir):
+        """Test env resolution falls back to the default config and model."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        config_name, model, env, fallbacks, source = server.handle({"op": "env", "config_model": None})
+
+        assert (config_name, model) == ("test", "chat")
+        assert env["ANTHROPIC_MODEL"] == "test-chat"
+        assert fallbacks == []
+        assert source is None
+
+    def test_env_unknown_config(self, temp_config_dir):
+        """Test env resolution errors are raised as ValueError."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        with pytest.raises(ValueError, match="不存在"):
+            server.handle({"op": "env", "config_model": "missing:chat"})
+
+    def test_list(self, temp_config_dir):
+        """Test list returns plain data that round-trips to ClaudeConfig."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        listing = server.handle({"op": "list"})
+
+        assert listing["default_config"] == "test"
+        assert listing["load_error"] is None
+        config = ClaudeConfig.from_dict(listing["configs"]["test"])
+        assert list(config.models) == ["chat", "coder"]
+
+    def test_unknown_op(self, temp_config_dir):
+        """Test unknown requests are rejected."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        with pytest.raises(ValueError, match="未知请求"):
+            server.handle({"op": "bogus"})
+
+    def test_reloads_when_file_changes(self, temp_config_dir):
+        """Test the daemon picks up edits made by other processes."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+
+        other = ConfigManager(str(temp_config_dir))
+        other.add_config("extra", ClaudeConfig(api_key="sk-x", base_url="https://x.test",
+                                               models={"m": ModelConfig(model_id="x")}))
+
+        assert server.handle({"op": "ping"})["configs"] == 2
+        assert server.reloads == 1
+        assert not server.refresh()
+
+    def test_reloads_when_fragment_added(self, temp_config_dir):
+        """Test the daemon picks up a new conf.d fragment."""
+        server = daemon.ConfigDaemon(_make_manager(temp_config_dir))
+        (temp_config_dir / "conf.d").mkdir()
+        (temp_config_dir / "conf.d" / "team.json").write_text(
+            '{"configs": {"team": {"api_key": "sk-t", "base_url": "https://t.test", "models": {"m": {"model_id": "t"}}}}}'
+        )
+
+        assert server.handle({"op": "ping"})["configs"] == 2
+        assert server.handle({"op": "complete", "incomplete": "team"})[0][0] == "team:m"
+
+
+class TestDaemonClient:
+    """Tests for the client side of the daemon protocol."""
+
+    def test_query_without_socket(self, temp_config_dir, monkeypatch):
+        """Test query returns None when no daemon is running."""
+        monkeypatch.delenv("CCS_NO_DAEMON")
+        assert daemon.query("ping", temp_config_dir) is None
+        assert daemon.status(temp_config_dir) is None
+
+    def test_query_disabled(self, temp_config_dir):
+        """Test CCS_NO_DAEMON disables the daemon for regular commands."""
+        daemon.socket_path(temp_config_dir).write_text("")
+        assert daemon.query("ping", temp_config_dir) is None
+
+    def test_stale_socket(self, temp_config_dir):
+        """Test a leftover socket file without a listener is ignored."""
+        daemon.socket_path(temp_config_dir).write_text("")
+        assert daemon.request("ping", temp_config_dir) is None
+
+    def test_stop_not_running(self, temp_config_dir):
+        """Test stopping when no daemon is running."""
+        assert daemon.stop(temp_config_dir) is None
+
+    def test_start_query_stop(self, temp_config_dir):
+        """Test the full lifecycle of a background daemon."""
+        _make_manager(temp_config_dir)
+
+        info = daemon.start(temp_config_dir)
+        try:
+            assert info["configs"] == 1
+            assert daemon.read_pid(temp_config_dir) == info["pid"]
+            assert oct(daemon.socket_path(temp_config_dir).stat().st_mode & 0o777) == oct(0o600)
+            assert daemon.start(temp_config_dir)["pid"] == info["pid"]
+
+            config_name, model, env, _, _ = daemon.request("env", temp_config_dir, config_model="test:coder")
+            assert (config_name, model) == ("test", "coder")
+            assert env["ANTHROPIC_MODEL"] == "test-coder"
+
+            with pytest.raises(daemon.DaemonError):
+                daemon.request("env", temp_config_dir, config_model="missing")
+        finally:
+            assert daemon.stop(temp_config_dir) == info["pid"]
+
+        assert not daemon.socket_path(temp_config_dir).exists()
+        assert daemon.status(temp_config_dir) is None
+
+
+class TestDaemonCredentials:
+    """Tests that api_key_env/api_key_cmd are resolved by the client, not the daemon."""
+
+    @pytest.fixture
+    def running(self, temp_config_dir, monkeypatch):
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(temp_config_dir))
+        monkeypatch.delenv("CCS_NO_DAEMON")
+        monkeypatch.delenv("CCS_KEY_ONLY_IN_CLIENT", raising=False)
+        monkeypatch.setattr(daemon, "default_config_dir", lambda: temp_config_dir)
+        manager = ConfigManager(str(temp_config_dir))
+        for name, field, value in (("env", "api_key_env", "CCS_KEY_ONLY_IN_CLIENT"),
+                                   ("cmd", "api_key_cmd", f"echo x >> {temp_config_dir / 'count'}; echo sk-cmd")):
+            config = ClaudeConfig(api_key="", base_url="https://api.test.com", **{field: value})
+            config.add_model("m", ModelConfig(model_id="m"))
+            manager.add_config(name, config)
+        daemon.start(temp_config_dir)
+        yield temp_config_dir
+        daemon.stop(temp_config_dir)
+
+    def test_env_read_from_client(self, running, monkeypatch):
+        """Test a variable exported only in the client shell is used while the daemon is running."""
+        from claude_switch.commands import _resolve_run_target
+        monkeypatch.setenv("CCS_KEY_ONLY_IN_CLIENT", "sk-client")
+
+        _, _, env, _, source = daemon.request("env", running, config_model="env:m")
+        assert env["ANTHROPIC_API_KEY"] == ""
+        assert source == {"api_key_env": "CCS_KEY_ONLY_IN_CLIENT", "api_key_cmd": ""}
+
+        assert _resolve_run_target("env:m")[2]["ANTHROPIC_API_KEY"] == "sk-client"
+
+    def test_cmd_runs_once_in_client(self, running):
+        """Test api_key_cmd runs in the client exactly once and the daemon answers without running it."""
+        from claude_switch.commands import _resolve_run_target
+
+        assert _resolve_run_target("cmd:m")[2]["ANTHROPIC_API_KEY"] == "sk-cmd"
+
+        assert (running / "count").read_text().splitlines() == ["x"]
+
+
+class TestDaemonIntegration:
+    """Tests that commands prefer the daemon when it answers."""
+
+    @patch('claude_switch.complete.config_manager')
+    @patch('claude_switch.complete.daemon.query')
+    def test_completion_uses_daemon(self, mock_query, mock_manager):
+        """Test completion results come from the daemon when available."""
+        mock_query.return_value = [["test:chat", "test-chat (默认)"]]
+
+        results = list(complete_config_model_names("te"))
+
+        assert results == [("test:chat", "test-chat (默认)")]
+        mock_query.assert_called_once_with("complete", incomplete="te")
+        mock_manager.get_completion_index.assert_not_called()
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.daemon.query')
+    @patch('claude_switch.commands.print')
+    def test_run_uses_daemon(self, mock_print, mock_query, mock_manager, mock_subprocess):
+        """Test run takes environment variables resolved by the daemon."""
+        from claude_switch.commands import use_config_impl
+        mock_query.return_value = ["test", "chat", {"ANTHROPIC_API_KEY": "sk-test", "ANTHROPIC_MODEL": "test-chat"}, []]
+
+        use_config_impl("test")
+
+        mock_manager.get_config.assert_not_called()
+        env = mock_subprocess.call_args[1]["env"]
+        assert env["ANTHROPIC_MODEL"] == "test-chat"
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.daemon.query')
+    @patch('claude_switch.commands.print')
+    def test_fuzzy_run_uses_daemon(self, mock_print, mock_query, mock_manager, mock_subprocess):
+        """Test fuzzy resolution checks and searches targets through the daemon without loading configs."""
+        from claude_switch.commands import use_config_impl
+
+        def answer(op, **params):
+            if op == "env":
+                if params["config_model"] != "test:chat":
+                    raise daemon.DaemonError("配置 'tset' 不存在")
+                return ["test", "chat", {"ANTHROPIC_API_KEY": "sk-test", "ANTHROPIC_MODEL": "test-chat"}, [], None]
+            if op == "exists":
+                return False
+            assert op == "search"
+            return [{"name": "test:chat", "config": "test", "model": "chat", "model_id": "test-chat",
+                     "description": "", "score": 1.0}]
+
+        mock_query.side_effect = answer
+
+        use_config_impl("tset")
+
+        assert [call[0][0] for call in mock_query.call_args_list] == ["env", "exists", "search", "env"]
+        mock_manager.get_config.assert_not_called()
+        mock_manager.search.assert_not_called()
+        assert mock_subprocess.call_args[1]["env"]["ANTHROPIC_MODEL"] == "test-chat"
@@ -0,0 +1,200 @@
+"""Tests for failover.py module."""
+import socket
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from claude_switch.commands import use_config_impl
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.failover import CircuitBreaker, failover_chain, select_target
+from claude_switch.probe import probe_urls
+
+
+def _closed_port_url() -> str:
+    """An address where connections are refused."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def _listener(respond: bool, accept: bool = True):
+    """A local TCP server that answers HEAD, drops connections, or never answers."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    connections = []
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            if respond:
+                conn.recv(4096)
+                conn.sendall(b"HTTP/1.1 204 No Content\r\n\r\n")
+                conn.close()
+            elif accept:
+                conn.close()
+            else:
+                connections.append(conn)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def close():
+        server.close()
+        for conn in connections:
+            conn.close()
+
+    return f"http://127.0.0.1:{server.getsockname()[1]}", close
+
+
+@pytest.fixture
+def endpoints():
+    healthy, close_healthy = _listener(respond=True)
+    dropping, close_dropping = _listener(respond=False)
+    hanging, close_hanging = _listener(respond=False, accept=False)
+    yield {"healthy": healthy, "dropping": dropping, "hanging": hanging, "refused": _closed_port_url()}
+    for close in (close_healthy, close_dropping, close_hanging):
+        close()
+
+
+def _manager(config_dir, urls) -> ConfigManager:
+    """primary -> backup -> spare, with per-model and per-config fallbacks."""
+    manager = ConfigManager(str(config_dir))
+    with manager.transaction():
+        manager.add_config("primary", ClaudeConfig(
+            api_key="sk-p", base_url=urls["primary"], fallbacks=["spare"],
+            models={"chat": ModelConfig(model_id="p-chat", fallbacks=["backup:fast"])}))
+        manager.add_config("backup", ClaudeConfig(
+            api_key="sk-b", base_url=urls["backup"],
+            models={"slow": ModelConfig(model_id="b-slow"), "fast": ModelConfig(model_id="b-fast")}))
+        manager.add_config("spare", ClaudeConfig(
+            api_key="sk-s", base_url=urls["spare"],
+            models={"other": ModelConfig(model_id="s-other"), "chat": ModelConfig(model_id="s-chat")}))
+        manager.set_default_config("primary")
+    return manager
+
+
+class TestFailoverChain:
+    """Tests for failover_chain function."""
+
+    def test_order_and_default_models(self, temp_config_dir):
+        """Test model fallbacks come before config fallbacks and missing models are inferred."""
+        urls = {"primary": "https://p.test", "backup": "https://b.test", "spare": "https://s.test"}
+        manager = _manager(temp_config_dir, urls)
+
+        chain = failover_chain(manager, "primary", "chat")
+
+        assert chain == [("primary", "chat"), ("backup", "fast"), ("spare", "chat")]
+
+    def test_cycles_and_unknown_entries(self, temp_config_dir):
+        """Test fallback cycles terminate and unknown entries are ignored."""
+        manager = ConfigManager(str(temp_config_dir))
+        with manager.transaction():
+            manager.add_config("a", ClaudeConfig(api_key="k", base_url="https://a.test", fallbacks=["b", "nope"],
+                                                 models={"m": ModelConfig(model_id="a-m")}))
+            manager.add_config("b", ClaudeConfig(api_key="k", base_url="https://b.test", fallbacks=["a:m", "a:x"],
+                                                 models={"m": ModelConfig(model_id="b-m")}))
+
+        assert failover_chain(manager, "a", "m") == [("a", "m"), ("b", "m")]
+
+    def test_fallbacks_round_trip(self, temp_config_dir):
+        """Test fallbacks are persisted and omitted from the file when empty."""
+        urls = {"primary": "https://p.test", "backup": "https://b.test", "spare": "https://s.test"}
+        _manager(temp_config_dir, urls)
+
+        reloaded = ConfigManager(str(temp_config_dir))
+        assert reloaded.get_config("primary").fallbacks == ["spare"]
+        assert reloaded.get_config("primary").models["chat"].fallbacks == ["backup:fast"]
+        assert "fallbacks" not in reloaded.get_config("backup").to_dict()
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker class."""
+
+    def test_open_until_cooldown(self, temp_config_dir):
+        """Test a failure opens the circuit until the cooldown expires and survives a reload."""
+        breaker = CircuitBreaker(temp_config_dir, cooldown=60)
+        breaker.record_failure("https://a.test", "refused")
+        breaker.save()
+
+        reloaded = CircuitBreaker(temp_config_dir, cooldown=60)
+        assert reloaded.is_open("https://a.test")
+        assert not reloaded.is_open("https://a.test", now=time.time() + 61)
+        assert reloaded.state["https://a.test"]["failures"] == 1
+
+        reloaded.record_success("https://a.test")
+        assert not reloaded.is_open("https://a.test")
+
+    def test_corrupt_state(self, temp_config_dir):
+        """Test an unreadable state file is treated as empty."""
+        (temp_config_dir / "circuit.json").write_text("not json")
+        assert CircuitBreaker(temp_config_dir).state == {}
+
+
+class TestSelectTarget:
+    """Tests for select_target against local sockets."""
+
+    @pytest.mark.parametrize("failure", ["refused", "dropping", "hanging"])
+    def test_skips_unreachable(self, temp_config_dir, endpoints, failure):
+        """Test refused, dropped and hanging endpoints are skipped within the timeout."""
+        urls = {"primary": endpoints[failure], "backup": endpoints["healthy"], "spare": endpoints["healthy"]}
+        manager = _manager(temp_config_dir, urls)
+        breaker = CircuitBreaker(temp_config_dir)
+
+        start = time.perf_counter()
+        target, skipped = select_target(manager, failover_chain(manager, "primary", "chat"), breaker, 0.3)
+
+        assert time.perf_counter() - start < 2
+        assert target == ("backup", "fast")
+        assert [item[0] for item in skipped] == [("primary", "chat")]
+        assert breaker.is_open(endpoints[failure])
+
+    def test_open_circuit_skips_check(self, temp_config_dir, endpoints):
+        """Test endpoints with an open circuit are skipped without probing."""
+        urls = {"primary": endpoints["healthy"], "backup": "http://127.0.0.1:9", "spare": endpoints["healthy"]}
+        manager = _manager(temp_config_dir, urls)
+        breaker = CircuitBreaker(temp_config_dir)
+        breaker.record_failure(endpoints["healthy"], "earlier failure")
+
+        with patch('claude_switch.failover.probe_urls', wraps=probe_urls) as mock_probe:
+            target, skipped = select_target(manager, failover_chain(manager, "primary", "chat"), breaker, 0.3)
+
+        assert target is None
+        assert [item[0] for item in skipped] == [("primary", "chat"), ("backup", "fast"), ("spare", "chat")]
+        assert "熔断中" in skipped[0][1]
+        mock_probe.assert_called_once()
+
+
+class TestFailoverRun:
+    """Tests for failover integration in use_config_impl."""
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_uses_fallback(self, mock_print, mock_subprocess, temp_config_dir, endpoints, monkeypatch):
+        """Test run launches with the first reachable fallback's environment."""
+        monkeypatch.setenv("CCS_FAILOVER_TIMEOUT", "0.3")
+        manager = _manager(temp_config_dir, {"primary": endpoints["refused"], "backup": endpoints["hanging"],
+                                             "spare": endpoints["healthy"]})
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl()
+
+        env = mock_subprocess.call_args[1]["env"]
+        assert env["ANTHROPIC_MODEL"] == "s-chat"
+        output = " ".join(str(call) for call in mock_print.call_args_list)
+        assert "跳过 'primary:chat'" in output and "跳过 'backup:fast'" in output
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_all_unreachable(self, mock_print, mock_subprocess, temp_config_dir, endpoints):
+        """Test run does not launch when every candidate is unreachable."""
+        manager = _manager(temp_config_dir, {"primary": endpoints["refused"], "backup": endpoints["refused"],
+                                             "spare": endpoints["dropping"]})
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl("primary:chat")
+
+        mock_subprocess.assert_not_called()
+        assert "均不可达" in str(mock_print.call_args_list[-1])
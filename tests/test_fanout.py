@@ -0,0 +1,106 @@
+"""Tests for fanout.py module."""
+import time
+import pytest
+from unittest.mock import patch
+from claude_switch.commands import fanout_impl
+from claude_switch.fanout import FanoutTarget, output_names, run_fanout
+
+
+def _stub_claude(directory, body: str):
+    path = directory / "claude"
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+class TestOutputNames:
+    """Tests for output_names function."""
+
+    def test_sanitized_and_unique(self):
+        """Test target names become unique, filesystem-safe names."""
+        assert output_names(["deepseek:chat", "a/b", "deepseek:chat", "::"]) == [
+            "deepseek_chat", "a_b", "deepseek_chat-2", "target"
+        ]
+
+
+class TestRunFanout:
+    """Tests for run_fanout function."""
+
+    def test_outputs_and_exit_codes(self, temp_config_dir):
+        """Test each target gets its own environment, output files and exit code."""
+        claude = _stub_claude(temp_config_dir, 'cat; echo " $ANTHROPIC_MODEL $1"; echo err >&2; exit $CODE')
+        targets = [
+            FanoutTarget("a:chat", {"ANTHROPIC_MODEL": "model-a", "CODE": "0"}),
+            FanoutTarget("b:chat", {"ANTHROPIC_MODEL": "model-b", "CODE": "2"}),
+            FanoutTarget("missing", error="配置 'missing' 不存在"),
+        ]
+
+        results = run_fanout(targets, b"hello", temp_config_dir / "out", [claude, "--print"], jobs=2)
+
+        assert [r.target for r in results] == ["a:chat", "b:chat", "missing"]
+        assert [r.exit_code for r in results] == [0, 2, None]
+        assert results[0].output_path.read_text() == "hello model-a --print\n"
+        assert results[1].error_path.read_text() == "err\n"
+        assert results[2].output_path is None and "不存在" in results[2].error
+
+    def test_runs_concurrently(self, temp_config_dir):
+        """Test total time is close to the slowest target, not the sum."""
+        claude = _stub_claude(temp_config_dir, "sleep 0.3")
+        targets = [FanoutTarget(f"t{i}", {}) for i in range(4)]
+
+        start = time.perf_counter()
+        results = run_fanout(targets, b"", temp_config_dir / "out", [claude], jobs=4)
+        elapsed = time.perf_counter() - start
+
+        assert all(r.ok for r in results)
+        assert elapsed < 0.9
+
+    def test_concurrency_limit(self, temp_config_dir):
+        """Test no more than `jobs` targets run at the same time."""
+        log = temp_config_dir / "log"
+        claude = _stub_claude(temp_config_dir, f'echo start >> {log}; sleep 0.2; echo end >> {log}')
+        targets = [FanoutTarget(f"t{i}", {}) for i in range(4)]
+
+        run_fanout(targets, b"", temp_config_dir / "out", [claude], jobs=2)
+
+        running = peak = 0
+        for line in log.read_text().split():
+            running += 1 if line == "start" else -1
+            peak = max(peak, running)
+        assert peak <= 2
+
+    def test_missing_binary(self, temp_config_dir):
+        """Test a missing claude binary is reported per target."""
+        results = run_fanout([FanoutTarget("a", {})], b"", temp_config_dir / "out",
+                             [str(temp_config_dir / "nope")])
+        assert results[0].exit_code is None
+        assert results[0].error
+
+
+class TestFanoutImpl:
+    """Tests for fanout_impl function."""
+
+    @patch('claude_switch.commands.resolve_binary')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_fanout(self, mock_print, mock_manager, mock_resolve, temp_config_dir, sample_claude_config):
+        """Test targets are resolved and the summary is printed."""
+        mock_resolve.return_value = _stub_claude(temp_config_dir, 'echo "$ANTHROPIC_MODEL"')
+        mock_manager.get_config.side_effect = lambda name: sample_claude_config if name == "test" else None
+        prompt = temp_config_dir / "prompt.txt"
+        prompt.write_text("hi")
+
+        with pytest.raises(SystemExit) as exc_info:
+            fanout_impl(["test:test-model", "missing"], str(prompt), 2, str(temp_config_dir / "out"))
+
+        assert exc_info.value.code == 1
+        assert (temp_config_dir / "out" / "test_test-model.out").read_text() == "test-model-id\n"
+        assert not (temp_config_dir / "out" / "missing.out").exists()
+
+    @patch('claude_switch.commands.config_manager')
+    def test_missing_prompt_file(self, mock_manager, temp_config_dir, capsys):
+        """Test an unreadable prompt file is reported on stderr."""
+        with pytest.raises(SystemExit):
+            fanout_impl(["test"], str(temp_config_dir / "nope.txt"))
+
+        assert "无法读取提示词文件" in capsys.readouterr().err
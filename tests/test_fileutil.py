@@ -0,0 +1,48 @@
+"""Tests for fileutil.py module."""
+import os
+from claude_switch.fileutil import atomic_write
+
+
+class TestAtomicWrite:
+    """Tests for atomic_write function."""
+
+    def test_creates_file(self, temp_config_dir):
+        """Test writing a new file returns its stat."""
+        path = temp_config_dir / "config.yaml"
+        stat = atomic_write(path, b"data")
+
+        assert path.read_bytes() == b"data"
+        assert stat.st_ino == os.stat(path).st_ino
+        assert stat.st_ctime_ns == os.stat(path).st_ctime_ns
+
+    def test_replaces_inode(self, temp_config_dir):
+        """Test the file is replaced by rename instead of truncated in place."""
+        path = temp_config_dir / "config.yaml"
+        path.write_bytes(b"old")
+        with open(path, 'rb') as reader:
+            atomic_write(path, b"new")
+            assert reader.read() == b"old"
+        assert path.read_bytes() == b"new"
+
+    def test_preserves_mode(self, temp_config_dir):
+        """Test the permissions of the existing file are kept."""
+        path = temp_config_dir / "config.yaml"
+        path.write_bytes(b"old")
+        path.chmod(0o600)
+
+        atomic_write(path, b"new")
+
+        assert path.stat().st_mode & 0o777 == 0o600
+
+    def test_follows_symlink(self, temp_config_dir):
+        """Test writing through a symlink updates the target and keeps the link."""
+        target = temp_config_dir / "dotfiles" / "config.yaml"
+        target.parent.mkdir()
+        target.write_bytes(b"old")
+        link = temp_config_dir / "config.yaml"
+        link.symlink_to(target)
+
+        atomic_write(link, b"new")
+
+        assert link.is_symlink()
+        assert target.read_bytes() == b"new"
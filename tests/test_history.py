@@ -0,0 +1,206 @@
+"""Tests for history.py module."""
+import json
+import sqlite3
+import subprocess
+import pytest
+from unittest.mock import patch
+from claude_switch.commands import history_impl, stats_impl, use_config_impl
+from claude_switch.history import (DB_NAME, PENDING_NAME, HistoryStore, append_pending, parse_duration,
+                                   percentile, record_session)
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def store(temp_config_dir):
+    """Provide a history store in a temporary directory."""
+    history = HistoryStore(temp_config_dir, clock=lambda: 100 * DAY)
+    yield history
+    history.close()
+
+
+class TestHelpers:
+    """Tests for parse_duration and percentile functions."""
+
+    def test_parse_duration(self):
+        """Test durations with units are converted to seconds."""
+        assert parse_duration("30m") == 1800
+        assert parse_duration("7d") == 7 * DAY
+        assert parse_duration("1.5h") == 5400
+        with pytest.raises(ValueError):
+            parse_duration("7 days")
+
+    def test_percentile(self):
+        """Test percentiles are interpolated between sorted values."""
+        assert percentile([], 50) is None
+        assert percentile([4.0], 95) == 4.0
+        assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+        assert percentile(list(range(101)), 95) == 95
+
+
+class TestHistoryStore:
+    """Tests for HistoryStore class."""
+
+    def test_wal_and_indexes(self, store):
+        """Test the database uses WAL mode and profile queries use the index."""
+        assert store.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        plan = store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE profile = ? AND started >= ?", ("a", 0)
+        ).fetchall()
+        assert "sessions_profile" in str(plan)
+
+    def test_record_and_sessions(self, store):
+        """Test sessions are returned newest first and can be filtered."""
+        store.record("a", "chat", 90 * DAY, 90 * DAY + 60, 0)
+        store.record("b", "coder", 95 * DAY, 95 * DAY + 30, 1)
+        store.record("a", "chat", 99 * DAY, 99 * DAY + 10, 0)
+
+        sessions = store.sessions()
+
+        assert [(s.profile, s.duration) for s in sessions] == [("a", 10), ("b", 30), ("a", 60)]
+        assert [s.started for s in store.sessions(profile="a", since=95 * DAY)] == [99 * DAY]
+        assert len(store.sessions(limit=1)) == 1
+
+    def test_stats(self, store):
+        """Test counts, failures and p50/p95 durations per profile and per model."""
+        for duration in (10, 20, 30, 40):
+            store.record("a", "chat", 98 * DAY, 98 * DAY + duration, 0)
+        store.record("a", "coder", 98 * DAY, 98 * DAY + 100, 2)
+        store.record("b", "chat", 98 * DAY, exit_code=None, mode="exec")
+
+        by_profile = {row["profile"]: row for row in store.stats()}
+        by_model = store.stats(profile="a", by_model=True)
+
+        assert by_profile["a"]["count"] == 5 and by_profile["a"]["failures"] == 1
+        assert by_profile["a"]["p50_s"] == 30 and by_profile["a"]["total_s"] == 200
+        assert by_profile["b"]["count"] == 1 and by_profile["b"]["p50_s"] is None
+        assert [(row["model"], row["p95_s"]) for row in by_model] == [("chat", 38.5), ("coder", 100)]
+
+    def test_stats_buckets(self, store):
+        """Test sessions are grouped into time windows aligned to the start of the range."""
+        store.record("a", "chat", 91 * DAY + 10, 91 * DAY + 20, 0)
+        store.record("a", "chat", 91 * DAY + 50, 91 * DAY + 60, 0)
+        store.record("a", "chat", 93 * DAY, 93 * DAY + 5, 0)
+
+        rows = store.stats(since=91 * DAY, bucket=DAY)
+
+        assert [(row["window_start"], row["count"]) for row in rows] == [(91 * DAY, 2), (93 * DAY, 1)]
+
+    def test_pending_ingested(self, temp_config_dir, store):
+        """Test exec-mode launches appended to the pending file are imported on open."""
+        append_pending(temp_config_dir, "a", "chat", 99 * DAY)
+
+        session, = store.sessions()
+
+        assert (session.profile, session.mode, session.ended, session.exit_code) == ("a", "exec", None, None)
+        assert not (temp_config_dir / PENDING_NAME).exists()
+
+    def test_pending_kept_when_insert_fails(self, temp_config_dir):
+        """Test pending launches are restored for a later import when the database write fails."""
+        append_pending(temp_config_dir, "a", "chat", 98 * DAY)
+        append_pending(temp_config_dir, "b", "chat", 99 * DAY)
+
+        with patch.object(HistoryStore, "_insert", side_effect=sqlite3.OperationalError("database is locked")):
+            with pytest.raises(sqlite3.OperationalError):
+                HistoryStore(temp_config_dir, clock=lambda: 100 * DAY).connection
+
+        assert len((temp_config_dir / PENDING_NAME).read_text().splitlines()) == 2
+        assert not list(temp_config_dir.glob("*.ingest"))
+        with HistoryStore(temp_config_dir, clock=lambda: 100 * DAY) as history:
+            assert [s.profile for s in history.sessions()] == ["b", "a"]
+
+    def test_stale_claims_ingested(self, temp_config_dir):
+        """Test claimed files left by a crashed process are imported and live claims are left alone."""
+        dead = subprocess.Popen(["true"])
+        dead.wait()
+        append_pending(temp_config_dir, "crashed", "chat", 97 * DAY)
+        (temp_config_dir / PENDING_NAME).rename(temp_config_dir / f"{PENDING_NAME}.{dead.pid}.ingest")
+        live = temp_config_dir / f"{PENDING_NAME}.1.ingest"
+        live.write_text(json.dumps({"profile": "live", "model": "chat", "started": 96 * DAY, "mode": "exec"}))
+        append_pending(temp_config_dir, "new", "chat", 99 * DAY)
+
+        with HistoryStore(temp_config_dir, clock=lambda: 100 * DAY) as history:
+            assert [s.profile for s in history.sessions()] == ["new", "crashed"]
+
+        assert [path.name for path in temp_config_dir.glob("*.ingest")] == [live.name]
+
+    def test_auto_prune(self, temp_config_dir, monkeypatch):
+        """Test sessions past the retention period are removed at most once a day."""
+        monkeypatch.setenv("CCS_HISTORY_RETENTION_DAYS", "30")
+        with HistoryStore(temp_config_dir, clock=lambda: 0.0) as history:
+            history.record("a", "chat", 1 * DAY, 1 * DAY + 1, 0)
+            history.record("a", "chat", 80 * DAY, 80 * DAY + 1, 0)
+
+        with HistoryStore(temp_config_dir, clock=lambda: 100 * DAY) as history:
+            assert [s.started for s in history.sessions()] == [80 * DAY]
+
+    def test_prune_and_compact(self, store):
+        """Test prune removes older sessions and compact keeps the remaining ones."""
+        store.record("a", "chat", 10 * DAY, 10 * DAY + 1, 0)
+        store.record("a", "chat", 90 * DAY, 90 * DAY + 1, 0)
+
+        assert store.prune(50 * DAY) == 1
+        store.compact()
+
+        assert len(store.sessions()) == 1
+
+
+class TestRecordSession:
+    """Tests for record_session function."""
+
+    def test_disabled(self, temp_config_dir):
+        """Test nothing is written when CCS_HISTORY=0."""
+        record_session(temp_config_dir, "a", "chat", 1.0, 2.0, 0)
+
+        assert not (temp_config_dir / DB_NAME).exists()
+
+    def test_subprocess_and_exec(self, temp_config_dir, monkeypatch):
+        """Test finished sessions go to the database and exec launches to the pending file."""
+        monkeypatch.setenv("CCS_HISTORY", "1")
+        record_session(temp_config_dir, "a", "chat", 1.0, 3.5, 0)
+        record_session(temp_config_dir, "a", "chat", 5.0, mode="exec")
+
+        assert (temp_config_dir / PENDING_NAME).exists()
+        with HistoryStore(temp_config_dir) as history:
+            assert [(s.mode, s.duration) for s in history.sessions()] == [("exec", None), ("subprocess", 2.5)]
+
+    def test_errors_ignored(self, temp_config_dir, monkeypatch):
+        """Test an unwritable history location does not raise."""
+        monkeypatch.setenv("CCS_HISTORY", "1")
+        (temp_config_dir / "file").write_text("")
+
+        record_session(temp_config_dir / "file", "a", "chat", 1.0, 2.0, 0)
+
+
+class TestHistoryCommands:
+    """Tests for run recording and the history/stats commands."""
+
+    @pytest.fixture
+    def home(self, temp_config_dir, monkeypatch):
+        monkeypatch.setenv("HOME", str(temp_config_dir))
+        monkeypatch.setenv("CCS_HISTORY", "1")
+        return temp_config_dir / ".config" / "claude-code-switch"
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.config_manager')
+    @patch('claude_switch.commands.print')
+    def test_run_recorded(self, mock_print, mock_manager, mock_subprocess, home, sample_claude_config, capsys):
+        """Test ccs run records the session after claude exits and history/stats report it."""
+        mock_manager.get_config.return_value = sample_claude_config
+        mock_subprocess.return_value = subprocess.CompletedProcess(["claude"], 3)
+
+        use_config_impl("test-config")
+        history_impl(as_json=True)
+        stats_impl("7d", by_model=True, as_json=True)
+
+        out = capsys.readouterr().out
+        sessions = json.loads(out[:out.index("]\n") + 1])
+        rows = json.loads(out[out.index("]\n") + 2:])
+        assert [(s["profile"], s["model"], s["exit_code"]) for s in sessions] == [("test-config", "test-model", 3)]
+        assert (rows[0]["profile"], rows[0]["model"], rows[0]["count"], rows[0]["failures"]) == \
+            ("test-config", "test-model", 1, 1)
+
+    def test_invalid_window(self, home):
+        """Test an invalid --window exits with an error."""
+        with pytest.raises(SystemExit):
+            stats_impl("a week")
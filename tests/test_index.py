@@ -0,0 +1,133 @@
+"""Tests for index.py module."""
+import time
+from claude_switch.config import ClaudeConfig, ModelConfig
+from claude_switch.index import CompletionIndex, SearchIndex, trigrams
+
+
+def _make_configs(profiles, models=("chat", "reasoner")):
+    configs = {}
+    for i in range(profiles):
+        config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com")
+        for model in models:
+            config.add_model(model, ModelConfig(model_id=f"{model}-id", description=f"{model} model"))
+        configs[f"provider{i:05d}"] = config
+    return configs
+
+
+class TestCompletionIndex:
+    """Tests for CompletionIndex class."""
+
+    def test_candidates_are_sorted(self):
+        """Test candidates are ordered case-insensitively."""
+        configs = _make_configs(1)
+        configs["Alpha"] = configs.pop("provider00000")
+        configs["beta"] = _make_configs(1)["provider00000"]
+
+        names = [name for name, _ in CompletionIndex.from_configs(configs).complete("")]
+        assert names == ["Alpha:chat", "Alpha:reasoner", "beta:chat", "beta:reasoner"]
+
+    def test_help_text(self):
+        """Test help text contains model id, default marker and description."""
+        index = CompletionIndex.from_configs(_make_configs(1))
+        help_text = dict(index.complete(""))["provider00000:chat"]
+        assert help_text == "chat-id (默认) - chat model"
+
+    def test_model_only_prefix_not_duplicated(self):
+        """Test model-only matches do not repeat config prefix matches."""
+        config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com")
+        config.add_model("chat", ModelConfig(model_id="chat-id"))
+        index = CompletionIndex.from_configs({"chat": config})
+
+        assert [name for name, _ in index.complete("ch")] == ["chat:chat"]
+
+    def test_colon_prefix_skips_model_only_match(self):
+        """Test prefixes containing a colon only match full candidates."""
+        index = CompletionIndex.from_configs(_make_configs(2))
+        assert list(index.complete("chat:")) == []
+
+    def test_data_roundtrip(self):
+        """Test an index restored from its data answers the same queries."""
+        index = CompletionIndex.from_configs(_make_configs(3))
+        restored = CompletionIndex.from_data(index.to_data())
+
+        assert list(restored.complete("reas")) == list(index.complete("reas"))
+        assert len(restored) == 6
+
+    def test_large_index_query_is_fast(self):
+        """Test prefix queries over 10k candidates stay well under 20 ms."""
+        index = CompletionIndex.from_data(CompletionIndex.from_configs(_make_configs(5000)).to_data())
+
+        start = time.perf_counter()
+        results = list(index.complete("provider0421"))
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 20
+        assert elapsed < 0.02
+
+
+class TestSearchIndex:
+    """Tests for SearchIndex class."""
+
+    def _index(self):
+        configs = _make_configs(2)
+        deepseek = ClaudeConfig(api_key="sk-test", base_url="https://api.deepseek.com")
+        deepseek.add_model("chat", ModelConfig(model_id="deepseek-chat", description="DeepSeek V3"))
+        deepseek.add_model("reasoner", ModelConfig(model_id="deepseek-reasoner", description="DeepSeek R1"))
+        configs["deepseek"] = deepseek
+        kimi = ClaudeConfig(api_key="sk-test", base_url="https://api.moonshot.cn")
+        kimi.add_model("k2", ModelConfig(model_id="kimi-k2", description="Moonshot long context"))
+        configs["kimi"] = kimi
+        return SearchIndex.from_configs(configs)
+
+    def test_trigrams_pad_words(self):
+        """Test words are padded so short words and word starts produce trigrams."""
+        assert trigrams("ab") == {" ab", "ab "}
+        assert trigrams("Deep-Seek") >= {" de", "dee", " se", "eek"}
+        assert trigrams("") == set()
+
+    def test_tolerates_typos(self):
+        """Test misspelled and partial queries still find the intended entries."""
+        index = self._index()
+
+        assert index.search("deepsek")[0].config_name == "deepseek"
+        assert index.search("moonshot")[0].name == "kimi:k2"
+        assert index.search("xyzzy") == []
+
+    def test_exact_name_ranks_first(self):
+        """Test an exact config:model name outranks entries that only share trigrams."""
+        index = self._index()
+
+        results = index.search("deepseek:reasoner")
+
+        assert results[0].name == "deepseek:reasoner"
+        assert results[0].score > results[1].score
+        assert results[0].model_name == "reasoner"
+
+    def test_limit_and_exclude(self):
+        """Test results are capped by limit and entries of excluded configs are skipped."""
+        index = self._index()
+
+        assert len(index.search("chat", limit=2)) == 2
+        names = [result.name for result in index.search("chat", limit=None, exclude={"deepseek"})]
+        assert "deepseek:chat" not in names and "provider00000:chat" in names
+
+    def test_data_roundtrip(self):
+        """Test an index restored from its data returns the same results."""
+        index = self._index()
+        restored = SearchIndex.from_data(index.to_data())
+
+        assert restored.search("deepsek") == index.search("deepsek")
+        assert len(restored) == len(index) == 7
+
+    def test_large_index_query_is_fast(self):
+        """Test fuzzy queries over 10k entries take a few milliseconds."""
+        index = SearchIndex.from_data(SearchIndex.from_configs(_make_configs(5000)).to_data())
+        queries = ["provider04213", "provder0421", "reasoner", "chat model", "04213:chat"]
+
+        start = time.perf_counter()
+        for query in queries:
+            results = index.search(query)
+        elapsed = (time.perf_counter() - start) / len(queries)
+
+        assert results[0].name == "provider04213:chat"
+        assert elapsed < 0.05
@@ -0,0 +1,112 @@
+"""Tests for launcher.py module."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.launcher import BINARY_CACHE_NAME, launch_mode, resolve_binary
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _make_binary(directory: Path, body: str = "exit 0") -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / "claude"
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(0o755)
+    return path
+
+
+class TestLaunchMode:
+    """Tests for launch_mode function."""
+
+    def test_default_is_subprocess(self):
+        """Test subprocess mode is the default."""
+        assert launch_mode() == "subprocess"
+
+    def test_environment_variable(self, monkeypatch):
+        """Test CCS_LAUNCH_MODE selects exec mode unless overridden."""
+        monkeypatch.setenv("CCS_LAUNCH_MODE", "exec")
+        assert launch_mode() == "exec"
+        assert launch_mode(False) == "subprocess"
+
+    def test_invalid_value(self, monkeypatch):
+        """Test unknown values fall back to subprocess mode."""
+        monkeypatch.setenv("CCS_LAUNCH_MODE", "fork")
+        assert launch_mode() == "subprocess"
+        assert launch_mode(True) == "exec"
+
+
+class TestResolveBinary:
+    """Tests for resolve_binary function."""
+
+    def test_resolves_and_caches(self, temp_config_dir):
+        """Test the resolved path is cached together with PATH and mtime."""
+        binary = _make_binary(temp_config_dir / "bin")
+        cache_dir = temp_config_dir / "cache"
+
+        assert resolve_binary(cache_dir, path_env=str(binary.parent)) == str(binary)
+
+        cached = json.loads((cache_dir / BINARY_CACHE_NAME).read_text())
+        assert cached["path"] == str(binary)
+        assert cached["mtime_ns"] == binary.stat().st_mtime_ns
+
+    def test_cache_hit_skips_path_search(self, temp_config_dir, monkeypatch):
+        """Test a valid cache entry is used without searching PATH."""
+        binary = _make_binary(temp_config_dir / "bin")
+        cache_dir = temp_config_dir / "cache"
+        resolve_binary(cache_dir, path_env=str(binary.parent))
+
+        import shutil
+        monkeypatch.setattr(shutil, "which", lambda *args, **kwargs: None)
+        assert resolve_binary(cache_dir, path_env=str(binary.parent)) == str(binary)
+
+    def test_invalidated_by_mtime(self, temp_config_dir):
+        """Test an updated binary invalidates the cache entry."""
+        binary = _make_binary(temp_config_dir / "bin")
+        cache_dir = temp_config_dir / "cache"
+        resolve_binary(cache_dir, path_env=str(binary.parent))
+
+        os.utime(binary, ns=(0, 0))
+        assert resolve_binary(cache_dir, path_env=str(binary.parent)) == str(binary)
+        assert json.loads((cache_dir / BINARY_CACHE_NAME).read_text())["mtime_ns"] == 0
+
+    def test_invalidated_by_path(self, temp_config_dir):
+        """Test a different PATH resolves again."""
+        first = _make_binary(temp_config_dir / "a")
+        second = _make_binary(temp_config_dir / "b")
+        cache_dir = temp_config_dir / "cache"
+
+        assert resolve_binary(cache_dir, path_env=str(first.parent)) == str(first)
+        assert resolve_binary(cache_dir, path_env=str(second.parent)) == str(second)
+
+    def test_missing_binary(self, temp_config_dir):
+        """Test None is returned when claude is not installed."""
+        cache_dir = temp_config_dir / "cache"
+        assert resolve_binary(cache_dir, path_env=str(temp_config_dir)) is None
+
+        binary = _make_binary(temp_config_dir / "bin")
+        resolve_binary(cache_dir, path_env=str(binary.parent))
+        binary.unlink()
+        assert resolve_binary(cache_dir, path_env=str(binary.parent)) is None
+
+
+class TestExecLaunch:
+    """End-to-end test of exec launch mode."""
+
+    def test_exec_replaces_process(self, temp_config_dir):
+        """Test claude runs in the ccs process itself and its exit code is returned directly."""
+        manager = ConfigManager(str(temp_config_dir / ".config" / "claude-code-switch"))
+        manager.add_config("test", ClaudeConfig(api_key="sk-test", base_url="https://api.test.com",
+                                                models={"chat": ModelConfig(model_id="test-chat")}))
+        binary = _make_binary(temp_config_dir / "bin", 'echo "$$ $ANTHROPIC_MODEL $1"; exit 3')
+
+        env = dict(os.environ, HOME=str(temp_config_dir), PYTHONPATH=str(PROJECT_ROOT),
+                   PATH=f"{binary.parent}{os.pathsep}{os.environ.get('PATH', '')}")
+        proc = subprocess.Popen([sys.executable, "-m", "claude_switch.cli", "run", "test", "--exec",
+                                 "--args", "--print"], env=env, stdout=subprocess.PIPE, text=True)
+        out, _ = proc.communicate(timeout=30)
+
+        assert proc.returncode == 3
+        assert out.splitlines()[-1] == f"{proc.pid} test-chat --print"
@@ -0,0 +1,87 @@
+"""Tests for output.py module."""
+import io
+import json
+import pytest
+from claude_switch.config import ClaudeConfig, ModelConfig, RateLimit
+from claude_switch.output import PROFILE_FIELDS, parse_fields, profile_record, write_records
+
+RECORDS = [{"name": "a", "default": True, "models": {"chat": {"model_id": "x"}}, "description": "tab\there"},
+           {"name": "b", "default": False, "models": {}, "description": None}]
+
+
+class TestProfileRecord:
+    """Tests for profile_record function."""
+
+    def test_fields(self):
+        """Test records carry every profile field but never the API key."""
+        config = ClaudeConfig(api_key="sk-secret", base_url="https://a.test", default_model="chat",
+                              models={"chat": ModelConfig(model_id="a-chat")},
+                              rate_limit=RateLimit(max_concurrent=2))
+
+        record = profile_record("a", config, True)
+
+        assert tuple(record) == PROFILE_FIELDS
+        assert record["models"] == {"chat": {"model_id": "a-chat", "small_fast_model": "", "description": ""}}
+        assert record["rate_limit"]["max_concurrent"] == 2
+        assert "sk-secret" not in json.dumps(record)
+        assert record["api_key_env"] == record["api_key_cmd"] == ""
+
+    def test_credential_sources(self, monkeypatch):
+        """Test api_key_env and api_key_cmd are output as configured without resolving the key."""
+        monkeypatch.setenv("TEST_CCS_KEY", "sk-from-env")
+        config = ClaudeConfig(api_key="", base_url="https://a.test", api_key_env="TEST_CCS_KEY",
+                              api_key_cmd="exit 1", models={"chat": ModelConfig(model_id="a-chat")})
+
+        record = profile_record("a", config, False)
+
+        assert (record["api_key_env"], record["api_key_cmd"]) == ("TEST_CCS_KEY", "exit 1")
+        assert "sk-from-env" not in json.dumps(record)
+
+
+class TestParseFields:
+    """Tests for parse_fields function."""
+
+    def test_selection(self):
+        """Test fields default to all and keep the requested order."""
+        assert parse_fields(None, PROFILE_FIELDS) == list(PROFILE_FIELDS)
+        assert parse_fields("base_url, name", PROFILE_FIELDS) == ["base_url", "name"]
+
+    def test_unknown(self):
+        """Test unknown fields are rejected."""
+        with pytest.raises(ValueError, match="api_key"):
+            parse_fields("name,api_key", PROFILE_FIELDS)
+
+
+class TestWriteRecords:
+    """Tests for write_records function."""
+
+    def _write(self, output_format, fields=("name", "default", "models", "description"), records=RECORDS):
+        stream = io.StringIO()
+        write_records(iter(records), output_format, fields, stream)
+        return stream.getvalue()
+
+    def test_json(self):
+        """Test JSON output is a single array of the selected fields."""
+        assert json.loads(self._write("json", ("name",))) == [{"name": "a"}, {"name": "b"}]
+        assert json.loads(self._write("json", records=[])) == []
+
+    def test_jsonl(self):
+        """Test JSON Lines output has one object per line."""
+        lines = self._write("jsonl").splitlines()
+
+        assert [json.loads(line)["name"] for line in lines] == ["a", "b"]
+
+    def test_tsv(self):
+        """Test TSV output has a header, flattened lists and escaped tabs."""
+        assert self._write("tsv").splitlines() == [
+            "name\tdefault\tmodels\tdescription",
+            "a\ttrue\tchat\ttab\\there",
+            "b\tfalse\t\t",
+        ]
+
+    def test_invalid_format(self):
+        """Test unknown formats are rejected before anything is written."""
+        stream = io.StringIO()
+        with pytest.raises(ValueError):
+            write_records(iter(RECORDS), "xml", ["name"], stream)
+        assert stream.getvalue() == ""
@@ -0,0 +1,205 @@
+"""Tests for probe.py module."""
+import socket
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from claude_switch.commands import probe_impl, use_config_impl
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.probe import (ProbeResult, load_results, model_candidates, probe_urls,
+                                 select_fastest, store_results)
+
+
+def _serve(delay: float = 0.0):
+    """Start a local HTTP server that answers after `delay` seconds."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            time.sleep(delay)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def servers():
+    fast, fast_url = _serve()
+    slow, slow_url = _serve(0.3)
+    yield fast_url, slow_url
+    for server in (fast, slow):
+        server.shutdown()
+        server.server_close()
+
+
+def _closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+class TestProbeUrls:
+    """Tests for probe_urls against local stand-in servers."""
+
+    def test_measures_phases(self, servers):
+        """Test DNS, connect and first-byte times are recorded for HTTP endpoints."""
+        fast_url, slow_url = servers
+        results = probe_urls([fast_url, slow_url, fast_url])
+
+        assert set(results) == {fast_url, slow_url}
+        fast, slow = results[fast_url], results[slow_url]
+        assert fast.ok and fast.status == 204
+        assert fast.dns_ms is not None and fast.connect_ms is not None
+        assert fast.tls_ms is None
+        assert slow.first_byte_ms >= 300
+        assert fast.total_ms < slow.total_ms
+
+    def test_parallel(self, servers):
+        """Test endpoints are probed concurrently."""
+        _, slow_url = servers
+        urls = [f"{slow_url}/{i}" for i in range(4)]
+
+        start = time.perf_counter()
+        results = probe_urls(urls)
+
+        assert all(result.ok for result in results.values())
+        assert time.perf_counter() - start < 1.0
+
+    def test_connection_refused(self):
+        """Test unreachable endpoints are reported as errors."""
+        url = _closed_port_url()
+        result = probe_urls([url])[url]
+        assert not result.ok
+        assert result.error
+
+    def test_timeout(self):
+        """Test an endpoint that never answers times out."""
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+            start = time.perf_counter()
+            result = probe_urls([url], timeout=0.2)[url]
+
+        assert "超时" in result.error
+        assert time.perf_counter() - start < 1.0
+
+    def test_unsupported_url(self):
+        """Test non-HTTP URLs are rejected without network access."""
+        assert probe_urls(["ftp://example.com"])["ftp://example.com"].error
+
+
+class TestProbeCache:
+    """Tests for the on-disk result cache."""
+
+    def test_roundtrip_and_ttl(self, temp_config_dir):
+        """Test stored results are returned until they expire."""
+        now = time.time()
+        store_results(temp_config_dir, {
+            "https://a.test": ProbeResult("https://a.test", total_ms=10, timestamp=now),
+            "https://b.test": ProbeResult("https://b.test", total_ms=10, timestamp=now - 600),
+        })
+
+        assert set(load_results(temp_config_dir, ttl=300)) == {"https://a.test"}
+        assert set(load_results(temp_config_dir, ttl=3600)) == {"https://a.test", "https://b.test"}
+
+    def test_merge(self, temp_config_dir):
+        """Test new results are merged with existing entries."""
+        store_results(temp_config_dir, {"https://a.test": ProbeResult("https://a.test", timestamp=time.time())})
+        store_results(temp_config_dir, {"https://b.test": ProbeResult("https://b.test", timestamp=time.time())})
+        assert set(load_results(temp_config_dir)) == {"https://a.test", "https://b.test"}
+
+    def test_corrupted_cache(self, temp_config_dir):
+        """Test a corrupted cache file is ignored."""
+        (temp_config_dir / "probe.json").write_text("[1, 2")
+        assert load_results(temp_config_dir) == {}
+
+
+class TestFastest:
+    """Tests for selecting the lowest-latency profile."""
+
+    def _manager(self, temp_config_dir, urls) -> ConfigManager:
+        manager = ConfigManager(str(temp_config_dir))
+        with manager.transaction():
+            for name, url in urls.items():
+                config = ClaudeConfig(api_key="sk-test", base_url=url)
+                config.add_model("sonnet", ModelConfig(model_id="claude-sonnet"))
+                manager.add_config(name, config)
+            other = ClaudeConfig(api_key="sk-test", base_url="http://unused.invalid")
+            other.add_model("chat", ModelConfig(model_id="other-chat"))
+            manager.add_config("other", other)
+        return manager
+
+    def test_candidates_and_selection(self, temp_config_dir):
+        """Test candidates match model names or ids and failures are skipped."""
+        manager = self._manager(temp_config_dir, {"a": "https://a.test", "b": "https://b.test"})
+        candidates = model_candidates(manager, "claude-sonnet")
+        assert [c[0] for c in candidates] == ["a", "b"]
+
+        results = {
+            "https://a.test": ProbeResult("https://a.test", error="超时"),
+            "https://b.test": ProbeResult("https://b.test", total_ms=50),
+        }
+        assert select_fastest(candidates, results)[:2] == ("b", "sonnet")
+        assert select_fastest(candidates, {}) is None
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_fastest(self, mock_print, mock_subprocess, temp_config_dir, servers):
+        """Test run --fastest probes uncached endpoints and launches the fastest profile."""
+        fast_url, slow_url = servers
+        manager = self._manager(temp_config_dir, {"slow": slow_url, "fast": fast_url})
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl(fastest="sonnet")
+
+        env = mock_subprocess.call_args[1]["env"]
+        assert env["ANTHROPIC_BASE_URL"] == fast_url
+        assert set(load_results(manager.cache_dir)) == {fast_url, slow_url}
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_fastest_uses_cache(self, mock_print, mock_subprocess, temp_config_dir):
+        """Test cached results are used without probing again."""
+        manager = self._manager(temp_config_dir, {"a": "https://a.test", "b": "https://b.test"})
+        store_results(manager.cache_dir, {
+            "https://a.test": ProbeResult("https://a.test", total_ms=80, timestamp=time.time()),
+            "https://b.test": ProbeResult("https://b.test", total_ms=20, timestamp=time.time()),
+        })
+
+        with patch('claude_switch.commands.config_manager', manager), \
+                patch('claude_switch.probe.probe_urls') as mock_probe:
+            use_config_impl(fastest="sonnet")
+
+        mock_probe.assert_not_called()
+        assert mock_subprocess.call_args[1]["env"]["ANTHROPIC_BASE_URL"] == "https://b.test"
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_fastest_unknown_model(self, mock_print, mock_subprocess, temp_config_dir):
+        """Test an unknown model is reported without launching."""
+        manager = self._manager(temp_config_dir, {"a": "https://a.test"})
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl(fastest="missing")
+
+        mock_subprocess.assert_not_called()
+
+    @patch('claude_switch.commands.print')
+    def test_probe_impl(self, mock_print, temp_config_dir, servers):
+        """Test ccs probe measures every distinct base_url and caches the results."""
+        fast_url, slow_url = servers
+        manager = self._manager(temp_config_dir, {"a": fast_url, "b": fast_url, "c": slow_url})
+
+        with patch('claude_switch.commands.config_manager', manager):
+            probe_impl(timeout=2)
+
+        results = load_results(manager.cache_dir)
+        assert results[fast_url].ok and results[slow_url].ok
+        assert "http://unused.invalid" in results
@@ -0,0 +1,594 @@
+"""Tests for proxy.py module."""
+import asyncio
+import http.client
+import json
+import os
+import socket
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from claude_switch.commands import proxy_stats_impl, use_config_impl
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig, RateLimit
+from claude_switch.proxy import (ProxyServer, Upstream, UpstreamPool, build_upstreams, read_state,
+                                 state_path, write_state)
+from claude_switch.ratelimit import RateLimiter
+from claude_switch.response_cache import ResponseCache
+
+TOKEN = "proxy-token"
+SSE_EVENTS = ("message_start", "content_block_delta", "message_stop")
+
+
+class FakeUpstream:
+    """A local HTTP/1.1 server standing in for an Anthropic-compatible API."""
+
+    def __init__(self, name: str, drop_after_response: bool = False):
+        self.name = name
+        self.requests = []
+        self.connections = 0
+        self.resume = threading.Event()
+        self.resume.set()
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                upstream.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                upstream.requests.append((self.path, dict(self.headers), body))
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for index, event in enumerate(SSE_EVENTS):
+                        if index == 1:
+                            upstream.resume.wait(5)
+                        data = f"event: {event}\ndata: {{}}\n\n".encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    payload = json.dumps({"upstream": upstream.name, "model": body["model"]}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                if drop_after_response:
+                    # 不发送 Connection: close 就关闭连接，模拟上游回收空闲连接
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/anthropic"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def upstream(self, model_id: str = "real-model", small_fast_model: str = "", limiter=None) -> Upstream:
+        return Upstream(self.name, self.url, f"sk-{self.name}", model_id, small_fast_model, timeout=5,
+                        limiter=limiter)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _refused_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def fake_upstreams():
+    created = []
+
+    def make(name: str, **kwargs) -> FakeUpstream:
+        created.append(FakeUpstream(name, **kwargs))
+        return created[-1]
+
+    yield make
+    for upstream in created:
+        upstream.close()
+
+
+@pytest.fixture
+def start_proxy():
+    """Run ProxyServer instances on an event loop in a background thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+
+    def start(upstreams, strategy: str = "round-robin", **kwargs) -> ProxyServer:
+        server = ProxyServer(UpstreamPool(upstreams, strategy), token=TOKEN, port=0, **kwargs)
+        asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def _post(connection: http.client.HTTPConnection, body: dict, token: str = TOKEN, headers=None):
+    connection.request("POST", "/v1/messages?beta=true", json.dumps(body),
+                       dict({"x-api-key": token, "content-type": "application/json"}, **(headers or {})))
+    return connection.getresponse()
+
+
+def _connect(server: ProxyServer) -> http.client.HTTPConnection:
+    return http.client.HTTPConnection(server.host, server.port, timeout=5)
+
+
+class TestUpstreamPool:
+    """Tests for routing order in UpstreamPool."""
+
+    def _upstreams(self):
+        return [Upstream(name, f"https://{name}.test", "k", "m") for name in ("a", "b", "c")]
+
+    def test_round_robin(self):
+        """Test round-robin rotates the preferred upstream and keeps the rest as fallbacks."""
+        pool = UpstreamPool(self._upstreams())
+
+        orders = [[u.name for u in pool.order()] for _ in range(4)]
+
+        assert orders == [["a", "b", "c"], ["b", "c", "a"], ["c", "a", "b"], ["a", "b", "c"]]
+
+    def test_least_outstanding(self):
+        """Test least-outstanding prefers idle upstreams and rotates between ties."""
+        a, b, c = upstreams = self._upstreams()
+        pool = UpstreamPool(upstreams, "least-outstanding")
+        a.outstanding, b.outstanding, c.outstanding = 2, 0, 0
+
+        assert [u.name for u in pool.order()] == ["b", "c", "a"]
+        assert [u.name for u in pool.order()] == ["b", "c", "a"]
+        assert [u.name for u in pool.order()] == ["c", "b", "a"]
+
+    def test_invalid(self):
+        """Test empty pools, unknown strategies and unsupported URLs are rejected."""
+        with pytest.raises(ValueError, match="上游池为空"):
+            UpstreamPool([])
+        with pytest.raises(ValueError, match="路由策略"):
+            UpstreamPool(self._upstreams(), "random")
+        with pytest.raises(ValueError, match="不支持的URL"):
+            Upstream("x", "ftp://x.test", "k", "m")
+
+    def test_rewrite_body(self):
+        """Test the model is rewritten, including the small fast model."""
+        upstream = Upstream("a", "https://a.test", "k", "model-a", "fast-a")
+        pool = UpstreamPool([upstream, Upstream("b", "https://b.test", "k", "model-b", "fast-b")])
+
+        assert json.loads(pool.rewrite_body(b'{"model": "anything", "x": 1}', upstream)) == {
+            "model": "model-a", "x": 1}
+        assert json.loads(pool.rewrite_body(b'{"model": "fast-b"}', upstream))["model"] == "fast-a"
+        assert pool.rewrite_body(b"not json", upstream) == b"not json"
+
+
+class TestProxyServer:
+    """Tests for ProxyServer against local fake upstreams."""
+
+    def test_rejects_bad_token(self, fake_upstreams, start_proxy):
+        """Test requests without the proxy token are rejected and never forwarded."""
+        upstream = fake_upstreams("a")
+        server = start_proxy([upstream.upstream()])
+        connection = _connect(server)
+
+        response = _post(connection, {"model": "m"}, token="sk-wrong")
+
+        assert response.status == 401
+        assert json.loads(response.read())["error"]["type"] == "authentication_error"
+        assert upstream.requests == []
+        connection.close()
+
+    def test_rewrites_request(self, fake_upstreams, start_proxy):
+        """Test the key, host, path prefix and model are rewritten for the upstream."""
+        upstream = fake_upstreams("a")
+        server = start_proxy([upstream.upstream("real-model")])
+        connection = _connect(server)
+
+        response = _post(connection, {"model": "client-model", "max_tokens": 1})
+
+        assert response.status == 200
+        assert json.loads(response.read()) == {"upstream": "a", "model": "real-model"}
+        path, headers, body = upstream.requests[0]
+        assert path == "/anthropic/v1/messages?beta=true"
+        assert headers["x-api-key"] == "sk-a"
+        assert headers["Host"] == upstream.url.split("/")[2]
+        assert body == {"model": "real-model", "max_tokens": 1}
+        connection.close()
+
+    def test_round_robin_reuses_connections(self, fake_upstreams, start_proxy):
+        """Test requests alternate between upstreams over a single warm connection each."""
+        a, b = fake_upstreams("a"), fake_upstreams("b")
+        server = start_proxy([a.upstream(), b.upstream()])
+        connection = _connect(server)
+
+        served = [json.loads(_post(connection, {"model": "m"}).read())["upstream"] for _ in range(6)]
+
+        assert served == ["a", "b"] * 3
+        assert (a.connections, b.connections) == (1, 1)
+        connection.close()
+
+    def test_streams_sse(self, fake_upstreams, start_proxy):
+        """Test SSE events reach the client before the upstream finishes the response."""
+        upstream = fake_upstreams("a")
+        upstream.resume.clear()
+        server = start_proxy([upstream.upstream()])
+        connection = _connect(server)
+
+        response = _post(connection, {"model": "m", "stream": True})
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "text/event-stream"
+        assert response.readline() == b"event: message_start\n"
+
+        upstream.resume.set()
+        rest = response.read().decode()
+        assert [line for line in rest.splitlines() if line.startswith("event:")] == [
+            "event: content_block_delta", "event: message_stop"]
+
+        # 流式响应结束后客户端连接仍可继续使用
+        assert _post(connection, {"model": "m"}).status == 200
+        connection.close()
+
+    def test_retries_stale_pooled_connection(self, fake_upstreams, start_proxy):
+        """Test a pooled connection closed by the upstream is replaced transparently."""
+        upstream = fake_upstreams("a", drop_after_response=True)
+        server = start_proxy([upstream.upstream()])
+        connection = _connect(server)
+
+        served = [json.loads(_post(connection, {"model": "m"}).read())["upstream"] for _ in range(3)]
+
+        assert served == ["a", "a", "a"]
+        assert upstream.connections == 3
+        assert server.pool.upstreams[0].failures == 0
+        connection.close()
+
+    def test_skips_unreachable_upstream(self, fake_upstreams, start_proxy):
+        """Test requests fall through to the next upstream when one refuses connections."""
+        healthy = fake_upstreams("a")
+        down = Upstream("down", _refused_url(), "sk-down", "m", timeout=5)
+        server = start_proxy([down, healthy.upstream()])
+        connection = _connect(server)
+
+        served = [json.loads(_post(connection, {"model": "m"}).read())["upstream"] for _ in range(2)]
+
+        assert served == ["a", "a"]
+        assert down.failures >= 1
+        connection.close()
+
+    def test_skips_hanging_upstream(self, fake_upstreams, start_proxy):
+        """Test a request falls through to the next upstream when the first never answers."""
+        healthy = fake_upstreams("a")
+        with socket.socket() as hanging:
+            hanging.bind(("127.0.0.1", 0))
+            hanging.listen()
+            stuck = Upstream("stuck", f"http://127.0.0.1:{hanging.getsockname()[1]}", "sk-stuck", "m", timeout=0.3)
+            server = start_proxy([stuck, healthy.upstream()])
+            connection = _connect(server)
+
+            response = _post(connection, {"model": "m"})
+
+            assert response.status == 200
+            assert json.loads(response.read())["upstream"] == "a"
+            assert stuck.failures == 1
+            connection.close()
+
+    def test_invalid_chunk_size_closes_client(self, start_proxy):
+        """Test a malformed chunked response from the upstream closes the client connection cleanly."""
+        with socket.socket() as broken:
+            broken.bind(("127.0.0.1", 0))
+            broken.listen()
+
+            def respond():
+                conn, _ = broken.accept()
+                with conn:
+                    conn.recv(65536)
+                    conn.sendall(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n")
+                    threading.Event().wait(1)
+
+            threading.Thread(target=respond, daemon=True).start()
+            server = start_proxy([Upstream("broken", f"http://127.0.0.1:{broken.getsockname()[1]}", "k", "m",
+                                           timeout=5)])
+            connection = _connect(server)
+
+            response = _post(connection, {"model": "m"})
+
+            assert response.status == 200
+            with pytest.raises(http.client.HTTPException):
+                response.read()
+            connection.close()
+
+    def test_replace_pool(self, fake_upstreams, start_proxy):
+        """Test requests go to the new upstreams after the pool is replaced."""
+        a, b = fake_upstreams("a"), fake_upstreams("b")
+        server = start_proxy([a.upstream()])
+        connection = _connect(server)
+        assert json.loads(_post(connection, {"model": "m"}).read())["upstream"] == "a"
+
+        server.replace_pool(UpstreamPool([b.upstream()]))
+
+        assert json.loads(_post(connection, {"model": "m"}).read())["upstream"] == "b"
+        assert [u["name"] for u in server.stats()["upstreams"]] == ["b"]
+        connection.close()
+
+    def test_all_upstreams_down(self, start_proxy):
+        """Test a 502 Anthropic-style error is returned when no upstream is reachable."""
+        server = start_proxy([Upstream("down", _refused_url(), "k", "m", timeout=5)])
+        connection = _connect(server)
+
+        response = _post(connection, {"model": "m"})
+
+        assert response.status == 502
+        error = json.loads(response.read())["error"]
+        assert error["type"] == "api_error" and "down" in error["message"]
+        connection.close()
+
+
+class TestProxyCache:
+    """Tests for response caching in ProxyServer."""
+
+    REQUEST = {"model": "client-model", "temperature": 0, "messages": [{"role": "user", "content": "hi"}]}
+
+    def test_replays_json(self, fake_upstreams, start_proxy, temp_config_dir):
+        """Test an identical temperature-0 request is answered locally the second time."""
+        upstream = fake_upstreams("a")
+        server = start_proxy([upstream.upstream()], cache=ResponseCache(temp_config_dir))
+        connection = _connect(server)
+
+        first = _post(connection, self.REQUEST)
+        first_body = first.read()
+        second = _post(connection, dict(self.REQUEST, metadata={"user_id": "another-session"}))
+
+        assert first.getheader("x-ccs-cache") == "miss"
+        assert second.getheader("x-ccs-cache") == "hit"
+        assert second.read() == first_body
+        assert len(upstream.requests) == 1
+        connection.close()
+
+    def test_failover_response_keyed_by_serving_upstream(self, fake_upstreams, start_proxy, temp_config_dir):
+        """Test a response served by a fallback upstream is cached under that upstream's model."""
+        healthy = fake_upstreams("a")
+        down = Upstream("down", _refused_url(), "sk-down", "down-model", timeout=5)
+        server = start_proxy([down, healthy.upstream()], cache=ResponseCache(temp_config_dir))
+        connection = _connect(server)
+
+        statuses = []
+        for _ in range(3):
+            response = _post(connection, self.REQUEST)
+            response.read()
+            statuses.append(response.getheader("x-ccs-cache"))
+
+        # 第2个请求首选 a，命中第1个请求的缓存；第3个请求首选 down，不能得到 a 的模型的响应
+        assert statuses == ["miss", "hit", "miss"]
+        assert len(healthy.requests) == 2
+        connection.close()
+
+    def test_replays_sse(self, fake_upstreams, start_proxy, temp_config_dir):
+        """Test a cached streaming response is replayed as the same SSE events."""
+        upstream = fake_upstreams("a")
+        server = start_proxy([upstream.upstream()], cache=ResponseCache(temp_config_dir))
+        connection = _connect(server)
+        request = dict(self.REQUEST, stream=True)
+
+        first = _post(connection, request).read()
+        replay = _post(connection, request)
+
+        assert replay.getheader("x-ccs-cache") == "hit"
+        assert replay.getheader("Content-Type") == "text/event-stream"
+        assert replay.getheader("Transfer-Encoding") == "chunked"
+        assert replay.read() == first
+        assert [line for line in first.decode().splitlines() if line.startswith("event:")] == [
+            f"event: {event}" for event in SSE_EVENTS]
+        assert len(upstream.requests) == 1
+        connection.close()
+
+    def test_not_cached(self, fake_upstreams, start_proxy, temp_config_dir):
+        """Test non-deterministic and bypassed requests always reach the upstream."""
+        upstream = fake_upstreams("a")
+        server = start_proxy([upstream.upstream()], cache=ResponseCache(temp_config_dir))
+        connection = _connect(server)
+        sampled = dict(self.REQUEST, temperature=1)
+
+        for _ in range(2):
+            assert _post(connection, sampled).read()
+        _post(connection, self.REQUEST).read()
+        bypassed = _post(connection, self.REQUEST, headers={"x-ccs-cache": "bypass"})
+        bypassed.read()
+
+        assert bypassed.getheader("x-ccs-cache") == "bypass"
+        assert len(upstream.requests) == 4
+        assert "x-ccs-cache" not in {name.lower() for name in upstream.requests[-1][1]}
+        connection.close()
+
+    def test_cache_all(self, fake_upstreams, start_proxy, temp_config_dir):
+        """Test cache mode 'all' also replays sampled requests."""
+        upstream = fake_upstreams("a")
+        server = start_proxy([upstream.upstream()], cache=ResponseCache(temp_config_dir), cache_mode="all")
+        connection = _connect(server)
+        sampled = dict(self.REQUEST, temperature=1)
+
+        _post(connection, sampled).read()
+        assert _post(connection, sampled).getheader("x-ccs-cache") == "hit"
+        connection.close()
+
+
+class TestProxyRateLimit:
+    """Tests for rate limiting and statistics in ProxyServer."""
+
+    def _stats(self, server: ProxyServer) -> dict:
+        connection = _connect(server)
+        connection.request("GET", "/ccs/stats", headers={"x-api-key": TOKEN})
+        stats = json.loads(connection.getresponse().read())
+        connection.close()
+        return stats
+
+    def test_queues_over_limit(self, fake_upstreams, start_proxy):
+        """Test requests over max_concurrent wait in the queue instead of failing."""
+        upstream = fake_upstreams("a")
+        upstream.resume.clear()
+        server = start_proxy([upstream.upstream(limiter=RateLimiter(max_concurrent=1))])
+        results = {}
+
+        def send(name, body):
+            connection = _connect(server)
+            response = _post(connection, body)
+            results[name] = (response.status, response.read())
+            connection.close()
+
+        streaming = threading.Thread(target=send, args=("stream", {"model": "m", "stream": True}))
+        streaming.start()
+        while not upstream.requests:
+            threading.Event().wait(0.01)
+        queued = threading.Thread(target=send, args=("queued", {"model": "m"}))
+        queued.start()
+        while self._stats(server)["rate_limits"]["a"]["queue_depth"] == 0:
+            threading.Event().wait(0.01)
+
+        stats = self._stats(server)
+        assert stats["rate_limits"]["a"]["active"] == 1
+        assert len(upstream.requests) == 1
+
+        upstream.resume.set()
+        streaming.join(5)
+        queued.join(5)
+
+        assert results["stream"][0] == results["queued"][0] == 200
+        limits = self._stats(server)["rate_limits"]["a"]
+        assert (limits["admitted"], limits["max_queue_depth"], limits["queue_depth"]) == (2, 1, 0)
+        assert limits["max_wait_s"] > 0
+
+    def test_stats_require_token(self, fake_upstreams, start_proxy):
+        """Test the stats endpoint is protected by the proxy token."""
+        server = start_proxy([fake_upstreams("a").upstream()])
+        connection = _connect(server)
+
+        connection.request("GET", "/ccs/stats")
+
+        assert connection.getresponse().status == 401
+        connection.close()
+
+    def test_proxy_stats_command(self, fake_upstreams, start_proxy, temp_config_dir, capsys):
+        """Test ccs proxy-stats --json prints the running proxy's statistics."""
+        server = start_proxy([fake_upstreams("a").upstream()], cache=ResponseCache(temp_config_dir / "responses"))
+        manager = ConfigManager(str(temp_config_dir))
+        write_state(manager.cache_dir, server, ["a"])
+
+        with patch('claude_switch.commands.config_manager', manager):
+            proxy_stats_impl(as_json=True)
+
+        stats = json.loads(capsys.readouterr().out)
+        assert stats["upstreams"][0]["name"] == "a"
+        assert stats["cache"]["mode"] == "deterministic"
+        assert stats["rate_limits"] == {}
+
+
+class TestProxyState:
+    """Tests for the proxy state file and run --via-proxy."""
+
+    def _server(self) -> ProxyServer:
+        server = ProxyServer(UpstreamPool([Upstream("a:chat", "https://a.test", "k", "m")]), token=TOKEN, port=9999)
+        return server
+
+    def test_write_and_read(self, temp_config_dir):
+        """Test the state file is private and ignored once the process is gone."""
+        write_state(temp_config_dir, self._server(), ["a:chat"])
+
+        assert oct(state_path(temp_config_dir).stat().st_mode & 0o777) == oct(0o600)
+        state = read_state(temp_config_dir)
+        assert state["url"] == "http://127.0.0.1:9999" and state["token"] == TOKEN
+
+        with patch('claude_switch.proxy.os.kill', side_effect=ProcessLookupError):
+            assert read_state(temp_config_dir) is None
+
+    def test_build_upstreams(self, temp_config_dir):
+        """Test upstreams are built from config:model targets."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("a", ClaudeConfig(api_key="sk-a", base_url="https://a.test/api", timeout_ms=1000,
+                                             models={"chat": ModelConfig(model_id="a-chat", small_fast_model="a-fast"),
+                                                     "coder": ModelConfig(model_id="a-coder")},
+                                             rate_limit=RateLimit(requests_per_minute=50)))
+
+        upstream, coder = build_upstreams(manager, ["a", "a:coder"])
+
+        assert (upstream.name, upstream.model_id, upstream.small_fast_model) == ("a:chat", "a-chat", "a-fast")
+        assert (upstream.host, upstream.port, upstream.path_prefix, upstream.timeout) == ("a.test", 443, "/api", 1.0)
+        assert upstream.limiter is coder.limiter and upstream.limiter.requests_per_minute == 50
+        with pytest.raises(ValueError, match="不存在"):
+            build_upstreams(manager, ["missing"])
+
+    def test_rebuild_keeps_rate_limiters(self, temp_config_dir):
+        """Test a hot-reload rebuild reuses limiters whose rate_limit is unchanged."""
+        manager = ConfigManager(str(temp_config_dir))
+        for name in ("a", "b"):
+            manager.add_config(name, ClaudeConfig(api_key=f"sk-{name}", base_url=f"https://{name}.test",
+                                                  models={"chat": ModelConfig(model_id=f"{name}-chat")},
+                                                  rate_limit=RateLimit(max_concurrent=2)))
+        pool = UpstreamPool(build_upstreams(manager, ["a", "b"]))
+
+        manager.update_config("a", ClaudeConfig(api_key="sk-a", base_url="https://a.test", timeout_ms=1000,
+                                                models={"chat": ModelConfig(model_id="a-chat")},
+                                                rate_limit=RateLimit(max_concurrent=2)))
+        manager.update_config("b", ClaudeConfig(api_key="sk-b", base_url="https://b.test",
+                                                models={"chat": ModelConfig(model_id="b-chat")},
+                                                rate_limit=RateLimit(max_concurrent=1)))
+        a, b = build_upstreams(manager, ["a", "b"], pool)
+
+        assert a.timeout == 1.0 and a.limiter is pool.upstreams[0].limiter
+        assert b.limiter is not pool.upstreams[1].limiter and b.limiter.max_concurrent == 1
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_via_proxy(self, mock_print, mock_subprocess, temp_config_dir):
+        """Test run --via-proxy points Claude Code at the proxy with the proxy token."""
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("a", ClaudeConfig(api_key="sk-a", base_url="https://a.test",
+                                             models={"chat": ModelConfig(model_id="a-chat")}))
+        write_state(manager.cache_dir, self._server(), ["a:chat"])
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl(via_proxy=True)
+
+        env = mock_subprocess.call_args[1]["env"]
+        assert env["ANTHROPIC_BASE_URL"] == "http://127.0.0.1:9999"
+        assert env["ANTHROPIC_API_KEY"] == TOKEN
+        assert env["ANTHROPIC_MODEL"] == "a-chat"
+        assert os.getpid() == read_state(manager.cache_dir)["pid"]
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_via_proxy_no_cache(self, mock_print, mock_subprocess, temp_config_dir, monkeypatch):
+        """Test --no-cache adds the bypass header through ANTHROPIC_CUSTOM_HEADERS."""
+        monkeypatch.setenv("ANTHROPIC_CUSTOM_HEADERS", "x-team: a")
+        manager = ConfigManager(str(temp_config_dir))
+        manager.add_config("a", ClaudeConfig(api_key="sk-a", base_url="https://a.test",
+                                             models={"chat": ModelConfig(model_id="a-chat")}))
+        write_state(manager.cache_dir, self._server(), ["a:chat"])
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl(via_proxy=True, no_cache=True)
+            use_config_impl(no_cache=True)
+
+        mock_subprocess.assert_called_once()
+        assert mock_subprocess.call_args[1]["env"]["ANTHROPIC_CUSTOM_HEADERS"] == "x-team: a\nx-ccs-cache: bypass"
+        assert "--via-proxy" in str(mock_print.call_args)
+
+    @patch('claude_switch.commands.subprocess.run')
+    @patch('claude_switch.commands.print')
+    def test_run_via_proxy_not_running(self, mock_print, mock_subprocess, temp_config_dir):
+        """Test run --via-proxy fails when no proxy is running."""
+        manager = ConfigManager(str(temp_config_dir))
+
+        with patch('claude_switch.commands.config_manager', manager):
+            use_config_impl("a:chat", via_proxy=True)
+
+        mock_subprocess.assert_not_called()
+        assert "代理未运行" in str(mock_print.call_args)
@@ -0,0 +1,128 @@
+"""Tests for ratelimit.py module."""
+import asyncio
+import json
+import time
+from claude_switch.config import RateLimit
+from claude_switch.ratelimit import RateLimiter, estimate_tokens, usage_tokens
+
+
+class TestUsage:
+    """Tests for token estimation and usage parsing."""
+
+    def test_estimate_tokens(self):
+        """Test token estimates scale with body size and are never zero."""
+        assert estimate_tokens(b"") == 1
+        assert estimate_tokens(b"x" * 400) == 100
+
+    def test_json_usage(self):
+        """Test usage is read from a non-streaming response."""
+        body = json.dumps({"usage": {"input_tokens": 10, "output_tokens": 5,
+                                     "cache_creation_input_tokens": 2, "cache_read_input_tokens": 100}})
+        assert usage_tokens(body.encode()) == 17
+        assert usage_tokens(b'{"content": []}') is None
+
+    def test_sse_usage(self):
+        """Test usage is summed from message_start and message_delta events."""
+        body = (b'event: message_start\ndata: {"type": "message_start", "message": {"usage": '
+                b'{"input_tokens": 20, "output_tokens": 1}}}\n\n'
+                b'event: content_block_delta\ndata: {"type": "content_block_delta"}\n\n'
+                b'event: message_delta\ndata: {"type": "message_delta", "usage": {"output_tokens": 30}}\n\n')
+        assert usage_tokens(body) == 51
+        assert usage_tokens(b"event: ping\ndata: {}\n\n") is None
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter scheduling."""
+
+    def test_from_config(self):
+        """Test limiters are only created when a limit is set."""
+        assert RateLimiter.from_config(None) is None
+        assert RateLimiter.from_config(RateLimit()) is None
+        assert RateLimiter.from_config(RateLimit(max_concurrent=2)).max_concurrent == 2
+
+    def test_token_bucket_waits(self):
+        """Test a request waits until the token bucket refills."""
+        async def run():
+            limiter = RateLimiter(tokens_per_minute=600)
+            assert await limiter.acquire(600) < 0.05
+            await limiter.release(600)
+            waited = await limiter.acquire(3)
+            await limiter.release(3)
+            return waited, limiter
+
+        waited, limiter = asyncio.run(run())
+
+        assert 0.2 <= waited < 1.0
+        assert limiter.stats()["admitted"] == 2
+        assert limiter.stats()["max_wait_s"] >= 0.2
+
+    def test_usage_corrects_bucket(self):
+        """Test the bucket is charged with actual usage once known."""
+        async def run():
+            limiter = RateLimiter(tokens_per_minute=600)
+            await limiter.acquire(10)
+            await limiter.release(10, actual=600)
+            start = time.monotonic()
+            await limiter.acquire(1)
+            return time.monotonic() - start, limiter
+
+        waited, limiter = asyncio.run(run())
+
+        assert waited >= 0.08
+        assert limiter.tokens == 601
+
+    def test_fifo_with_concurrency_limit(self):
+        """Test queued requests are admitted strictly in arrival order."""
+        async def run():
+            limiter = RateLimiter(max_concurrent=1)
+            admitted = []
+
+            async def request(name):
+                await limiter.acquire(1)
+                admitted.append(name)
+                await asyncio.sleep(0.01)
+                await limiter.release(1)
+
+            tasks = []
+            for name in "abcd":
+                tasks.append(asyncio.ensure_future(request(name)))
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            depth = limiter.queue_depth
+            await asyncio.gather(*tasks)
+            return admitted, depth, limiter
+
+        admitted, depth, limiter = asyncio.run(run())
+
+        assert admitted == list("abcd")
+        assert depth == 3
+        assert limiter.max_queue_depth == 3
+        assert limiter.active == 0 and limiter.queue_depth == 0
+
+    def test_cancelled_waiter(self):
+        """Test a cancelled request leaves the queue and does not block others."""
+        async def run():
+            limiter = RateLimiter(max_concurrent=1)
+            await limiter.acquire(1)
+            waiter = asyncio.ensure_future(limiter.acquire(1))
+            follower = asyncio.ensure_future(limiter.acquire(1))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.sleep(0.01)
+            await limiter.release(1)
+            await asyncio.wait_for(follower, 1)
+            return limiter
+
+        limiter = asyncio.run(run())
+
+        assert limiter.active == 1
+        assert limiter.queue_depth == 0
+
+    def test_pause(self):
+        """Test pause holds requests back for the given time."""
+        async def run():
+            limiter = RateLimiter(requests_per_minute=1000)
+            limiter.pause(0.2)
+            return await limiter.acquire(1)
+
+        assert asyncio.run(run()) >= 0.15
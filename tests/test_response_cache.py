@@ -0,0 +1,101 @@
+"""Tests for response_cache.py module."""
+import os
+import time
+from claude_switch.response_cache import CachedResponse, ResponseCache, is_cacheable, request_key
+
+REQUEST = {"model": "m", "temperature": 0, "messages": [{"role": "user", "content": "hi"}]}
+
+
+def _response(body: bytes = b'{"ok": true}') -> CachedResponse:
+    return CachedResponse(200, [("content-type", "application/json")], body)
+
+
+class TestRequestKey:
+    """Tests for request_key and is_cacheable functions."""
+
+    def test_normalized(self):
+        """Test key order and per-session metadata do not change the key."""
+        reordered = {"messages": REQUEST["messages"], "temperature": 0, "model": "m",
+                     "metadata": {"user_id": "session-2"}}
+
+        assert request_key("/v1/messages", REQUEST, {}) == request_key("/v1/messages", reordered, {})
+
+    def test_distinguishes_requests(self):
+        """Test the model, path, stream flag and beta header are part of the key."""
+        key = request_key("/v1/messages", REQUEST, {})
+
+        assert key != request_key("/v1/messages", dict(REQUEST, model="other"), {})
+        assert key != request_key("/v1/messages", dict(REQUEST, stream=True), {})
+        assert key != request_key("/v1/messages/count_tokens", REQUEST, {})
+        assert key != request_key("/v1/messages", REQUEST, {"anthropic-beta": "x"})
+
+    def test_is_cacheable(self):
+        """Test only temperature-0 requests are cached in deterministic mode."""
+        assert is_cacheable(REQUEST, "deterministic")
+        assert not is_cacheable(dict(REQUEST, temperature=1), "deterministic")
+        assert not is_cacheable({k: v for k, v in REQUEST.items() if k != "temperature"}, "deterministic")
+        assert is_cacheable(dict(REQUEST, temperature=1), "all")
+        assert not is_cacheable({"model": "m"}, "all")
+        assert not is_cacheable([REQUEST], "all")
+
+
+class TestCachedResponse:
+    """Tests for CachedResponse class."""
+
+    def test_events(self):
+        """Test SSE bodies are split into complete events."""
+        response = CachedResponse(200, [("Content-Type", "text/event-stream; charset=utf-8")],
+                                  b"event: a\ndata: {}\n\nevent: b\ndata: {}\n\n")
+
+        assert response.is_event_stream
+        assert response.events() == [b"event: a\ndata: {}\n\n", b"event: b\ndata: {}\n\n"]
+        assert not _response().is_event_stream
+
+
+class TestResponseCache:
+    """Tests for ResponseCache class."""
+
+    def test_put_get(self, temp_config_dir):
+        """Test entries round-trip through disk and count hits and misses."""
+        cache = ResponseCache(temp_config_dir / "responses")
+        assert cache.get("k") is None
+
+        cache.put("k", _response())
+        cached = ResponseCache(temp_config_dir / "responses").get("k")
+
+        assert cached.status == 200
+        assert cached.headers == [("content-type", "application/json")]
+        assert cached.body == b'{"ok": true}'
+        assert (cache.hits, cache.misses) == (0, 1)
+
+    def test_ttl(self, temp_config_dir):
+        """Test expired entries are removed on access."""
+        cache = ResponseCache(temp_config_dir, ttl=60)
+        cache.put("old", CachedResponse(200, [], b"x", created=time.time() - 120))
+
+        assert cache.get("old") is None
+        assert not (temp_config_dir / "old.bin").exists()
+
+    def test_lru_eviction(self, temp_config_dir):
+        """Test the least recently used entries are evicted once the size limit is exceeded."""
+        now = time.time()
+        cache = ResponseCache(temp_config_dir)
+        cache.put("a", CachedResponse(200, [], b"x" * 100, created=now))
+        cache.max_bytes = (temp_config_dir / "a.bin").stat().st_size * 3
+        for index, key in enumerate(("a", "b", "c")):
+            cache.put(key, CachedResponse(200, [], b"x" * 100, created=now))
+            os.utime(temp_config_dir / f"{key}.bin", (index, index))
+        assert cache.get("a") is not None
+
+        cache.put("d", CachedResponse(200, [], b"x" * 100, created=now))
+
+        assert sorted(path.stem for path in temp_config_dir.glob("*.bin")) == ["a", "c", "d"]
+        assert cache.evictions == 1
+        assert cache.total_bytes <= cache.max_bytes
+
+    def test_oversized_entry_skipped(self, temp_config_dir):
+        """Test responses larger than the whole cache are not stored."""
+        cache = ResponseCache(temp_config_dir, max_bytes=10)
+        cache.put("big", _response(b"x" * 100))
+
+        assert cache.get("big") is None
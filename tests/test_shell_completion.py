@@ -0,0 +1,84 @@
+"""Tests for shell_completion.py module."""
+import shutil
+import subprocess
+import pytest
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.shell_completion import (
+    generate_script,
+    install_script,
+    refresh_installed_scripts,
+    script_path
+)
+
+
+@pytest.fixture
+def manager(temp_config_dir):
+    """ConfigManager with a deepseek profile."""
+    manager = ConfigManager(str(temp_config_dir))
+    config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com", description="DeepSeek")
+    config.add_model("chat", ModelConfig(model_id="deepseek-chat", description="It's chat"))
+    config.add_model("reasoner", ModelConfig(model_id="deepseek-reasoner"))
+    manager.add_config("deepseek", config)
+    return manager
+
+
+def _bash_complete(script: str, line: str) -> list:
+    """在bash中加载脚本并模拟一次补全"""
+    program = f'{script}\nCOMP_LINE="{line}"; COMP_POINT=${{#COMP_LINE}}\n_ccs_static_complete\nprintf "%s\\n" "${{COMPREPLY[@]}}"'
+    result = subprocess.run(["bash", "-c", program], capture_output=True, text=True, check=True)
+    return [item for item in result.stdout.splitlines() if item]
+
+
+class TestGenerateScript:
+    """Tests for generate_script function."""
+
+    @pytest.mark.skipif(shutil.which("bash") is None, reason="bash not installed")
+    def test_bash_script_completes_without_python(self, manager):
+        """Test the generated bash script answers completions on its own."""
+        script = generate_script("bash", manager)
+
+        assert "run" in _bash_complete(script, "ccs r")
+        assert _bash_complete(script, "ccs run ") == ["deepseek:chat", "deepseek:reasoner"]
+        assert _bash_complete(script, "ccs run deepseek:r") == ["reasoner"]
+        assert _bash_complete(script, "ccs run reas") == ["deepseek:reasoner"]
+        assert _bash_complete(script, "ccs cache ") == ["rebuild", "clear", "clear-keys"]
+
+    def test_zsh_script_escapes_colons(self, manager):
+        """Test zsh entries escape the config:model colon and quote descriptions."""
+        script = generate_script("zsh", manager)
+
+        assert script.startswith("#compdef ccs claude-switch")
+        assert "'deepseek\\:chat:deepseek-chat (默认) - It'\"'\"'s chat'" in script
+
+    def test_fish_script_embeds_descriptions(self, manager):
+        """Test fish script embeds candidates with descriptions."""
+        script = generate_script("fish", manager)
+
+        assert "'deepseek:reasoner' 'deepseek-reasoner'" in script
+        assert "'deepseek:chat' 'deepseek-chat (默认) - It\\'s chat'" in script
+
+    def test_unsupported_shell(self, manager):
+        """Test an unsupported shell raises ValueError."""
+        with pytest.raises(ValueError, match="不支持的Shell"):
+            generate_script("tcsh", manager)
+
+
+class TestInstalledScripts:
+    """Tests for installing and refreshing scripts."""
+
+    def test_refresh_without_installed_scripts(self, manager):
+        """Test refreshing does nothing when no script was installed."""
+        assert refresh_installed_scripts(manager) == []
+        assert not script_path(manager, "bash").parent.exists()
+
+    def test_scripts_regenerated_on_save(self, manager):
+        """Test installed scripts are regenerated when the config is saved."""
+        path = install_script("bash", manager)
+        assert "anthropic:sonnet" not in path.read_text(encoding='utf-8')
+
+        config = ClaudeConfig(api_key="sk-ant", base_url="https://api.anthropic.com")
+        config.add_model("sonnet", ModelConfig(model_id="claude-sonnet"))
+        manager.add_config("anthropic", config)
+
+        assert "anthropic:sonnet" in path.read_text(encoding='utf-8')
+        assert not script_path(manager, "zsh").exists()
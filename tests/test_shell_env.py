@@ -0,0 +1,123 @@
+"""Tests for shell_env.py module."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.shell_env import apply_env_vars, env_changes, render_env, shell_init_script
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ENV_VARS = {
+    "ANTHROPIC_API_KEY": "sk-test",
+    "ANTHROPIC_BASE_URL": "https://api.test.com",
+    "ANTHROPIC_MODEL": "test-model",
+}
+
+
+class TestEnvChanges:
+    """Tests for the API_KEY/AUTH_TOKEN exclusion logic."""
+
+    def test_api_key_unsets_auth_token(self):
+        """Test a non-empty API key removes AUTH_TOKEN."""
+        exports, unsets = env_changes(ENV_VARS, {"ANTHROPIC_AUTH_TOKEN": "tok"})
+
+        assert exports == ENV_VARS
+        assert unsets == ["ANTHROPIC_AUTH_TOKEN"]
+
+    def test_empty_api_key_keeps_auth_token(self):
+        """Test an empty API key defers to an existing AUTH_TOKEN."""
+        env_vars = dict(ENV_VARS, ANTHROPIC_API_KEY="")
+        exports, unsets = env_changes(env_vars, {"ANTHROPIC_AUTH_TOKEN": "tok"})
+
+        assert "ANTHROPIC_API_KEY" not in exports
+        assert unsets == ["ANTHROPIC_API_KEY"]
+
+    def test_empty_api_key_without_token(self):
+        """Test an empty API key is exported as-is when there is no AUTH_TOKEN."""
+        env_vars = dict(ENV_VARS, ANTHROPIC_API_KEY="")
+        exports, unsets = env_changes(env_vars, {})
+
+        assert exports["ANTHROPIC_API_KEY"] == ""
+        assert unsets == []
+
+    def test_apply_env_vars(self):
+        """Test merging into a copy of the environment."""
+        environ = {"PATH": "/bin", "ANTHROPIC_AUTH_TOKEN": "tok"}
+        merged = apply_env_vars(ENV_VARS, environ)
+
+        assert merged["PATH"] == "/bin"
+        assert merged["ANTHROPIC_MODEL"] == "test-model"
+        assert "ANTHROPIC_AUTH_TOKEN" not in merged
+        assert environ["ANTHROPIC_AUTH_TOKEN"] == "tok"
+
+
+class TestRenderEnv:
+    """Tests for rendering export statements."""
+
+    def test_bash_quoting(self):
+        """Test values with shell metacharacters survive eval in bash."""
+        value = "it's $HOME; `rm -rf`"
+        script = render_env("bash", {"CCS_TEST": value}, ["ANTHROPIC_AUTH_TOKEN"])
+        result = subprocess.run(
+            ["bash", "-c", script + 'printf "%s|%s" "$CCS_TEST" "${ANTHROPIC_AUTH_TOKEN-unset}"'],
+            env=dict(os.environ, ANTHROPIC_AUTH_TOKEN="tok"), capture_output=True, text=True, check=True
+        )
+        assert result.stdout == f"{value}|unset"
+
+    def test_fish(self):
+        """Test fish statements."""
+        script = render_env("fish", {"A": "it's"}, ["B"])
+        assert script == "set -gx A 'it\\'s';\nset -e B;\n"
+
+    def test_json(self):
+        """Test JSON output."""
+        data = json.loads(render_env("json", {"A": "1"}, ["B"]))
+        assert data == {"set": {"A": "1"}, "unset": ["B"]}
+
+    def test_unsupported_shell(self):
+        """Test unknown shells are rejected."""
+        with pytest.raises(ValueError):
+            render_env("tcsh", {}, [])
+        with pytest.raises(ValueError):
+            shell_init_script("json")
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="bash not installed")
+class TestShellSwitching:
+    """End-to-end tests of switching profiles in a bash session."""
+
+    @pytest.fixture
+    def home(self, temp_config_dir):
+        manager = ConfigManager(str(temp_config_dir / ".config" / "claude-code-switch"))
+        config = ClaudeConfig(api_key="sk-test", base_url="https://api.test.com")
+        config.add_model("chat", ModelConfig(model_id="test-chat"))
+        config.add_model("coder", ModelConfig(model_id="test-coder"))
+        manager.add_config("test", config)
+        bin_dir = temp_config_dir / "bin"
+        bin_dir.mkdir()
+        ccs = bin_dir / "ccs"
+        ccs.write_text(f"#!/bin/sh\nexec {sys.executable} -m claude_switch.cli \"$@\"\n")
+        ccs.chmod(0o755)
+        return temp_config_dir
+
+    def _bash(self, home: Path, script: str) -> subprocess.CompletedProcess:
+        env = dict(os.environ, HOME=str(home), PYTHONPATH=str(PROJECT_ROOT),
+                   PATH=f"{home / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}",
+                   ANTHROPIC_AUTH_TOKEN="tok")
+        return subprocess.run(["bash", "-c", script], env=env, capture_output=True, text=True)
+
+    def test_eval_env(self, home):
+        """Test eval of `ccs env` switches the current shell."""
+        result = self._bash(home, 'eval "$(ccs env test:coder)" && echo "$ANTHROPIC_MODEL ${ANTHROPIC_AUTH_TOKEN-unset}"')
+        assert result.stdout.strip() == "test-coder unset"
+
+    def test_ccs_use_function(self, home):
+        """Test the shell-init function and its failure behaviour."""
+        result = self._bash(home, 'eval "$(ccs shell-init)"; ccs-use test:chat; echo "$ANTHROPIC_MODEL"; '
+                                  'ccs-use missing || echo "failed $ANTHROPIC_MODEL"')
+        assert result.stdout.splitlines() == ["test-chat", "failed test-chat"]
+        assert "配置 'missing' 不存在" in result.stderr
@@ -0,0 +1,137 @@
+"""Tests for snapshot.py module."""
+import os
+import shutil
+import stat
+from claude_switch import snapshot
+
+PROFILES = {"deepseek": {"api_key": "sk-1"}, "anthropic": {"api_key": "sk-2"}}
+
+
+def _write_source(path, text):
+    path.write_bytes(text.encode('utf-8'))
+    raw = path.read_bytes()
+    return raw, os.stat(path)
+
+
+def _store(cache_dir, source, stat, raw, sections=None):
+    return snapshot.store_snapshot(cache_dir, source, stat, raw, {"default_config": "deepseek"},
+                                   snapshot.pack_profiles(PROFILES), sections)
+
+
+def _load(cache_dir, source):
+    return snapshot.load_snapshot(cache_dir, source, os.stat(source), source.read_bytes)
+
+
+class TestSnapshot:
+    """Tests for snapshot load/store helpers."""
+
+    def test_store_and_load_roundtrip(self, temp_config_dir):
+        """Test a stored snapshot is returned while the source is unchanged."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+
+        assert _store(cache_dir, source, stat, raw) is True
+        loaded = _load(cache_dir, source)
+        assert loaded.meta == {"default_config": "deepseek"}
+        index = loaded.profile_index()
+        assert list(index) == ["deepseek", "anthropic"]
+        assert loaded.decode_profile(index["anthropic"]) == {"api_key": "sk-2"}
+
+    def test_private_permissions(self, temp_config_dir):
+        """Test snapshots holding API keys are readable only by the owner, whatever the umask."""
+        source = temp_config_dir / "config.yaml"
+        raw, source_stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        old_umask = os.umask(0o022)
+        try:
+            _store(cache_dir, source, source_stat, raw)
+        finally:
+            os.umask(old_umask)
+
+        snap, = cache_dir.glob("*" + snapshot.SNAPSHOT_SUFFIX)
+        assert stat.S_IMODE(snap.stat().st_mode) == 0o600
+        assert stat.S_IMODE(cache_dir.stat().st_mode) == 0o700
+
+    def test_sections(self, temp_config_dir):
+        """Test extra sections are stored and decoded on demand."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        _store(cache_dir, source, stat, raw, {"index": ["a", "b"]})
+
+        loaded = _load(cache_dir, source)
+        assert loaded.section("index") == ["a", "b"]
+        assert loaded.section("missing") is None
+
+    def test_load_missing_snapshot(self, temp_config_dir):
+        """Test loading without a snapshot returns None."""
+        source = temp_config_dir / "config.yaml"
+        _write_source(source, "configs: {}\n")
+
+        assert _load(temp_config_dir / "cache", source) is None
+
+    def test_size_change_invalidates(self, temp_config_dir):
+        """Test a snapshot is rejected when the file size differs."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        _store(cache_dir, source, stat, raw)
+
+        source.write_text("configs: {a: 1}\n", encoding='utf-8')
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert _load(cache_dir, source) is None
+
+    def test_mtime_change_invalidates(self, temp_config_dir):
+        """Test a snapshot is rejected when the mtime differs."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        _store(cache_dir, source, stat, raw)
+
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert _load(cache_dir, source) is None
+
+    def test_same_stat_different_content_invalidates(self, temp_config_dir):
+        """Test same-size content restored with the old mtime is caught by the hash."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        _store(cache_dir, source, stat, raw)
+
+        source.write_text("configs: {}#\n", encoding='utf-8')
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert _load(cache_dir, source) is None
+
+    def test_copied_file_with_same_content_is_valid(self, temp_config_dir):
+        """Test a file replaced by an identical copy keeps its snapshot via the hash."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        _store(cache_dir, source, stat, raw)
+
+        copy = temp_config_dir / "copy.yaml"
+        shutil.copy2(source, copy)
+        os.replace(copy, source)
+        assert _load(cache_dir, source) is not None
+
+    def test_corrupted_snapshot_ignored(self, temp_config_dir):
+        """Test a corrupted snapshot file is treated as missing."""
+        source = temp_config_dir / "config.yaml"
+        _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        cache_dir.mkdir()
+        snapshot.snapshot_path(cache_dir, source).write_bytes(b"\x00garbage")
+
+        assert _load(cache_dir, source) is None
+
+    def test_clear_snapshots(self, temp_config_dir):
+        """Test clearing removes only snapshot files."""
+        source = temp_config_dir / "config.yaml"
+        raw, stat = _write_source(source, "configs: {}\n")
+        cache_dir = temp_config_dir / "cache"
+        _store(cache_dir, source, stat, raw)
+        (cache_dir / "other.txt").write_text("keep")
+
+        assert snapshot.clear_snapshots(cache_dir) == 1
+        assert (cache_dir / "other.txt").exists()
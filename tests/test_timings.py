@@ -0,0 +1,129 @@
+"""Tests for timings.py module."""
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.launcher import run_with_usage
+from claude_switch.timings import Timings, env_format
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class FakeClock:
+    """Clock advanced manually by the test."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestEnvFormat:
+    """Tests for env_format function."""
+
+    def test_values(self, monkeypatch):
+        """Test CCS_TIMINGS selects text or JSON output and 0 disables it."""
+        assert env_format() is None
+        monkeypatch.setenv("CCS_TIMINGS", "1")
+        assert env_format() == "text"
+        monkeypatch.setenv("CCS_TIMINGS", "JSON")
+        assert env_format() == "json"
+        monkeypatch.setenv("CCS_TIMINGS", "0")
+        assert env_format() is None
+
+
+class TestTimings:
+    """Tests for Timings class."""
+
+    def test_disabled_records_nothing(self):
+        """Test spans are not recorded and nothing is emitted unless enabled."""
+        timings = Timings()
+        with timings.span("load"):
+            pass
+        stream = io.StringIO()
+        timings.emit(stream)
+
+        assert timings.spans == []
+        assert stream.getvalue() == ""
+
+    def test_nested_spans(self):
+        """Test nested spans record depth, offset and duration."""
+        clock = FakeClock()
+        timings = Timings(clock)
+        timings.enable("json")
+        clock.now = 0.001
+        with timings.span("resolve"):
+            clock.now = 0.002
+            with timings.span("config.load"):
+                clock.now = 0.005
+            clock.now = 0.006
+
+        report = timings.report()
+
+        assert [(span["name"], span["depth"]) for span in report["spans"]] == [("resolve", 0), ("config.load", 1)]
+        assert report["spans"][0]["start_ms"] == 1.0 and report["spans"][0]["duration_ms"] == 5.0
+        assert report["spans"][1]["duration_ms"] == 3.0
+        assert report["total_ms"] == 6.0
+        assert report["child"] is None
+        assert report["self"]["max_rss_kb"] > 0
+
+    def test_render_text(self):
+        """Test the text report lists spans and the child's resource usage."""
+        timings = Timings()
+        timings.enable("text")
+        with timings.span("env"):
+            pass
+        _, wall, usage = run_with_usage([sys.executable, "-c", "pass"], dict(os.environ))
+        timings.record_child(wall, 0, usage)
+
+        text = timings.render()
+
+        assert "  env " in text
+        assert "claude 子进程: 墙钟" in text and "退出码 0" in text
+
+
+class TestRunWithUsage:
+    """Tests for launcher.run_with_usage function."""
+
+    def test_exit_code_and_usage(self):
+        """Test the child's exit code, wall time and peak RSS are reported."""
+        code = "import sys, time; data = bytearray(32 * 1024 * 1024); time.sleep(0.05); sys.exit(3)"
+
+        exit_code, wall, usage = run_with_usage([sys.executable, "-c", code], dict(os.environ))
+
+        assert exit_code == 3
+        assert wall >= 0.05
+        assert usage.ru_maxrss > 0
+        assert usage.ru_utime + usage.ru_stime > 0
+
+
+class TestRunTimings:
+    """End-to-end test of `ccs run --timings-json`."""
+
+    def test_report_on_stderr(self, temp_config_dir):
+        """Test the launch breakdown and child usage are written to stderr as one JSON line."""
+        manager = ConfigManager(str(temp_config_dir / ".config" / "claude-code-switch"))
+        manager.add_config("test", ClaudeConfig(api_key="sk-test", base_url="https://api.test.com",
+                                                models={"chat": ModelConfig(model_id="test-chat")}))
+        manager.clear_cache()
+        binary = temp_config_dir / "bin" / "claude"
+        binary.parent.mkdir()
+        binary.write_text("#!/bin/sh\necho ok\nexit 2\n")
+        binary.chmod(0o755)
+
+        env = dict(os.environ, HOME=str(temp_config_dir), PYTHONPATH=str(PROJECT_ROOT),
+                   PATH=f"{binary.parent}{os.pathsep}{os.environ.get('PATH', '')}")
+        proc = subprocess.run([sys.executable, "-m", "claude_switch.cli", "run", "test", "--timings-json"],
+                              env=env, capture_output=True, text=True, timeout=30)
+
+        report = json.loads(proc.stderr.splitlines()[-1])
+        names = [span["name"] for span in report["spans"]]
+        assert proc.stdout.splitlines()[-1] == "ok"
+        assert names[0] == "import"
+        assert {"config.load", "config.parse", "resolve", "env"} <= set(names)
+        assert report["child"]["exit_code"] == 2
+        assert report["child"]["wall_s"] >= 0
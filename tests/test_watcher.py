@@ -0,0 +1,138 @@
+"""Tests for watcher.py module."""
+import json
+import threading
+import time
+import pytest
+from claude_switch.config import ClaudeConfig, ConfigManager, ModelConfig
+from claude_switch.watcher import ConfigWatcher, watched_directories
+
+
+def _config(base_url: str) -> ClaudeConfig:
+    return ClaudeConfig(api_key="sk", base_url=base_url, models={"m": ModelConfig(model_id="m")})
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def manager(temp_config_dir, monkeypatch):
+    """Provide a manager with one profile and no system config layer."""
+    monkeypatch.setenv("CCS_SYSTEM_CONFIG_DIR", "")
+    manager = ConfigManager(str(temp_config_dir))
+    manager.add_config("a", _config("https://a"))
+    return manager
+
+
+class TestWatchedDirectories:
+    """Tests for watched_directories function."""
+
+    def test_missing_directories_use_parent(self, manager, temp_config_dir):
+        """Test a missing conf.d directory is covered by watching the config directory."""
+        assert watched_directories(manager) == [temp_config_dir]
+
+        (temp_config_dir / "conf.d").mkdir()
+
+        assert watched_directories(manager) == [temp_config_dir, temp_config_dir / "conf.d"]
+
+
+class TestCheck:
+    """Tests for ConfigWatcher.check method."""
+
+    def test_reports_changes(self, manager, temp_config_dir):
+        """Test a change made by another process is loaded and reported."""
+        changes = []
+        watcher = ConfigWatcher(manager, on_change=changes.append)
+        ConfigManager(str(temp_config_dir)).add_config("b", _config("https://b"))
+
+        assert watcher.check().added == ["b"]
+        assert watcher.check() is None
+        assert [diff.added for diff in changes] == [["b"]]
+        assert manager.get_config("b") is not None
+
+    def test_error_keeps_config(self, manager):
+        """Test a malformed edit is reported once and the last good config stays active."""
+        errors = []
+        watcher = ConfigWatcher(manager, on_change=pytest.fail, on_error=errors.append)
+        manager.config_file.write_text("configs: [unclosed")
+
+        watcher.check()
+        watcher.check()
+
+        assert len(errors) == 1
+        assert manager.get_config("a").base_url == "https://a"
+
+    def test_callback_errors_ignored(self, manager, temp_config_dir, capsys):
+        """Test an exception raised by a callback does not propagate."""
+        def on_change(diff):
+            raise RuntimeError("boom")
+
+        watcher = ConfigWatcher(manager, on_change=on_change)
+        ConfigManager(str(temp_config_dir)).add_config("b", _config("https://b"))
+
+        assert watcher.check().added == ["b"]
+        assert "boom" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("use_inotify", [True, False], ids=["inotify", "poll"])
+class TestBackgroundWatch:
+    """Tests for the background watcher thread with each backend."""
+
+    def _start(self, manager, use_inotify: bool, changes: list) -> ConfigWatcher:
+        watcher = ConfigWatcher(manager, on_change=changes.append, debounce=0.1, poll_interval=0.02,
+                                use_inotify=use_inotify).start()
+        if use_inotify and watcher.backend != "inotify":
+            watcher.stop()
+            pytest.skip("inotify is not available")
+        return watcher
+
+    def test_hot_reload(self, manager, temp_config_dir, use_inotify):
+        """Test edits to the config file and a new conf.d fragment are picked up."""
+        changes = []
+        watcher = self._start(manager, use_inotify, changes)
+        try:
+            ConfigManager(str(temp_config_dir)).update_config("a", _config("https://a2"))
+            assert _wait_for(lambda: manager.get_config("a").base_url == "https://a2")
+
+            fragment_dir = temp_config_dir / "conf.d"
+            fragment_dir.mkdir()
+            time.sleep(0.2)
+            (fragment_dir / "team.json").write_text(json.dumps(
+                {"configs": {"team": {"api_key": "sk", "base_url": "https://team", "models": {}}}}))
+            assert _wait_for(lambda: manager.config_exists("team"))
+        finally:
+            watcher.stop()
+
+        assert [diff.changed for diff in changes][0] == ["a"]
+        assert changes[-1].added == ["team"]
+
+    def test_debounce(self, manager, temp_config_dir, use_inotify):
+        """Test a burst of writes results in a single reload."""
+        changes = []
+        watcher = self._start(manager, use_inotify, changes)
+        try:
+            other = ConfigManager(str(temp_config_dir))
+            for index in range(5):
+                other.add_config(f"burst{index}", _config("https://burst"))
+            assert _wait_for(lambda: manager.config_exists("burst4"))
+            time.sleep(0.3)
+        finally:
+            watcher.stop()
+
+        assert len(changes) == 1
+        assert changes[0].added == [f"burst{index}" for index in range(5)]
+
+    def test_stop(self, manager, use_inotify):
+        """Test stop returns promptly and the thread exits."""
+        watcher = self._start(manager, use_inotify, [])
+        started = time.monotonic()
+
+        watcher.stop(timeout=5)
+
+        assert time.monotonic() - started < 1
+        assert not any(thread.name == "ccs-config-watcher" for thread in threading.enumerate())